@@ -0,0 +1,511 @@
+# benchmark.py
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from block_dedup import SECTION_MARKER_PATTERN, SHARED_BLOCKS_SOURCE
+
+# --- Configuration Constants ---
+DEFAULT_SITEMAP_PAGES = 2000
+DEFAULT_CHILD_SITEMAPS = 10
+DEFAULT_TREE_DEPTH = 3 # Directory levels below the GitHub root
+DEFAULT_TREE_FANOUT = 3 # Subdirectories per directory
+DEFAULT_FILES_PER_DIR = 5
+BENCHMARK_RETRY_DELAY_SECONDS = 0.05 # Crawler retry delays are scaled down so injected failures don't dominate
+SCENARIOS = ("github", "sitemap")
+CONVERTER_SAMPLE_PAGES = 200 # Mock pages converted by --compare-converters when no --html-dir is given
+HTML_SNIFF_BYTES = 2048 # Files in --html-dir are used if their start looks like HTML
+MOCK_OWNER, MOCK_REPO = "bench", "docs"
+
+
+def _fraction(seed: int, *parts) -> float:
+    """A deterministic pseudo-random number in [0, 1) for the given key."""
+    digest = hashlib.blake2b(repr((seed,) + parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+class MockDocsServer:
+    """A local stand-in for the GitHub contents API and a large sitemap-based docs site.
+
+    Routes (all content is synthetic and deterministic):
+
+    - `/repos/{owner}/{repo}/contents/{path}`: a JSON directory listing of a
+      tree `depth` levels deep, with `fanout` subdirectories and
+      `files_per_dir` Markdown files per directory (plus one non-Markdown file).
+    - `/raw/{owner}/{repo}/{path}`: the raw Markdown of a file.
+    - `/sitemap.xml`: a sitemap index of `child_sitemaps` sitemaps listing
+      `pages` pages at `/docs/page-{n}.html` (gzipped `.xml.gz` if `gzip_sitemaps`).
+
+    Every response is delayed by `latency_ms`. The first request for a path
+    fails with a 503 with probability `error_rate`, and first requests to the
+    API fail with a 403 rate-limit response with probability `rate_limit_rate`,
+    so a crawler that retries still gets every page.
+    """
+
+    def __init__(self, pages: int = DEFAULT_SITEMAP_PAGES, child_sitemaps: int = DEFAULT_CHILD_SITEMAPS,
+                 depth: int = DEFAULT_TREE_DEPTH, fanout: int = DEFAULT_TREE_FANOUT, files_per_dir: int = DEFAULT_FILES_PER_DIR,
+                 latency_ms: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 gzip_sitemaps: bool = False, seed: int = 0):
+        self.pages = pages
+        self.child_sitemaps = max(1, child_sitemaps)
+        self.depth = depth
+        self.fanout = fanout
+        self.files_per_dir = files_per_dir
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.gzip_sitemaps = gzip_sitemaps
+        self.seed = seed
+        self.requests_served = 0
+        self.injected_errors = 0
+        self.injected_rate_limits = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self.base_url = None
+
+    def start(self) -> str:
+        """Starts serving on a free local port in a background thread and returns the base URL."""
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, like the real hosts
+            disable_nagle_algorithm = True # Headers and body are separate writes; don't stall on delayed ACKs
+
+            def do_GET(self):
+                mock._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # --- Synthetic content ---
+
+    def contents_url(self, path: str = "docs") -> str:
+        return f"{self.base_url}/repos/{MOCK_OWNER}/{MOCK_REPO}/contents/{path}"
+
+    def file_count(self) -> int:
+        directories = sum(self.fanout ** level for level in range(self.depth + 1))
+        return directories * self.files_per_dir
+
+    def _listing(self, path: str) -> list[dict] | None:
+        level = path.count('/') # "docs" is level 0
+        if not path.startswith("docs") or level > self.depth:
+            return None
+        items = []
+        for i in range(self.files_per_dir):
+            file_path = f"{path}/page-{i}.md"
+            blob = self._markdown(file_path).encode('utf-8')
+            items.append({"name": f"page-{i}.md", "path": file_path, "type": "file", "url": self.contents_url(file_path),
+                          "sha": hashlib.sha1(b"blob %d\0" % len(blob) + blob).hexdigest(), # Git blob SHA, as GitHub lists it
+                          "download_url": f"{self.base_url}/raw/{MOCK_OWNER}/{MOCK_REPO}/{file_path}"})
+        items.append({"name": "diagram.png", "path": f"{path}/diagram.png", "type": "file",
+                      "url": self.contents_url(f"{path}/diagram.png"), "download_url": None})
+        if level < self.depth:
+            for i in range(self.fanout):
+                dir_path = f"{path}/section-{i}"
+                items.append({"name": f"section-{i}", "path": dir_path, "type": "dir", "url": self.contents_url(dir_path),
+                              "download_url": None})
+        return items
+
+    @staticmethod
+    def _markdown(path: str) -> str:
+        title = path.rsplit('/', 1)[-1].removesuffix('.md').replace('-', ' ').title()
+        paragraph = f"This page documents {title} in {path}. " * 6
+        return (f"# {title}\n\n{paragraph}\n\n## Usage\n\n{paragraph}\n\n"
+                f"```js\nconst editor = new EditorJS({{ holder: '{title}' }});\n```\n\n"
+                f"## Options\n\n- `holder`: the element id\n- `tools`: the tools to load\n\n{paragraph}\n")
+
+    def _sitemap_index(self) -> str:
+        suffix = ".xml.gz" if self.gzip_sitemaps else ".xml"
+        entries = "".join(f"<sitemap><loc>{self.base_url}/sitemaps/sitemap-{i}{suffix}</loc></sitemap>"
+                          for i in range(self.child_sitemaps))
+        return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+
+    def _sitemap(self, index: int) -> str:
+        entries = "".join(f"<url><loc>{self.base_url}/docs/page-{n}.html</loc><lastmod>2025-01-01</lastmod></url>"
+                          for n in range(index, self.pages, self.child_sitemaps))
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+
+    @staticmethod
+    def _html_page(n: int) -> str:
+        navigation = "".join(f'<li><a href="/docs/page-{i}.html">Page {i}</a></li>' for i in range(max(0, n - 15), n + 15))
+        paragraph = f"<p>Widget {n} composes smaller widgets into a layout. It rebuilds when its state changes.</p>" * 8
+        return (f"<!DOCTYPE html><html><head><title>Page {n}</title><script>var analytics = {n};</script></head><body>"
+                f'<header class="site-header"><nav><ul>{navigation}</ul></nav></header>'
+                f'<main><article><h1>Page {n}</h1>{paragraph}<h2>Example</h2>'
+                f"<pre><code>Widget build(BuildContext context) {{\n  return Text('page {n}');\n}}</code></pre>"
+                f"<h2>Properties</h2><ul><li><code>key</code> identifies the widget</li><li><code>child</code> is the content</li></ul>"
+                f"{paragraph}</article></main>"
+                f'<footer class="site-footer"><p>Except as otherwise noted, this site is licensed under CC BY 4.0.</p></footer>'
+                f"</body></html>")
+
+    # --- Request handling ---
+
+    def _inject_failure(self, path: str, is_api: bool) -> int | None:
+        with self._lock:
+            self.requests_served += 1
+            attempt = self._attempts.get(path, 0)
+            self._attempts[path] = attempt + 1
+        if attempt > 0:
+            return None # Retries always succeed, so every page is eventually crawled
+        if is_api and _fraction(self.seed, "403", path) < self.rate_limit_rate:
+            with self._lock:
+                self.injected_rate_limits += 1
+            return 403
+        if _fraction(self.seed, "5xx", path) < self.error_rate:
+            with self._lock:
+                self.injected_errors += 1
+            return 503
+        return None
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        path = urlsplit(handler.path).path
+        api_prefix = f"/repos/{MOCK_OWNER}/{MOCK_REPO}/contents/"
+        headers = {}
+        failure = self._inject_failure(path, path.startswith(api_prefix))
+        if failure == 403:
+            headers = {"X-RateLimit-Limit": "60", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 1)}
+            status, content_type, body = 403, "application/json", b'{"message": "API rate limit exceeded"}'
+        elif failure is not None:
+            status, content_type, body = failure, "text/plain", b"Service Unavailable"
+        elif path.startswith(api_prefix):
+            listing = self._listing(path[len(api_prefix):].strip('/'))
+            headers = {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+            if listing is None:
+                status, content_type, body = 404, "application/json", b'{"message": "Not Found"}'
+            else:
+                status, content_type, body = 200, "application/json", json.dumps(listing).encode('utf-8')
+        elif path.startswith(f"/raw/{MOCK_OWNER}/{MOCK_REPO}/"):
+            status, content_type, body = 200, "text/plain; charset=utf-8", self._markdown(path).encode('utf-8')
+        elif path == "/sitemap.xml":
+            status, content_type, body = 200, "application/xml", self._sitemap_index().encode('utf-8')
+        elif path.startswith("/sitemaps/sitemap-"):
+            index = int(path.removeprefix("/sitemaps/sitemap-").split('.')[0])
+            body = self._sitemap(index).encode('utf-8')
+            if path.endswith(".gz"):
+                compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+                body = compressor.compress(body) + compressor.flush()
+            status, content_type = 200, "application/xml"
+        elif path.startswith("/docs/page-") and path.endswith(".html"):
+            status, content_type = 200, "text/html; charset=utf-8"
+            body = self._html_page(int(path.removeprefix("/docs/page-").removesuffix(".html"))).encode('utf-8')
+        else:
+            status, content_type, body = 404, "text/plain", b"Not Found"
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_scenario(scenario: str, base_url: str, requests_per_second: float, converter_engine: str = None,
+                 github_walk_workers: int = None) -> dict:
+    """Crawls the mock server in the current process and returns the measurements.
+
+    Run by the child process started from `main`, in a scratch working
+    directory, so peak RSS and output files are per scenario.
+    """
+    import github_docs_crawler
+    import github_rate_limit
+    import http_cache
+    import retry_policy
+    import sitemap_docs_crawler
+
+    http_cache.HTTP_CACHE_ENABLED = False # Measure the network path, not revalidation
+    retry_policy.DEFAULT_RETRY_POLICY.base_delay = BENCHMARK_RETRY_DELAY_SECONDS
+    github_rate_limit.GITHUB_RETRY_POLICY.base_delay = BENCHMARK_RETRY_DELAY_SECONDS
+    sitemap_docs_crawler.PER_HOST_REQUESTS_PER_SECOND = requests_per_second
+    if converter_engine:
+        sitemap_docs_crawler.CONVERTER_ENGINE = converter_engine
+
+    started_at = time.perf_counter()
+    cpu_started_at = os.times()
+    if scenario == "github":
+        output_path = Path("github.md")
+        with open(output_path, 'wb') as output_file_handle:
+            github_docs_crawler.crawl_github_tree(f"{base_url}/repos/{MOCK_OWNER}/{MOCK_REPO}/contents/docs",
+                                                  output_file_handle, {"Accept": "application/vnd.github.v3+json"},
+                                                  workers=github_walk_workers)
+    else:
+        knowledge_path = Path("bench-sitemap/.knowledge")
+        knowledge_path.parent.mkdir(exist_ok=True)
+        knowledge_path.write_text(f"{base_url}/sitemap.xml\n", encoding='utf-8')
+        sitemap_docs_crawler.crawl_knowledge_file(knowledge_path.as_posix(), {"User-Agent": sitemap_docs_crawler.DEFAULT_USER_AGENT})
+        output_path = knowledge_path.parent / "docs.md"
+    wall_seconds = time.perf_counter() - started_at
+    cpu_finished_at = os.times()
+
+    text = output_path.read_text(encoding='utf-8') if output_path.is_file() else ""
+    sources = SECTION_MARKER_PATTERN.findall(text)
+    return {
+        "scenario": scenario,
+        "pages": sum(1 for _, source in sources if source != SHARED_BLOCKS_SOURCE),
+        "output_bytes": len(text.encode('utf-8')),
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": sum(cpu_finished_at[:4]) - sum(cpu_started_at[:4]), # Self and (process pool) children
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children_peak_rss_kib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def load_html_pages(html_dir: str) -> list[tuple[str, str]]:
+    """Reads every file under `html_dir` that looks like an HTML page.
+
+    Works on a directory of saved pages as well as on an HTTP cache's
+    `bodies` directory (e.g. `.http_cache/bodies` after crawling the Flutter
+    sitemap), whose files have no extension.
+    """
+    pages = []
+    for path in sorted(Path(html_dir).rglob("*")):
+        if not path.is_file():
+            continue
+        data = path.read_bytes()
+        head = data[:HTML_SNIFF_BYTES].lower()
+        if b"<html" in head or b"<!doctype html" in head or b"<body" in head:
+            pages.append((str(path), data.decode('utf-8', errors='replace')))
+    return pages
+
+
+def compare_converters(pages: list[tuple[str, str]], engines: list[str]) -> list[dict]:
+    """Converts `pages` with each engine and measures speed, memory and parity with the first engine.
+
+    Pages/s comes from a plain timed pass; peak memory is the largest
+    tracemalloc peak of a single page conversion, measured in a second pass
+    since tracing slows conversion down. Parity compares each page's
+    Markdown with the first engine's: exact matches, and the mean line
+    similarity for the rest.
+    """
+    import sitemap_docs_crawler
+
+    results = []
+    reference = None
+    for engine in engines:
+        sitemap_docs_crawler.CONVERTER_ENGINE = engine
+        started_at = time.perf_counter()
+        outputs = [sitemap_docs_crawler.convert_html_to_markdown(html, name) for name, html in pages]
+        seconds = time.perf_counter() - started_at
+        peak_bytes = 0
+        tracemalloc.start()
+        try:
+            for name, html in pages:
+                tracemalloc.reset_peak()
+                sitemap_docs_crawler.convert_html_to_markdown(html, name)
+                peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        result = {"engine": engine, "pages": len(pages), "seconds": seconds,
+                  "pages_per_second": len(pages) / max(seconds, 1e-9), "peak_page_kib": peak_bytes / 1024}
+        if reference is None:
+            reference = outputs
+        else:
+            mismatches = [(name, expected or "", actual or "") for (name, _), expected, actual
+                          in zip(pages, reference, outputs) if expected != actual]
+            similarities = [difflib.SequenceMatcher(None, expected.splitlines(), actual.splitlines()).ratio()
+                            for _, expected, actual in mismatches]
+            result.update(identical=len(pages) - len(mismatches),
+                          similarity=1 - (len(similarities) - sum(similarities)) / max(len(pages), 1),
+                          mismatches=mismatches)
+        results.append(result)
+    return results
+
+
+def format_converter_report(results: list[dict]) -> str:
+    header = f"{'engine':<12} {'pages':>6} {'pages/s':>9} {'total s':>8} {'peak KiB/page':>14} {'identical':>10} {'similarity':>11}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        parity = (f"{result['identical']:>10} {result['similarity'] * 100:>10.2f}%" if "identical" in result
+                  else f"{'(reference)':>22}")
+        lines.append(f"{result['engine']:<12} {result['pages']:>6} {result['pages_per_second']:>9.1f} "
+                     f"{result['seconds']:>8.2f} {result['peak_page_kib']:>14.1f} {parity}")
+    for result in results:
+        for name, expected, actual in result.get("mismatches", [])[:3]:
+            diff = difflib.unified_diff(expected.splitlines(), actual.splitlines(), "markdownify", result["engine"],
+                                        lineterm="", n=1)
+            lines.append(f"\n{name}:\n" + "\n".join(list(diff)[:12]))
+    return "\n".join(lines)
+
+
+def format_report(results: list[dict]) -> str:
+    header = (f"{'scenario':<10} {'pages':>6} {'pages/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'wall s':>8} "
+              f"{'cpu s':>7} {'peak RSS MiB':>13} {'errors':>7}")
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(f"{result['scenario']:<10} {result['pages']:>6} {result['pages_per_second']:>9.1f} "
+                     f"{result['latency_p50_ms']:>8.1f} {result['latency_p99_ms']:>8.1f} {result['wall_seconds']:>8.2f} "
+                     f"{result['cpu_seconds']:>7.2f} {result['peak_rss_kib'] / 1024:>13.1f} {result['failed_requests']:>7}")
+    for result in results:
+        if "critical_path_depth" in result:
+            lines.append(f"{result['scenario']}: {result['requests']} requests, at most {result['peak_in_flight']} in flight; "
+                         f"critical path {result['critical_path_depth']} requests, {result['critical_path_ms'] / 1000:.2f}s "
+                         f"of {result['wall_seconds']:.2f}s wall")
+    return "\n".join(lines)
+
+
+def compare_to_baseline(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Returns a description of every metric that regressed by more than `tolerance` (a fraction)."""
+    regressions = []
+    baseline_by_scenario = {result["scenario"]: result for result in baseline}
+    for result in results:
+        previous = baseline_by_scenario.get(result["scenario"])
+        if previous is None:
+            continue
+        checks = [("pages_per_second", -1), ("latency_p99_ms", 1), ("cpu_seconds", 1), ("peak_rss_kib", 1)]
+        for metric, direction in checks:
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * direction
+            if change > tolerance:
+                regressions.append(f"{result['scenario']}: {metric} {old:.1f} -> {new:.1f} ({change * 100:.0f}% worse)")
+    return regressions
+
+
+def main():
+    """Starts the mock server, runs each scenario in a fresh process and prints the results."""
+    parser = argparse.ArgumentParser(description="Offline crawler benchmark against a local mock docs server.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all).")
+    parser.add_argument("--pages", type=int, default=DEFAULT_SITEMAP_PAGES, help="Pages in the mock sitemap.")
+    parser.add_argument("--child-sitemaps", type=int, default=DEFAULT_CHILD_SITEMAPS)
+    parser.add_argument("--depth", type=int, default=DEFAULT_TREE_DEPTH, help="Directory levels of the mock repository.")
+    parser.add_argument("--fanout", type=int, default=DEFAULT_TREE_FANOUT)
+    parser.add_argument("--files-per-dir", type=int, default=DEFAULT_FILES_PER_DIR)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Delay added to every response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of paths whose first request gets a 503.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of API paths whose first request gets a 403.")
+    parser.add_argument("--gzip-sitemaps", action="store_true", help="Serve child sitemaps as .xml.gz.")
+    parser.add_argument("--requests-per-second", type=float, default=0,
+                        help="Per-host rate for the sitemap crawler; 0 (default) removes the politeness limit.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against results saved with --json; exits with 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression against the baseline (fraction).")
+    parser.add_argument("--converter-engine", choices=("markdownify", "streaming"),
+                        help="HTML-to-Markdown engine for the sitemap scenario (default: the crawler's CONVERTER_ENGINE).")
+    parser.add_argument("--github-walk-workers", type=int,
+                        help="Requests in flight for the github scenario; 1 walks the tree sequentially "
+                             "(default: the crawler's GITHUB_WALK_WORKERS).")
+    parser.add_argument("--compare-converters", action="store_true",
+                        help="Instead of crawling, compare the conversion engines' speed, memory and output; "
+                             "exits with 1 if their Markdown differs.")
+    parser.add_argument("--html-dir", help="Pages for --compare-converters, e.g. saved pages or .http_cache/bodies "
+                                           f"(default: {CONVERTER_SAMPLE_PAGES} mock pages).")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_scenario(args.child, args.base_url, args.requests_per_second, args.converter_engine,
+                              args.github_walk_workers)
+        Path(args.result).write_text(json.dumps(result), encoding='utf-8')
+        return
+    if args.compare_converters:
+        if args.html_dir:
+            pages = load_html_pages(args.html_dir)
+        else:
+            pages = [(f"mock page {n}", MockDocsServer._html_page(n)) for n in range(CONVERTER_SAMPLE_PAGES)]
+        if not pages:
+            parser.error(f"no HTML pages found in {args.html_dir}")
+        print(f"Converting {len(pages)} page(s), {sum(len(html) for _, html in pages) / 1024 / 1024:.1f} MiB of HTML...")
+        results = compare_converters(pages, ["markdownify", "streaming"])
+        print("\n" + format_converter_report(results))
+        if args.json:
+            Path(args.json).write_text(json.dumps(results, indent=1), encoding='utf-8')
+            print(f"Saved results to {args.json}")
+        sys.exit(1 if any(result.get("mismatches") for result in results) else 0)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    scenarios = args.scenarios or list(SCENARIOS)
+
+    server = MockDocsServer(args.pages, args.child_sitemaps, args.depth, args.fanout, args.files_per_dir,
+                            args.latency_ms, args.error_rate, args.rate_limit_rate, args.gzip_sitemaps)
+    base_url = server.start()
+    print(f"Mock docs server at {base_url}: {args.pages} sitemap pages, {server.file_count()} repository files, "
+          f"{args.latency_ms:.0f} ms latency, {args.error_rate:.1%} 503s, {args.rate_limit_rate:.1%} 403s")
+    results = []
+    try:
+        for scenario in scenarios:
+            with tempfile.TemporaryDirectory(prefix=f"bench-{scenario}-") as workdir:
+                result_path = Path(workdir) / "result.json"
+                spans_path = Path(workdir) / "spans.jsonl"
+                env = dict(os.environ, CRAWL_LOG_LEVEL="0", CRAWL_METRICS_JSONL=str(spans_path))
+                env.pop("CRAWL_METRICS_PROMETHEUS", None)
+                print(f"Running {scenario}...")
+                completed = subprocess.run(
+                    [sys.executable, str(Path(__file__).resolve()), "--child", scenario, "--base-url", base_url,
+                     "--result", str(result_path), "--requests-per-second", str(args.requests_per_second)]
+                    + (["--converter-engine", args.converter_engine] if args.converter_engine else [])
+                    + (["--github-walk-workers", str(args.github_walk_workers)] if args.github_walk_workers else []),
+                    cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                if completed.returncode != 0 or not result_path.is_file():
+                    print(f"Error: {scenario} benchmark failed:\n{completed.stderr[-2000:]}")
+                    continue
+                result = json.loads(result_path.read_text(encoding='utf-8'))
+                spans = [json.loads(line) for line in spans_path.read_text(encoding='utf-8').splitlines()] if spans_path.is_file() else []
+                latencies = [span["total_ms"] for span in spans if span["span"] == "http_request"]
+                result.update(
+                    pages_per_second=result["pages"] / max(result["wall_seconds"], 1e-9),
+                    requests=len(latencies),
+                    latency_p50_ms=_percentile(latencies, 0.50),
+                    latency_p99_ms=_percentile(latencies, 0.99),
+                    failed_requests=sum(1 for span in spans if span["span"] == "http_request" and span.get("status", 200) >= 400),
+                )
+                for span in spans:
+                    if span["span"] == "github_walk":
+                        result.update(peak_in_flight=span["peak_in_flight"], critical_path_depth=span["critical_path_depth"],
+                                      critical_path_ms=span["critical_path_ms"])
+                results.append(result)
+    finally:
+        server.stop()
+
+    print("\n" + format_report(results))
+    print(f"Mock server: {server.requests_served} requests, {server.injected_errors} injected 503s, "
+          f"{server.injected_rate_limits} injected 403s")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=1), encoding='utf-8')
+        print(f"Saved results to {args.json}")
+    if args.baseline:
+        regressions = compare_to_baseline(results, json.loads(Path(args.baseline).read_text(encoding='utf-8')), args.tolerance)
+        if regressions:
+            print("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
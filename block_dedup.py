@@ -0,0 +1,218 @@
+# block_dedup.py
+import hashlib
+import os
+import re
+from pathlib import Path
+
+# --- Configuration Constants ---
+DEDUP_ENABLED = False # Opt-in: only page-leading and page-trailing chrome is removed, but it still rewrites pages
+DEDUP_MIN_PAGES = 25 # Edge blocks found on more than this many pages are emitted once
+DEDUP_MIN_BLOCK_CHARS = 20 # Shorter blocks (e.g. "Note:") are never treated as boilerplate
+DEDUP_VERSION = 2 # Bump when the candidate rules change; manifests of older passes are then not reused
+SHARED_BLOCKS_SOURCE = "shared-blocks"
+SHARED_BLOCKS_NOTE_PREFIX = "<!-- Blocks repeated on more than"
+
+# Matches the separator both crawlers write before every page or file
+SECTION_MARKER_PATTERN = re.compile(r'\n\n---\n\n<!-- (Source(?: URL)?): (.*?) -->\n\n---\n\n')
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+HEADING_LINE_PATTERN = re.compile(r'^ {0,3}(#{1,6}(\s|$)|=+\s*$|-+\s*$)', re.MULTILINE) # ATX headings and setext underlines
+MDX_STATEMENT_PATTERN = re.compile(r'^\s*(import|export)\s', re.MULTILINE)
+TAG_PATTERN = re.compile(r'<(/?)([A-Za-z][\w.:-]*)\b[^<>]*?(/?)>')
+VOID_ELEMENTS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"))
+
+
+def split_blocks(body: str) -> list[tuple[str, str]]:
+    """Splits Markdown into blank-line separated blocks, keeping code fences whole.
+
+    Args:
+        body: The Markdown text of one section.
+
+    Returns:
+        A list of (block, separator) pairs; joining them all gives back `body`.
+    """
+    blocks = []
+    current = []
+    separator = []
+    in_fence = False
+    for line in body.splitlines(keepends=True):
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            separator.append(line)
+            continue
+        if separator:
+            if current:
+                blocks.append(("".join(current), "".join(separator)))
+                current = []
+            else:
+                blocks.append(("", "".join(separator))) # Leading blank lines
+            separator = []
+        current.append(line)
+    if current or separator:
+        blocks.append(("".join(current), "".join(separator)))
+    return blocks
+
+
+def is_dedup_candidate(block: str) -> bool:
+    """Returns True if removing `block` from a page cannot change the page's structure.
+
+    Headings, fenced code, MDX import/export statements, blocks that are
+    only tags (e.g. `<div class="overflow-auto">` or `<Props />`) and blocks
+    whose tags don't balance are never candidates: they are page content or
+    half of a construct that continues in another block.
+    """
+    if FENCE_PATTERN.match(block) or HEADING_LINE_PATTERN.search(block) or MDX_STATEMENT_PATTERN.search(block):
+        return False
+    if not TAG_PATTERN.sub("", block).strip():
+        return False
+    open_tags = {}
+    for closing, name, self_closing in TAG_PATTERN.findall(block):
+        name = name.lower()
+        if self_closing or name in VOID_ELEMENTS:
+            continue
+        open_tags[name] = open_tags.get(name, 0) + (-1 if closing else 1)
+        if open_tags[name] < 0:
+            return False
+    return not any(open_tags.values())
+
+
+def block_fingerprint(block: str) -> str | None:
+    """Returns a short whitespace-insensitive hash of a block, or None if it may never be deduplicated."""
+    if not is_dedup_candidate(block):
+        return None
+    normalized = " ".join(block.split())
+    if len(normalized) < DEDUP_MIN_BLOCK_CHARS:
+        return None
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _edge_indices(fingerprints: list, keep) -> list[int]:
+    """Returns the indices of the leading and trailing runs of blocks for which `keep(fingerprint)` holds.
+
+    Empty blocks (leading blank lines) are skipped over without ending a run.
+    """
+    indices = []
+    for order in (range(len(fingerprints)), range(len(fingerprints) - 1, -1, -1)):
+        for index in order:
+            if fingerprints[index] == "":
+                continue
+            if not keep(fingerprints[index]):
+                break
+            indices.append(index)
+    return sorted(set(indices))
+
+
+def deduplicate_docs(text: str, min_pages: int = DEDUP_MIN_PAGES, extra_shared: dict = None) -> tuple[str, dict]:
+    """Moves page chrome repeated across many sections of a docs bundle into one shared section.
+
+    Each section (page or file) is split into blocks. Only the runs of
+    candidate blocks (see `is_dedup_candidate`) at the very start and end of
+    a section are considered: a block found in such a run in more than
+    `min_pages` sections is removed from those runs and written once in a
+    shared section right after the header. The same text in the middle of a
+    page is left alone. Sections never depend on each other, which keeps
+    them reusable by incremental builds.
+
+    Args:
+        text: A complete docs.md as written by either crawler. A shared section
+            left by an earlier dedup pass is rebuilt, keeping all its blocks.
+        min_pages: A block must appear in more than this many sections.
+        extra_shared: Optional {fingerprint: block} that must be in the shared
+            section anyway, e.g. blocks already stripped from spliced sections.
+
+    Returns:
+        (new_text, info), where info has "shared_blocks" ({fingerprint: block}),
+        "sections" ({source: {"offset", "length", "sha256", "stripped"}} in
+        bytes of new_text, with the fingerprints removed from that section),
+        "bytes_before" and "bytes_after".
+    """
+    parts = SECTION_MARKER_PATTERN.split(text)
+    header, sections = parts[0], list(zip(parts[1::3], parts[2::3], parts[3::3]))
+    carried_over = {} # Blocks of an earlier shared section; the sections they came from are already stripped
+    for _, source, body in sections:
+        if source == SHARED_BLOCKS_SOURCE:
+            for block, _ in split_blocks(body):
+                fingerprint = block_fingerprint(block)
+                if fingerprint is not None and not block.startswith(SHARED_BLOCKS_NOTE_PREFIX):
+                    carried_over[fingerprint] = block.strip()
+    sections = [section for section in sections if section[1] != SHARED_BLOCKS_SOURCE]
+
+    split_sections = []
+    page_counts = {}
+    first_seen = {}
+    for marker, source, body in sections:
+        blocks = split_blocks(body)
+        fingerprints = ["" if not block.strip() else block_fingerprint(block) for block, _ in blocks]
+        edge_fingerprints = {fingerprints[index] for index in _edge_indices(fingerprints, lambda f: f is not None)}
+        for fingerprint, (block, _) in zip(fingerprints, blocks):
+            if fingerprint in edge_fingerprints and fingerprint not in first_seen:
+                first_seen[fingerprint] = block.strip()
+        for fingerprint in edge_fingerprints:
+            page_counts[fingerprint] = page_counts.get(fingerprint, 0) + 1
+        split_sections.append((marker, source, blocks, fingerprints))
+
+    shared = {fingerprint: first_seen[fingerprint] for fingerprint, count in page_counts.items() if count > min_pages}
+    for fingerprint, block in {**carried_over, **(extra_shared or {})}.items():
+        shared.setdefault(fingerprint, block)
+
+    output = [header]
+    offset = len(header.encode('utf-8'))
+    if shared:
+        shared_section = (f"\n\n---\n\n<!-- Source: {SHARED_BLOCKS_SOURCE} -->\n\n---\n\n"
+                          f"{SHARED_BLOCKS_NOTE_PREFIX} {min_pages} pages; written once here and omitted below. -->\n\n"
+                          + "\n\n".join(shared.values()) + "\n")
+        output.append(shared_section)
+        offset += len(shared_section.encode('utf-8'))
+
+    section_info = {}
+    for marker, source, blocks, fingerprints in split_sections:
+        removed = set(_edge_indices(fingerprints, shared.__contains__))
+        kept = [block + separator for index, (block, separator) in enumerate(blocks) if index not in removed]
+        section = f"\n\n---\n\n<!-- {marker}: {source} -->\n\n---\n\n" + "".join(kept)
+        section_bytes = section.encode('utf-8')
+        length = len(section_bytes)
+        section_info[source] = {
+            "offset": offset,
+            "length": length,
+            "sha256": hashlib.sha256(section_bytes).hexdigest(),
+            "stripped": sorted({fingerprints[index] for index in removed}),
+        }
+        output.append(section)
+        offset += length
+
+    new_text = "".join(output)
+    return new_text, {
+        "shared_blocks": shared,
+        "sections": section_info,
+        "bytes_before": len(text.encode('utf-8')),
+        "bytes_after": offset,
+    }
+
+
+def deduplicate_docs_file(docs_path: Path, min_pages: int = DEDUP_MIN_PAGES, extra_shared: dict = None) -> dict | None:
+    """Runs `deduplicate_docs` on a docs.md in place, replacing it atomically.
+
+    Args:
+        docs_path: Path to the docs.md to rewrite.
+        min_pages: A block must appear in more than this many sections.
+        extra_shared: See `deduplicate_docs`.
+
+    Returns:
+        The info dict from `deduplicate_docs`, or None if the file could not be
+        read or written.
+    """
+    docs_path = Path(docs_path)
+    try:
+        text = docs_path.read_text(encoding='utf-8')
+        new_text, info = deduplicate_docs(text, min_pages, extra_shared)
+        temp_path = docs_path.with_name(docs_path.name + ".dedup.tmp")
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(new_text)
+        os.replace(temp_path, docs_path)
+    except OSError as e:
+        print(f"Error deduplicating {docs_path}: {e}")
+        return None
+    saved = info["bytes_before"] - info["bytes_after"]
+    print(f"Deduplicated {len(info['shared_blocks'])} block(s) repeated on more than {min_pages} pages in {docs_path}: "
+          f"{info['bytes_before']} -> {info['bytes_after']} bytes ({saved / max(info['bytes_before'], 1) * 100:.1f}% smaller).")
+    return info
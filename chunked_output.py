@@ -0,0 +1,187 @@
+# chunked_output.py
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+CHUNK_INDEX_ENABLED = False # Crawlers index each docs.md they write; `python chunked_output.py` indexes on demand
+CHUNK_INDEX_ENABLED = False # Crawlers write the chunk index after rewriting a docs.md; `python chunked_output.py` builds it on demand
+CHUNK_INDEX_FILENAME = "docs.index.sqlite3" # Written next to docs.md
+MAX_CHUNK_TOKENS = 800 # Chunks longer than this are split at the next blank line
+BYTES_PER_TOKEN = 4 # Rough estimate; avoids depending on a tokenizer
+
+# The separator both crawlers write before every page or file
+SECTION_MARKER = re.compile(rb'\n\n---\n\n<!-- Source(?: URL)?: (.*?) -->\n\n---\n\n')
+ATX_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+SETEXT_UNDERLINE = re.compile(r'^(=+|-+)\s*$')
+FENCE = re.compile(r'^\s*(```|~~~)')
+
+
+def _make_chunk(data: bytes, source: str, headings: list, start: int, end: int) -> dict | None:
+    if end <= start or not data[start:end].strip():
+        return None
+    return {
+        "source": source,
+        "heading_path": [title for _, title in headings],
+        "offset": start,
+        "length": end - start,
+        "tokens": (end - start) // BYTES_PER_TOKEN + 1,
+    }
+
+
+def _iter_section_chunks(data: bytes, source: str, section_start: int, body_start: int, section_end: int):
+    headings = [] # (level, title) of the enclosing headings
+    chunk_start = section_start # The first chunk includes the source marker
+    lines = data[body_start:section_end].splitlines(keepends=True)
+    in_front_matter = bool(lines) and lines[0].rstrip() == b"---"
+    in_fence = False
+    previous_line, previous_offset = "", body_start
+    offset = body_start
+    for index, raw_line in enumerate(lines):
+        line = raw_line.decode('utf-8', errors='replace').rstrip("\r\n")
+        line_offset = offset
+        offset += len(raw_line)
+
+        if in_front_matter or FENCE.match(line) or in_fence:
+            if in_front_matter and index > 0 and line == "---":
+                in_front_matter = False
+            elif not in_front_matter and FENCE.match(line):
+                in_fence = not in_fence
+            previous_line, previous_offset = "", line_offset # Never a setext heading text
+            continue
+
+        heading = None
+        heading_offset = line_offset
+        atx = ATX_HEADING.match(line)
+        if atx:
+            heading = (len(atx.group(1)), atx.group(2))
+        elif SETEXT_UNDERLINE.match(line) and previous_line.strip():
+            heading = (1 if line.lstrip().startswith("=") else 2, previous_line.strip())
+            heading_offset = previous_offset
+
+        if heading:
+            if chunk_start != section_start or data[body_start:heading_offset].strip():
+                chunk = _make_chunk(data, source, headings, chunk_start, heading_offset)
+                if chunk:
+                    yield chunk
+                chunk_start = heading_offset
+            # else: keep the source marker in the same chunk as the section's first heading
+            headings = [h for h in headings if h[0] < heading[0]] + [heading]
+        elif not line.strip() and (offset - chunk_start) // BYTES_PER_TOKEN > MAX_CHUNK_TOKENS:
+            chunk = _make_chunk(data, source, headings, chunk_start, offset)
+            if chunk:
+                yield chunk
+            chunk_start = offset
+        previous_line, previous_offset = line, line_offset
+
+    chunk = _make_chunk(data, source, headings, chunk_start, section_end)
+    if chunk:
+        yield chunk
+
+
+def iter_chunks(data: bytes):
+    """Splits a docs bundle into heading-aware chunks of bounded size.
+
+    Every section (page or file) starts a new chunk, as does every heading
+    (ATX or setext, outside code fences and YAML front matter). Chunks that
+    grow past `MAX_CHUNK_TOKENS` are split at the next blank line, so a chunk
+    never cuts a paragraph or code block in half (a single block larger than
+    the limit stays whole). Together the chunks cover
+    every section of the file; only the bundle header is left out.
+
+    Args:
+        data: The raw bytes of a docs.md.
+
+    Yields:
+        Dicts with "source", "heading_path" (list of heading titles),
+        "offset" and "length" (bytes into `data`) and "tokens" (estimated).
+    """
+    markers = list(SECTION_MARKER.finditer(data))
+    for index, marker in enumerate(markers):
+        section_end = markers[index + 1].start() if index + 1 < len(markers) else len(data)
+        yield from _iter_section_chunks(data, marker.group(1).decode('utf-8', errors='replace'),
+                                        marker.start(), marker.end(), section_end)
+
+
+def build_chunk_index(docs_path: Path) -> Path | None:
+    """Writes an SQLite chunk index next to a docs.md.
+
+    The `chunks` table holds one row per chunk with its source path/URL,
+    heading path (" > " joined), byte offset, length, estimated tokens and
+    sha256, so a reader can `mmap` docs.md and slice out a section directly
+    (see `read_chunk`). The `meta` table records the size and sha256 of the
+    docs.md the index was built from.
+
+    Args:
+        docs_path: Path to the docs.md to index.
+
+    Returns:
+        The path of the index, or None if it could not be built.
+    """
+    docs_path = Path(docs_path)
+    index_path = docs_path.with_name(CHUNK_INDEX_FILENAME)
+    temp_path = index_path.with_name(index_path.name + ".tmp")
+    try:
+        data = docs_path.read_bytes()
+        temp_path.unlink(missing_ok=True)
+        db = sqlite3.connect(temp_path)
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute(
+            "CREATE TABLE chunks (id INTEGER PRIMARY KEY, source TEXT, heading_path TEXT,"
+            " offset INTEGER, length INTEGER, tokens INTEGER, sha256 TEXT)"
+        )
+        db.execute("CREATE INDEX chunks_source ON chunks (source)")
+        count = 0
+        for chunk in iter_chunks(data):
+            chunk_bytes = data[chunk["offset"]:chunk["offset"] + chunk["length"]]
+            db.execute(
+                "INSERT INTO chunks (source, heading_path, offset, length, tokens, sha256) VALUES (?, ?, ?, ?, ?, ?)",
+                (chunk["source"], " > ".join(chunk["heading_path"]), chunk["offset"], chunk["length"],
+                 chunk["tokens"], hashlib.sha256(chunk_bytes).hexdigest()),
+            )
+            count += 1
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("docs_file", docs_path.name),
+            ("docs_size", str(len(data))),
+            ("docs_sha256", hashlib.sha256(data).hexdigest()),
+            ("max_chunk_tokens", str(MAX_CHUNK_TOKENS)),
+        ])
+        db.commit()
+        db.close()
+        os.replace(temp_path, index_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error building chunk index for {docs_path}: {e}")
+        return None
+    print(f"Wrote chunk index with {count} chunk(s) to {index_path}")
+    return index_path
+
+
+def read_chunk(docs_path: Path, offset: int, length: int) -> str:
+    """Reads one chunk from a docs.md through mmap, without parsing the rest of the file.
+
+    Args:
+        docs_path: Path to the docs.md.
+        offset: Byte offset of the chunk, from the index.
+        length: Byte length of the chunk, from the index.
+
+    Returns:
+        The chunk text.
+    """
+    with open(docs_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return mapped[offset:offset + length].decode('utf-8')
+
+
+def main():
+    """Command-line entry point: builds the chunk index of the given docs.md files."""
+    parser = argparse.ArgumentParser(description="Write heading-aware chunk indexes next to crawled docs.md bundles.")
+    parser.add_argument("paths", nargs="*", help="docs.md files to index (default: */docs.md).")
+    args = parser.parse_args()
+    for docs_path in [Path(p) for p in args.paths] or sorted(Path(".").glob("*/docs.md")):
+        build_chunk_index(docs_path)
+
+
+if __name__ == "__main__":
+    main()
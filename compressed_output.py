@@ -0,0 +1,126 @@
+# compressed_output.py
+import bisect
+import json
+import mmap
+import os
+import zlib
+from pathlib import Path
+
+from chunked_output import SECTION_MARKER
+from crawl_metrics import NORMAL, log
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# --- Configuration Constants ---
+OUTPUT_COMPRESSION = None # None, "gzip" or "zstd" (needs the 'zstandard' package; falls back to gzip)
+COMPRESSION_LEVEL = {"gzip": 6, "zstd": 9}
+FRAME_TARGET_BYTES = 256 * 1024 # Uncompressed bytes per frame; frames end at the next section marker
+FRAME_INDEX_SUFFIX = ".frames.json" # Written next to the compressed file
+FRAME_INDEX_VERSION = 1
+
+
+def _compress_frame(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL["zstd"]).compress(data)
+    compressor = zlib.compressobj(COMPRESSION_LEVEL["gzip"], zlib.DEFLATED, 16 + zlib.MAX_WBITS) # One gzip member
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress_frame(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+def _frame_ends(data, target_bytes: int) -> list[int]:
+    """Returns frame end offsets, each at the first section marker past `target_bytes` of frame."""
+    ends = []
+    start = 0
+    while start < len(data):
+        marker = SECTION_MARKER.search(data, start + target_bytes) if start + target_bytes < len(data) else None
+        end = marker.start() if marker else len(data)
+        ends.append(end)
+        start = end
+    return ends
+
+
+def write_compressed_copy(md_path: Path, compression: str = None) -> Path | None:
+    """Writes a seekable compressed copy of a docs.md next to it.
+
+    The file is cut into frames of about FRAME_TARGET_BYTES, always at a
+    section boundary, and each frame is compressed independently: a gzip
+    member per frame (the concatenation is still a plain .gz file that
+    `gunzip` reads whole) or a zstd frame. `<file>.frames.json` maps each
+    frame's uncompressed range to its compressed one, so `read_range` can
+    return any section by decompressing only the frames it overlaps, like
+    the zstd seekable format. docs.md itself stays uncompressed, since
+    incremental builds and the indexes read byte ranges from it.
+
+    Args:
+        md_path: The docs.md to compress.
+        compression: "gzip" or "zstd"; defaults to OUTPUT_COMPRESSION.
+
+    Returns:
+        The path of the compressed file, or None if compression is off or failed.
+    """
+    compression = compression or OUTPUT_COMPRESSION
+    if not compression:
+        return None
+    if compression == "zstd" and not ZSTD_AVAILABLE:
+        print("Warning: the 'zstandard' package is not installed; compressing with gzip instead.")
+        compression = "gzip"
+    md_path = Path(md_path)
+    output_path = md_path.with_name(md_path.name + (".zst" if compression == "zstd" else ".gz"))
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    frames = []
+    try:
+        with open(md_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, open(temp_path, 'wb') as out:
+                start = compressed_offset = 0
+                for end in _frame_ends(data, FRAME_TARGET_BYTES):
+                    frame = _compress_frame(data[start:end], compression)
+                    out.write(frame)
+                    frames.append([start, end - start, compressed_offset, len(frame)])
+                    compressed_offset += len(frame)
+                    start = end
+                uncompressed_size = len(data)
+        os.replace(temp_path, output_path)
+        with open(output_path.with_name(output_path.name + FRAME_INDEX_SUFFIX), 'w', encoding='utf-8') as f:
+            json.dump({"version": FRAME_INDEX_VERSION, "compression": compression, "frames": frames}, f)
+    except OSError as e:
+        print(f"Error writing compressed copy of {md_path}: {e}")
+        temp_path.unlink(missing_ok=True)
+        return None
+    log(NORMAL, f"Wrote {output_path}: {uncompressed_size / 1024:.1f} KiB -> {compressed_offset / 1024:.1f} KiB "
+                f"({compressed_offset / uncompressed_size * 100:.1f}%) in {len(frames)} seekable frame(s).")
+    return output_path
+
+
+def read_range(compressed_path: Path, offset: int, length: int) -> bytes:
+    """Reads `length` bytes at uncompressed `offset` from a file written by `write_compressed_copy`.
+
+    Only the frames overlapping the range are read and decompressed, so a
+    manifest or chunk-index range (e.g. one page's section) costs about one
+    frame whatever the size of the whole file.
+    """
+    compressed_path = Path(compressed_path)
+    with open(compressed_path.with_name(compressed_path.name + FRAME_INDEX_SUFFIX), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    frames = index["frames"]
+    first = max(bisect.bisect_right([frame[0] for frame in frames], offset) - 1, 0)
+    parts = []
+    with open(compressed_path, 'rb') as f:
+        for start, size, compressed_offset, compressed_size in frames[first:]:
+            if start >= offset + length:
+                break
+            f.seek(compressed_offset)
+            parts.append(_decompress_frame(f.read(compressed_size), index["compression"]))
+    data = b"".join(parts)
+    skip = offset - frames[first][0] if frames else 0
+    return data[skip:skip + length]
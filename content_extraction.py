@@ -0,0 +1,72 @@
+# content_extraction.py
+from bs4 import BeautifulSoup
+
+# Elements that never carry documentation text
+NON_CONTENT_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'iframe', 'link', 'meta']
+# Page chrome that surrounds the article on most documentation sites
+BOILERPLATE_TAGS = ['nav', 'header', 'footer', 'aside', 'form', 'button']
+# Whole id and class tokens of elements that wrap page chrome; compounds such as
+# "table-header" or "nav-tabs" are content widgets and never match
+BOILERPLATE_NAMES = frozenset([
+    'nav', 'navbar', 'menu', 'sidebar', 'side-nav', 'breadcrumb', 'breadcrumbs', 'toc', 'table-of-contents',
+    'footer', 'header', 'banner', 'cookie', 'consent', 'skip-link', 'site-header', 'site-footer', 'feedback',
+    'edit-page', 'pagination',
+])
+# Never pruned, nor is any chrome element that holds one of them
+PRESERVED_TAGS = ['h1', 'table', 'pre', 'code']
+# Tried in order when no selector is configured for the source
+MAIN_CONTENT_SELECTORS = ['main', 'article', '[role="main"]', '#main-content', '.main-content', '#content', '.content']
+
+
+def has_boilerplate_name(class_names: list[str], element_id: str | None) -> bool:
+    """Tells whether any class name or the id is exactly one of `BOILERPLATE_NAMES`."""
+    return any(name.lower() in BOILERPLATE_NAMES for name in class_names) or (
+        element_id is not None and element_id.lower() in BOILERPLATE_NAMES)
+
+
+def _is_boilerplate(tag) -> bool:
+    if tag.attrs is None or tag.name in PRESERVED_TAGS:
+        return False
+    return has_boilerplate_name(tag.get('class', []), tag.get('id'))
+
+
+def extract_main_content(html_content: str, content_selector: str | None = None):
+    """Prunes a documentation page down to its main content.
+
+    Scripts, styles and other non-content elements are always removed. If
+    `content_selector` is given and matches, that element is the content.
+    Otherwise the first match of `MAIN_CONTENT_SELECTORS` is used, falling
+    back to the whole body; either way nav/header/footer/aside elements and
+    elements with an id or class token from `BOILERPLATE_NAMES` are stripped
+    from it, unless they contain the page's h1, a table, or code.
+
+    Args:
+        html_content: The full page HTML.
+        content_selector: Optional CSS selector for the main content element.
+
+    Returns:
+        The BeautifulSoup element holding the main content, ready to be passed
+        to `MarkdownConverter.convert_soup` without re-parsing.
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for tag in soup.find_all(NON_CONTENT_TAGS):
+        tag.decompose()
+
+    if content_selector:
+        selected = soup.select_one(content_selector)
+        if selected is not None:
+            return selected
+
+    root = None
+    for selector in MAIN_CONTENT_SELECTORS:
+        root = soup.select_one(selector)
+        if root is not None:
+            break
+    if root is None:
+        root = soup.body or soup
+
+    for tag in root.find_all(BOILERPLATE_TAGS) + root.find_all(_is_boilerplate):
+        # Page titles often sit in a <header> and examples in an <aside>; keep those
+        if not tag.decomposed and tag.find(PRESERVED_TAGS) is None:
+            tag.decompose()
+    return root
@@ -0,0 +1,124 @@
+# content_store.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+# --- Configuration Constants ---
+CONTENT_STORE_ENABLED = True
+CONTENT_STORE_DIR = ".content_store" # Relative to the working directory, like the HTTP cache
+CONTENT_STORE_MAX_BYTES = 256 * 1024 * 1024 # Compressed size per store; least recently used entries are evicted beyond it
+CONTENT_STORE_COMPRESSION_LEVEL = 6
+
+
+class ContentStore:
+    """A size-capped, content-addressed store of compressed text.
+
+    Callers pick the key, typically a hash of everything the value was
+    derived from, so an entry never goes stale: a changed input simply has a
+    different key. Values are zlib-compressed files named by their key, and
+    an SQLite index keeps their sizes and last access times for LRU eviction,
+    as in http_cache.HttpCache.
+    """
+
+    def __init__(self, store_dir: str, max_bytes: int = CONTENT_STORE_MAX_BYTES):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0 # Uncompressed bytes served from the store
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.store_dir / "index.sqlite3", check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, last_access REAL)")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get_text(self, key: str) -> str | None:
+        """Returns the text stored under `key`, or None if there is none."""
+        try:
+            text = zlib.decompress((self.store_dir / key).read_bytes()).decode('utf-8')
+        except (OSError, zlib.error, UnicodeDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(text)
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return text
+
+    def put_text(self, key: str, text: str):
+        """Stores `text` under `key`, evicting old entries if the store grows past max_bytes."""
+        data = zlib.compress(text.encode('utf-8'), CONTENT_STORE_COMPRESSION_LEVEL)
+        path = self.store_dir / key
+        temp_path = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        try:
+            temp_path.write_bytes(data)
+            temp_path.replace(path) # Readers never see a half-written entry
+        except OSError as e:
+            print(f"Error writing content store entry {path}: {e}")
+            return
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._total_bytes += len(data) - (previous[0] if previous else 0)
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, len(data), time.time()))
+            self._db.commit()
+        self._evict()
+
+    def _evict(self):
+        """Removes least recently used entries until the store fits in max_bytes."""
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                (self.store_dir / key).unlink(missing_ok=True)
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+            self._db.commit()
+
+    def summary(self, label: str) -> str:
+        """Returns a one-line hit/miss/bytes-saved summary."""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        return (f"{label}: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+                f"{self.bytes_saved / 1024:.1f} KiB reused, {self._total_bytes / 1024:.1f} KiB on disk")
+
+
+def content_key(content: str, settings: dict) -> str:
+    """Returns the store key for a value derived from `content` with `settings`.
+
+    Args:
+        content: The input, e.g. a page's raw HTML.
+        settings: Everything else the derived value depends on (converter
+            options and versions); must be JSON-serializable.
+    """
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(content.encode('utf-8', errors='surrogatepass'))
+    return digest.hexdigest()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(name: str) -> ContentStore | None:
+    """Returns the process-wide store `name` (e.g. "markdown"), or None if CONTENT_STORE_ENABLED is off."""
+    if not CONTENT_STORE_ENABLED:
+        return None
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = ContentStore(str(Path(CONTENT_STORE_DIR) / name))
+        return _stores[name]
+
+def print_content_store_stats():
+    """Prints statistics for every store used in the run."""
+    with _stores_lock:
+        for name, store in sorted(_stores.items()):
+            print(store.summary(f"Content store ({name})"))
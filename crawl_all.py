@@ -0,0 +1,160 @@
+# crawl_all.py
+import contextvars
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+import github_docs_crawler
+import link_crawler
+import sitemap_docs_crawler
+from content_store import print_content_store_stats
+from crawl_journal import print_write_stats
+from crawl_throttle import HostThrottle, RequestBudget, install_request_budget
+from crawl_metrics import NORMAL, log, print_metrics_summary
+from github_rate_limit import print_rate_limit_stats
+from http_cache import print_cache_stats
+from http_session import print_connection_stats
+
+# --- Configuration Constants ---
+MAX_PARALLEL_SOURCES = 4 # .knowledge sources crawled at the same time
+GLOBAL_MAX_IN_FLIGHT_REQUESTS = 16 # HTTP requests in flight across all sources
+GLOBAL_PER_HOST_CONCURRENCY = 4 # Shared by every source that hits the same host
+GLOBAL_PER_HOST_REQUESTS_PER_SECOND = 8
+GLOBAL_PER_HOST_BURST = 8
+GITHUB_API_PREFIX = "https://api.github.com/repos/"
+
+
+def discover_knowledge_files(root: Path = Path(".")) -> list[Path]:
+    """Returns every `*/.knowledge` file below `root`, sorted by path."""
+    return sorted(root.glob("*/.knowledge"))
+
+
+def detect_source_type(knowledge_file_path: Path) -> str | None:
+    """Tells whether a .knowledge file lists GitHub API roots or a sitemap.
+
+    Args:
+        knowledge_file_path: The path to the .knowledge file.
+
+    Returns:
+        "github" or "sitemap" based on the first URL in the file ("links" for
+        sitemap-less sources marked `# crawl-mode: links`), or None if the
+        file has no URL or cannot be read.
+    """
+    try:
+        with open(knowledge_file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                url = line.strip()
+                if not url or url.startswith('#'):
+                    continue
+                if url.startswith(GITHUB_API_PREFIX):
+                    return "github"
+                links_mode = sitemap_docs_crawler.get_knowledge_options(str(knowledge_file_path)).get("crawl-mode") == "links"
+                return "links" if links_mode else "sitemap"
+    except OSError as e:
+        print(f"Error reading knowledge file {knowledge_file_path}: {e}")
+    return None
+
+
+def crawl_source(knowledge_file_path: Path, source_type: str, budget: RequestBudget, github_headers: dict,
+                 conversion_pool: ProcessPoolExecutor | None = None) -> dict:
+    """Crawls one source with the matching crawler and measures it.
+
+    Sitemap and link sources convert pages on `conversion_pool`, which all
+    sources share, so parallel sources don't each start CONVERSION_WORKERS
+    processes.
+
+    Returns:
+        A dict with "source", "type", "ok", "error" (None, or the exception
+        that aborted the crawl), "seconds" and "requests".
+    """
+    name = knowledge_file_path.as_posix()
+    started_at = time.monotonic()
+    error = None
+    with budget.source(name):
+        log(NORMAL, f"\nProcessing knowledge file: {name} ({source_type})")
+        try:
+            if source_type == "github":
+                ok = github_docs_crawler.crawl_knowledge_file(name, github_headers)
+            elif source_type == "links":
+                ok = link_crawler.crawl_knowledge_file(name, {"User-Agent": sitemap_docs_crawler.DEFAULT_USER_AGENT},
+                                                       conversion_pool)
+            else:
+                ok = sitemap_docs_crawler.crawl_knowledge_file(name, {"User-Agent": sitemap_docs_crawler.DEFAULT_USER_AGENT},
+                                                               conversion_pool)
+        except Exception as e:
+            # One broken source must not take down the others or the summary
+            print(f"Error crawling {name}: {e!r}")
+            traceback.print_exc()
+            ok, error = False, f"{type(e).__name__}: {e}"
+    return {
+        "source": name,
+        "type": source_type,
+        "ok": ok,
+        "error": error,
+        "seconds": time.monotonic() - started_at,
+        "requests": budget.request_count(name),
+    }
+
+
+def main():
+    """
+    Crawls every */.knowledge source, GitHub and sitemap alike, in parallel.
+    """
+    sources = []
+    for knowledge_file_path in discover_knowledge_files():
+        source_type = detect_source_type(knowledge_file_path)
+        if source_type is None:
+            print(f"Skipping {knowledge_file_path}: no URL found.")
+            continue
+        if source_type in ("sitemap", "links") and not sitemap_docs_crawler.MARKDOWNIFY_AVAILABLE:
+            print(f"Skipping {knowledge_file_path}: the 'markdownify' library is not installed.")
+            continue
+        sources.append((knowledge_file_path, source_type))
+
+    if not sources:
+        print("No .knowledge sources found.")
+        return
+
+    print(f"Crawling {len(sources)} source(s), up to {MAX_PARALLEL_SOURCES} at a time:")
+    for knowledge_file_path, source_type in sources:
+        print(f"  - {knowledge_file_path} ({source_type})")
+
+    github_headers = github_docs_crawler.build_github_headers() if any(t == "github" for _, t in sources) else {}
+    throttle = HostThrottle(GLOBAL_PER_HOST_CONCURRENCY, GLOBAL_PER_HOST_REQUESTS_PER_SECOND, GLOBAL_PER_HOST_BURST)
+    budget = RequestBudget(GLOBAL_MAX_IN_FLIGHT_REQUESTS, throttle)
+    install_request_budget(budget)
+
+    needs_conversion = any(source_type in ("sitemap", "links") for _, source_type in sources)
+    started_at = time.monotonic()
+    try:
+        # Started before the source threads, and never by forking them (see create_conversion_pool)
+        with ((needs_conversion and sitemap_docs_crawler.create_conversion_pool()) or nullcontext()) as conversion_pool, \
+             ThreadPoolExecutor(max_workers=MAX_PARALLEL_SOURCES) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, crawl_source, path, source_type, budget, github_headers,
+                                conversion_pool)
+                for path, source_type in sources
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        install_request_budget(None)
+
+    print("\n--- Crawl summary ---")
+    for result in results:
+        status = "ok" if result["ok"] else "FAILED"
+        print(f"  {result['source']:<32} {result['type']:<8} {status:<7} {result['seconds']:8.1f}s  {result['requests']:6} requests")
+        if result["error"]:
+            print(f"      {result['error']}")
+    print(f"Total wall time: {time.monotonic() - started_at:.1f}s")
+    print_rate_limit_stats()
+    print_cache_stats()
+    print_content_store_stats()
+    print_write_stats()
+    print_connection_stats()
+    print_metrics_summary()
+
+
+if __name__ == "__main__":
+    main()
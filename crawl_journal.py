@@ -0,0 +1,222 @@
+# crawl_journal.py
+import io
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# --- Configuration Constants ---
+OUTPUT_BUFFER_BYTES = 1024 * 1024 # Output is written to disk in chunks of this size rather than per page
+JOURNAL_SYNC_EVERY_ENTRIES = 50 # Completed entries between checkpoints (fsync of output and journal)
+JOURNAL_SYNC_INTERVAL_SECONDS = 5.0 # ... or sooner once this much time has passed since the last one
+
+
+class WriteStats:
+    """Counts write syscalls, bytes written and fsyncs of the crawl outputs."""
+
+    def __init__(self):
+        self.write_calls = 0
+        self.bytes_written = 0
+        self.fsyncs = 0
+        self._lock = threading.Lock()
+
+    def record_write(self, size: int):
+        with self._lock:
+            self.write_calls += 1
+            self.bytes_written += size
+
+    def record_fsync(self):
+        with self._lock:
+            self.fsyncs += 1
+
+    def summary(self) -> str:
+        """Returns a one-line summary."""
+        average = self.bytes_written / self.write_calls if self.write_calls else 0.0
+        return (f"Output writes: {self.bytes_written / 1024:.1f} KiB in {self.write_calls} write syscall(s) "
+                f"({average / 1024:.1f} KiB each), {self.fsyncs} fsync(s)")
+
+
+_write_stats = WriteStats()
+
+
+class _CountingFileIO(io.FileIO):
+    """A raw file that records every write() syscall in the write statistics."""
+
+    def write(self, data) -> int:
+        written = super().write(data)
+        _write_stats.record_write(written or 0)
+        return written
+
+
+def open_output(path: Path, mode: str, buffer_bytes: int = OUTPUT_BUFFER_BYTES):
+    """Opens a crawl output file with a large write buffer and syscall accounting.
+
+    Args:
+        path: The file to open.
+        mode: 'w', 'a', 'wb' or 'ab'; text modes use UTF-8.
+        buffer_bytes: Size of the write buffer.
+
+    Returns:
+        A binary or text file object, as `open()` would return.
+    """
+    raw = _CountingFileIO(path, mode.replace('b', ''))
+    buffered = io.BufferedWriter(raw, buffer_size=buffer_bytes)
+    return buffered if 'b' in mode else io.TextIOWrapper(buffered, encoding='utf-8')
+
+def fsync(handle):
+    """Flushes `handle` and forces it to disk, counting the fsync."""
+    handle.flush()
+    os.fsync(handle.fileno())
+    _write_stats.record_fsync()
+
+def print_write_stats():
+    """Prints output write statistics for the run, if anything was written."""
+    if _write_stats.write_calls:
+        print(_write_stats.summary())
+
+
+class CrawlJournal:
+    """A crash-safe checkpoint journal for one crawler output file.
+
+    While a crawl runs, output goes to `<output>.partial` and every completed
+    unit of work (a page or file written to the output) is recorded in
+    `<output>.journal` as one JSON line. Each line records the byte size of
+    the partial output at that point, so a restarted run can cut off anything
+    written after the last completed entry, skip the keys already journaled
+    and carry on appending. The final output only replaces `<output>` once
+    `finish()` is called.
+
+    Entries are checkpointed in batches: the output is fsync'd, then the
+    entries completed since the last checkpoint are appended to the journal
+    and fsync'd, every `sync_every` entries or `sync_interval` seconds. A
+    crash loses at most the uncheckpointed entries, which the next run redoes.
+
+    The first journal line holds a fingerprint of the crawl configuration; a
+    journal whose fingerprint doesn't match is discarded instead of resumed.
+    """
+
+    HEADER_KEY = "__header__"
+
+    def __init__(self, output_path: Path, fingerprint: str, sync_every: int = JOURNAL_SYNC_EVERY_ENTRIES,
+                 sync_interval: float = JOURNAL_SYNC_INTERVAL_SECONDS):
+        self.output_path = Path(output_path)
+        self.partial_path = self.output_path.with_name(self.output_path.name + ".partial")
+        self.journal_path = self.output_path.with_name(self.output_path.name + ".journal")
+        self.fingerprint = fingerprint
+        self.entries = {} # key -> info dict recorded with the entry
+        self.resumed = False
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._output_handle = None
+        self._journal_handle = None
+        self._unsynced = [] # Journal records waiting for the next checkpoint
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _load(self) -> int | None:
+        """Reads an existing journal. Returns the partial output size to keep, or None."""
+        if not self.journal_path.is_file() or not self.partial_path.is_file():
+            return None
+        end_offset = 0
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]).get("fingerprint") != self.fingerprint:
+                print(f"Existing journal {self.journal_path} is for a different crawl configuration; starting over.")
+                return None
+        except ValueError:
+            return None
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break # A torn final line from a crash mid-append
+            self.entries[entry["key"]] = entry.get("info", {})
+            end_offset = entry["end"]
+        return end_offset
+
+    def start(self, binary: bool = False):
+        """Opens the partial output, resuming from the journal if possible.
+
+        Args:
+            binary: Open the output in binary mode instead of UTF-8 text mode.
+
+        Returns:
+            The open output file handle, positioned after the last completed
+            entry. Callers write their header only if
+            `is_done(CrawlJournal.HEADER_KEY)` is False, then call
+            `mark_header_written()`.
+        """
+        keep_bytes = self._load()
+        if keep_bytes is not None:
+            os.truncate(self.partial_path, keep_bytes)
+            self.resumed = True
+            print(f"Resuming from journal {self.journal_path}: {len(self.entries)} completed item(s).")
+            self._journal_handle = open(self.journal_path, 'a', encoding='utf-8')
+            mode = 'ab' if binary else 'a'
+        else:
+            self.entries = {}
+            self._journal_handle = open(self.journal_path, 'w', encoding='utf-8')
+            self._append({"fingerprint": self.fingerprint})
+            mode = 'wb' if binary else 'w'
+        self._output_handle = open_output(self.partial_path, mode)
+        return self._output_handle
+
+    def _append(self, record: dict):
+        self._journal_handle.write(json.dumps(record) + "\n")
+        fsync(self._journal_handle)
+
+    def _checkpoint(self):
+        """Makes the output durable, then the journal records that describe it. Caller holds the lock."""
+        if not self._unsynced:
+            return
+        fsync(self._output_handle)
+        self._journal_handle.write("".join(json.dumps(record) + "\n" for record in self._unsynced))
+        fsync(self._journal_handle)
+        self._unsynced = []
+        self._last_sync = time.monotonic()
+
+    def mark_header_written(self):
+        """Checkpoints the output header so a resume before any entry keeps it."""
+        with self._lock:
+            self._unsynced.append({"key": self.HEADER_KEY, "end": self._output_handle.tell()})
+            self.entries[self.HEADER_KEY] = {}
+            self._checkpoint()
+
+    def is_done(self, key: str) -> bool:
+        """Returns True if `key` was completed by this or a previous run."""
+        return key in self.entries
+
+    def mark_done(self, key: str, **info):
+        """Records `key` as completed once its output has been written.
+
+        Args:
+            key: A unique identifier for the unit of work (URL, path, ...).
+            **info: Extra JSON-serialisable data returned in `entries` on resume.
+        """
+        with self._lock:
+            self._unsynced.append({"key": key, "end": self._output_handle.tell(), "info": info})
+            self.entries[key] = info
+            if len(self._unsynced) >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._checkpoint()
+
+    def finish(self):
+        """Closes the output, moves it into place atomically and drops the journal."""
+        fsync(self._output_handle) # Durable before it replaces the previous output
+        self._output_handle.close()
+        self._journal_handle.close()
+        os.replace(self.partial_path, self.output_path)
+        self.journal_path.unlink(missing_ok=True)
+
+    def close(self):
+        """Checkpoints and closes the files but keeps the partial output and journal for a later resume."""
+        if self._output_handle and not self._output_handle.closed:
+            with self._lock:
+                try:
+                    self._checkpoint()
+                except (OSError, ValueError) as e:
+                    print(f"Error checkpointing journal {self.journal_path}: {e}")
+            self._output_handle.close()
+        if self._journal_handle and not self._journal_handle.closed:
+            self._journal_handle.close()
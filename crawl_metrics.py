@@ -0,0 +1,253 @@
+# crawl_metrics.py
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+
+# --- Configuration Constants ---
+QUIET, NORMAL, VERBOSE = 0, 1, 2 # Log levels: errors and summaries / per-source progress / per-request lines
+LOG_LEVEL = int(os.environ.get("CRAWL_LOG_LEVEL", NORMAL))
+METRICS_JSONL_PATH = os.environ.get("CRAWL_METRICS_JSONL") # One JSON line per finished span; unset disables
+METRICS_PROMETHEUS_PATH = os.environ.get("CRAWL_METRICS_PROMETHEUS") # Prometheus text dump at end of run
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(9)) # 1 KiB .. 64 MiB
+
+
+def log(level: int, message: str, *args):
+    """Prints `message % args` if `level` is enabled.
+
+    Formatting is deferred until the level check passes, so per-request
+    messages cost one comparison when they are filtered out.
+    """
+    if level <= LOG_LEVEL:
+        print(message % args if args else message)
+
+def log_enabled(level: int) -> bool:
+    """Tells whether messages at `level` are printed, to skip building costly ones."""
+    return level <= LOG_LEVEL
+
+def set_log_level(level: int):
+    """Changes the log level for the rest of the run."""
+    global LOG_LEVEL
+    LOG_LEVEL = level
+
+
+class Histogram:
+    """A fixed-bucket histogram, as in Prometheus; quantiles are interpolated within buckets."""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # The last slot is the +Inf bucket
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+_current_span = contextvars.ContextVar("crawl_span", default=None)
+
+
+class Span:
+    """One timed operation (an HTTP request, a page fetch, ...) with attributes and sub-timings.
+
+    Use as a context manager; the wall time of the body is recorded as
+    `total`, and named phases can be added with `add()` or `phase()`. While
+    the span is open it is the current span of its context, so lower layers
+    (e.g. connection setup in http_session) can attach timings to it.
+    """
+
+    __slots__ = ("name", "attrs", "timings", "_started_at", "_token")
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.timings = {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, phase: str, seconds: float):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def phase(self, phase: str):
+        return _PhaseTimer(self, phase)
+
+    def elapsed(self) -> float:
+        """Seconds since the span was entered."""
+        return time.perf_counter() - self._started_at
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timings["total"] = time.perf_counter() - self._started_at
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs.setdefault("error", exc_type.__name__)
+        get_metrics().finish_span(self)
+        return False
+
+
+class _PhaseTimer:
+    __slots__ = ("span", "name", "started_at")
+
+    def __init__(self, span: Span, name: str):
+        self.span, self.name = span, name
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.span.add(self.name, time.perf_counter() - self.started_at)
+        return False
+
+
+def current_span() -> Span | None:
+    """Returns the innermost open span of the calling context, if any."""
+    return _current_span.get()
+
+
+class CrawlMetrics:
+    """Aggregates finished spans into histograms and counters for the run.
+
+    Every span phase becomes a `<span>_<phase>_seconds` histogram and a
+    `bytes` attribute a `<span>_bytes` one; a `status` or `error` attribute
+    is counted in `<span>_total`. Spans are also appended to the JSON-lines
+    file at METRICS_JSONL_PATH when it is set.
+    """
+
+    def __init__(self, jsonl_path: str | None = METRICS_JSONL_PATH):
+        self._histograms = {} # (name, labels) -> Histogram
+        self._counters = {} # (name, labels) -> int
+        self._lock = threading.Lock()
+        self._jsonl = open(jsonl_path, 'a', encoding='utf-8') if jsonl_path else None
+
+    def observe(self, name: str, value: float, buckets: tuple = SECONDS_BUCKETS, **labels):
+        """Adds `value` to the histogram `name` with the given labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def count(self, name: str, amount: int = 1, **labels):
+        """Increments the counter `name` with the given labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def finish_span(self, span: Span):
+        """Records a finished span."""
+        for phase, seconds in span.timings.items():
+            self.observe(f"{span.name}_{phase}_seconds", seconds)
+        if "bytes" in span.attrs:
+            self.observe(f"{span.name}_bytes", span.attrs["bytes"], BYTES_BUCKETS)
+        self.count(f"{span.name}_total", outcome=str(span.attrs.get("error", span.attrs.get("status", "ok"))))
+        if self._jsonl is not None:
+            line = json.dumps({"span": span.name, "time": time.time(), **span.attrs,
+                               **{f"{phase}_ms": round(seconds * 1000, 3) for phase, seconds in span.timings.items()}})
+            with self._lock:
+                self._jsonl.write(line + "\n")
+                self._jsonl.flush()
+
+    def summary(self) -> str:
+        """Returns a multi-line report of every histogram (count, p50, p90, p99, max) and counter."""
+        lines = []
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                label_text = "".join(f" {key}={label_value}" for key, label_value in labels)
+                if name.endswith("_bytes"):
+                    unit, scale = "KiB", 1 / 1024
+                else:
+                    unit, scale = "ms", 1000
+                lines.append(f"  {name + label_text:<40} n={histogram.count:<6} "
+                             + " ".join(f"p{int(q * 100)}={histogram.quantile(q) * scale:.1f}" for q in (0.5, 0.9, 0.99))
+                             + f" max={histogram.max * scale:.1f} {unit}")
+            for (name, labels), value in sorted(self._counters.items()):
+                label_text = "".join(f" {key}={label_value}" for key, label_value in labels)
+                lines.append(f"  {name + label_text:<40} {value}")
+        return "\n".join(lines)
+
+    def prometheus_text(self) -> str:
+        """Renders all histograms and counters in the Prometheus text exposition format.
+
+        Each metric family gets one `# TYPE` line followed by all of its label sets.
+        """
+        def render_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}" if pairs else ""
+
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = []
+        with self._lock:
+            families = {}
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                families.setdefault(name, []).append((labels, histogram))
+            for name, series in families.items():
+                metric = f"crawl_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in series:
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += bucket_count
+                        lines.append(f"{metric}_bucket{render_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_sum{render_labels(labels)} {histogram.sum}")
+                    lines.append(f"{metric}_count{render_labels(labels)} {histogram.count}")
+            families = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                families.setdefault(name, []).append((labels, value))
+            for name, series in families.items():
+                lines.append(f"# TYPE crawl_{name} counter")
+                for labels, value in series:
+                    lines.append(f"crawl_{name}{render_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> CrawlMetrics:
+    """Returns the process-wide metrics, creating them on first use."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = CrawlMetrics()
+        return _metrics
+
+def print_metrics_summary():
+    """Prints the end-of-run histograms and writes the Prometheus dump, if metrics were recorded."""
+    if _metrics is None:
+        return
+    print("Metrics:\n" + _metrics.summary())
+    if METRICS_PROMETHEUS_PATH:
+        try:
+            with open(METRICS_PROMETHEUS_PATH, 'w', encoding='utf-8') as f:
+                f.write(_metrics.prometheus_text())
+            print(f"Wrote Prometheus metrics to {METRICS_PROMETHEUS_PATH}")
+        except OSError as e:
+            print(f"Error writing Prometheus metrics to {METRICS_PROMETHEUS_PATH}: {e}")
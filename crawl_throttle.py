@@ -0,0 +1,218 @@
+# crawl_throttle.py
+import contextvars
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit
+
+from crawl_metrics import get_metrics
+
+
+class TokenBucket:
+    """A thread-safe token bucket used to cap the request rate to a host.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    `acquire()` blocks until a token is available, so callers are spread
+    out evenly instead of sleeping a fixed amount after every request.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until one token can be taken from the bucket."""
+        if self.rate <= 0: # A non-positive rate means "unlimited"
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class HostThrottle:
+    """Per-host politeness budget: a concurrency cap plus a token-bucket rate.
+
+    Every host gets its own semaphore and bucket, created lazily the first
+    time a URL for that host goes through `slot()`.
+    """
+
+    def __init__(self, max_concurrency_per_host: int, requests_per_second: float, burst: float = 1.0):
+        self.max_concurrency_per_host = max(1, max_concurrency_per_host)
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._semaphores = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host: str):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.Semaphore(self.max_concurrency_per_host)
+                self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            return self._semaphores[host], self._buckets[host]
+
+    def limit_host_rate(self, host: str, requests_per_second: float):
+        """Lowers the request rate for one host, e.g. to honour a robots.txt Crawl-delay.
+
+        Has no effect if the host is already limited to that rate or slower.
+        """
+        host = host.lower()
+        self._host_state(host)
+        with self._lock:
+            current = self._buckets[host].rate
+            if current <= 0 or requests_per_second < current:
+                self._buckets[host] = TokenBucket(requests_per_second, 1.0)
+
+    @contextmanager
+    def slot(self, url: str):
+        """Context manager that holds a per-host request slot for `url`.
+
+        Args:
+            url: The URL about to be requested; only its host is used.
+        """
+        semaphore, bucket = self._host_state(urlsplit(url).netloc.lower())
+        with semaphore:
+            bucket.acquire()
+            yield
+
+
+class ThroughputCounter:
+    """Counts pages and bytes fetched so crawl speed can be tuned."""
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes = 0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, num_bytes: int):
+        """Records one fetched page of `num_bytes` bytes."""
+        with self._lock:
+            self.pages += 1
+            self.bytes += num_bytes
+
+    def summary(self) -> str:
+        """Returns a one-line pages/sec and bytes/sec summary."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return (f"{self.pages} pages, {self.bytes} bytes in {elapsed:.1f}s "
+                f"({self.pages / elapsed:.2f} pages/sec, {self.bytes / elapsed / 1024:.1f} KiB/sec)")
+
+
+class StageTimings:
+    """Accumulates busy time per pipeline stage to show where a crawl spends it.
+
+    Stage names are free-form ("fetch", "convert", "write", ...). Comparing each
+    stage's busy time divided by its worker count shows which stage limits the
+    pipeline, e.g. network-bound (fetch) vs CPU-bound (convert). Every sample
+    also goes into the run's `stage_seconds` histogram (see crawl_metrics).
+    """
+
+    def __init__(self):
+        self._seconds = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        """Adds `seconds` of busy time to `stage`."""
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+        get_metrics().observe("stage_seconds", seconds, stage=stage)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Context manager that adds the wall time of its body to `stage`."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started_at)
+
+    def summary(self, workers: dict = None) -> str:
+        """Returns a multi-line per-stage timing report.
+
+        Args:
+            workers: Optional {stage: worker count}; stages with workers also
+                report their per-worker load, and the busiest one is named.
+        """
+        workers = workers or {}
+        lines = []
+        loads = {}
+        with self._lock:
+            for stage, seconds in self._seconds.items():
+                count = self._counts[stage]
+                line = f"  {stage:<14} {seconds:9.2f}s total, {seconds / count * 1000:8.1f} ms avg over {count}"
+                if stage in workers:
+                    loads[stage] = seconds / max(workers[stage], 1)
+                    line += f", {loads[stage]:.2f}s per worker ({workers[stage]} workers)"
+                lines.append(line)
+        if loads:
+            lines.append(f"  Busiest stage: {max(loads, key=loads.get)}")
+        return "\n".join(lines)
+
+
+_current_source = contextvars.ContextVar("crawl_source", default=None)
+
+
+class RequestBudget:
+    """A process-wide request budget shared by every source being crawled.
+
+    Caps the total number of HTTP requests in flight across all sources and
+    applies one `HostThrottle`, so sources that hit the same host (e.g. several
+    GitHub repos on api.github.com) share its politeness budget. Requests are
+    attributed to the source set with `source()` in the calling context; use
+    `contextvars.copy_context().run` to carry it into worker threads.
+    """
+
+    def __init__(self, max_in_flight: int, throttle: HostThrottle):
+        self.throttle = throttle
+        self._in_flight = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def source(self, name: str):
+        """Attributes requests made in this context to the source `name`."""
+        token = _current_source.set(name)
+        try:
+            yield
+        finally:
+            _current_source.reset(token)
+
+    @contextmanager
+    def slot(self, url: str):
+        """Holds a global and a per-host request slot for `url`."""
+        with self._in_flight, self.throttle.slot(url):
+            with self._lock:
+                source = _current_source.get()
+                self._counts[source] = self._counts.get(source, 0) + 1
+            yield
+
+    def request_count(self, source: str) -> int:
+        """Returns the number of requests made on behalf of `source`."""
+        with self._lock:
+            return self._counts.get(source, 0)
+
+
+_request_budget = None
+
+def install_request_budget(budget: RequestBudget | None):
+    """Makes `budget` apply to every request made through `request_slot`."""
+    global _request_budget
+    _request_budget = budget
+
+def request_slot(url: str):
+    """Returns a context manager holding a slot in the installed budget, if any."""
+    if _request_budget is None:
+        return nullcontext()
+    return _request_budget.slot(url)
@@ -0,0 +1,194 @@
+# docs_search.py
+import argparse
+import hashlib
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from chunked_output import iter_chunks
+
+# --- Configuration Constants ---
+SEARCH_INDEX_ENABLED = False # Crawlers refresh the index after rewriting a docs.md; `index` builds it on demand
+SEARCH_INDEX_PATH = ".docs_search.sqlite3"
+DEFAULT_RESULT_LIMIT = 10
+
+
+def open_search_index(index_path: str = SEARCH_INDEX_PATH) -> sqlite3.Connection:
+    """Opens (and creates if needed) the full-text search index.
+
+    `chunks` holds one row per heading-aware chunk (see chunked_output) with
+    its bundle, source marker, heading path, byte range and hash; `chunk_text`
+    is an FTS5 table over the chunk text sharing the same rowid, ranked with
+    BM25. `bundles` records the size/mtime/hash of each indexed docs.md so
+    unchanged bundles are skipped without being read.
+    """
+    db = sqlite3.connect(index_path)
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS bundles (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT);
+        CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY, bundle TEXT, source TEXT, heading TEXT,
+            offset INTEGER, length INTEGER, sha256 TEXT);
+        CREATE INDEX IF NOT EXISTS chunks_bundle ON chunks (bundle, sha256);
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunk_text USING fts5(body, tokenize = 'porter unicode61');
+    """)
+    return db
+
+
+def index_bundle(db: sqlite3.Connection, docs_path: Path) -> tuple[int, int, int]:
+    """Brings the index up to date with one docs.md.
+
+    Chunks are matched to existing rows by content hash: unchanged chunks only
+    get their offsets and headings refreshed, new chunks are tokenized and
+    inserted, and chunks that disappeared are deleted. A bundle whose size and
+    mtime are unchanged is not read at all.
+
+    Args:
+        db: An index opened with `open_search_index`.
+        docs_path: Path to the docs.md to index.
+
+    Returns:
+        (added, kept, removed) chunk counts.
+    """
+    docs_path = Path(docs_path)
+    bundle = docs_path.as_posix()
+    stat = docs_path.stat()
+    row = db.execute("SELECT size, mtime_ns, sha256 FROM bundles WHERE path = ?", (bundle,)).fetchone()
+    if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+        return 0, 0, 0
+
+    data = docs_path.read_bytes()
+    bundle_sha256 = hashlib.sha256(data).hexdigest()
+    if row and row[2] == bundle_sha256:
+        db.execute("UPDATE bundles SET size = ?, mtime_ns = ? WHERE path = ?", (stat.st_size, stat.st_mtime_ns, bundle))
+        db.commit()
+        return 0, 0, 0
+
+    existing = {} # sha256 -> list of row ids, so repeated chunks are matched one to one
+    for chunk_id, chunk_sha256 in db.execute("SELECT id, sha256 FROM chunks WHERE bundle = ?", (bundle,)):
+        existing.setdefault(chunk_sha256, []).append(chunk_id)
+
+    added = kept = 0
+    for chunk in iter_chunks(data):
+        chunk_bytes = data[chunk["offset"]:chunk["offset"] + chunk["length"]]
+        chunk_sha256 = hashlib.sha256(chunk_bytes).hexdigest()
+        values = (chunk["source"], " > ".join(chunk["heading_path"]), chunk["offset"], chunk["length"])
+        if existing.get(chunk_sha256):
+            chunk_id = existing[chunk_sha256].pop()
+            db.execute("UPDATE chunks SET source = ?, heading = ?, offset = ?, length = ? WHERE id = ?", values + (chunk_id,))
+            kept += 1
+        else:
+            cursor = db.execute(
+                "INSERT INTO chunks (bundle, source, heading, offset, length, sha256) VALUES (?, ?, ?, ?, ?, ?)",
+                (bundle,) + values + (chunk_sha256,),
+            )
+            db.execute("INSERT INTO chunk_text (rowid, body) VALUES (?, ?)",
+                       (cursor.lastrowid, chunk_bytes.decode('utf-8', errors='replace')))
+            added += 1
+
+    stale_ids = [(chunk_id,) for chunk_ids in existing.values() for chunk_id in chunk_ids]
+    db.executemany("DELETE FROM chunks WHERE id = ?", stale_ids)
+    db.executemany("DELETE FROM chunk_text WHERE rowid = ?", stale_ids)
+    db.execute("INSERT OR REPLACE INTO bundles VALUES (?, ?, ?, ?)", (bundle, stat.st_size, stat.st_mtime_ns, bundle_sha256))
+    db.commit()
+    return added, kept, len(stale_ids)
+
+
+def update_search_index(docs_paths: list, index_path: str = SEARCH_INDEX_PATH):
+    """Incrementally indexes the given docs.md files and prints what changed.
+
+    Args:
+        docs_paths: Paths of docs.md files to (re)index.
+        index_path: Path of the SQLite index.
+    """
+    try:
+        db = open_search_index(index_path)
+        for docs_path in docs_paths:
+            started_at = time.perf_counter()
+            added, kept, removed = index_bundle(db, docs_path)
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            if added or removed or kept:
+                print(f"Search index: {docs_path}: {added} added, {kept} unchanged, {removed} removed ({elapsed_ms:.0f} ms)")
+            else:
+                print(f"Search index: {docs_path} is up to date.")
+        db.close()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error updating search index {index_path}: {e}")
+
+
+def build_match_query(query: str) -> str:
+    """Turns free text into an FTS5 query that matches all of its words.
+
+    Every word is quoted, so punctuation and FTS5 operators in the input are
+    treated as plain text.
+    """
+    return " ".join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+
+def search(db: sqlite3.Connection, query: str, limit: int = DEFAULT_RESULT_LIMIT, bundle: str | None = None) -> list[dict]:
+    """Runs a BM25-ranked full-text query.
+
+    Args:
+        db: An index opened with `open_search_index`.
+        query: Free-text query.
+        limit: Maximum number of results.
+        bundle: Optional substring of the bundle path to restrict results to.
+
+    Returns:
+        Result dicts with "bundle", "source", "heading", "offset", "length",
+        "score" (lower is better, as in FTS5) and "snippet".
+    """
+    match_query = build_match_query(query)
+    if not match_query:
+        return []
+    sql = ("SELECT c.bundle, c.source, c.heading, c.offset, c.length, bm25(chunk_text) AS score,"
+           " snippet(chunk_text, 0, '[', ']', ' ... ', 12)"
+           " FROM chunk_text JOIN chunks c ON c.id = chunk_text.rowid"
+           " WHERE chunk_text MATCH ?")
+    params = [match_query]
+    if bundle:
+        sql += " AND c.bundle LIKE ?"
+        params.append(f"%{bundle}%")
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+    keys = ("bundle", "source", "heading", "offset", "length", "score", "snippet")
+    return [dict(zip(keys, row)) for row in db.execute(sql, params)]
+
+
+def main():
+    """Command-line entry point: `index` builds/refreshes the index, `query` searches it."""
+    parser = argparse.ArgumentParser(description="Full-text search over crawled docs.md bundles.")
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH, help="Path of the SQLite search index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    index_parser = subcommands.add_parser("index", help="Index docs.md files (default: */docs.md).")
+    index_parser.add_argument("paths", nargs="*", help="docs.md files to index.")
+    query_parser = subcommands.add_parser("query", help="Search the index.")
+    query_parser.add_argument("text", nargs="+", help="Words to search for.")
+    query_parser.add_argument("-k", "--limit", type=int, default=DEFAULT_RESULT_LIMIT, help="Number of results.")
+    query_parser.add_argument("--bundle", help="Only search bundles whose path contains this text, e.g. laravel.")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        paths = [Path(p) for p in args.paths] or sorted(Path(".").glob("*/docs.md"))
+        update_search_index(paths, args.index)
+        return
+
+    if not Path(args.index).is_file():
+        print(f"Error: Search index {args.index} not found. Run: python docs_search.py index")
+        sys.exit(1)
+    db = open_search_index(args.index)
+    started_at = time.perf_counter()
+    results = search(db, " ".join(args.text), args.limit, args.bundle)
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    for rank, result in enumerate(results, 1):
+        print(f"{rank:2}. {result['bundle']} :: {result['source']}")
+        if result["heading"]:
+            print(f"    {result['heading']}")
+        print(f"    bytes {result['offset']}+{result['length']}, score {result['score']:.2f}")
+        print(f"    {' '.join(result['snippet'].split())}")
+    print(f"\n{len(results)} result(s) in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+# docs_vectors.py
+import argparse
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+
+from chunked_output import iter_chunks, read_chunk
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# --- Configuration Constants ---
+VECTOR_INDEX_ENABLED = False # Crawlers refresh the vector index after rewriting a docs.md; `index` builds it on demand
+VECTOR_INDEX_DIR = ".docs_vectors"
+VECTOR_DIMENSIONS = 1024 # Hashed TF-IDF buckets; every chunk costs 4 bytes per dimension on disk
+VECTOR_INDEX_VERSION = 1 # Bump when tokenization or weighting changes; the index is then rebuilt
+VECTOR_QUERY_BLOCK_ROWS = 16384 # Matrix rows scored per batched product; bounds temporary memory
+HEADING_REPEAT = 2 # Words of a chunk's heading path count this many extra times, like a title field
+DEFAULT_RESULT_LIMIT = 10
+PREVIEW_CHARS = 160
+TOKEN_PATTERN = re.compile(r'\w\w+')
+
+
+def hashed_term_weights(text: str, dimensions: int = VECTOR_DIMENSIONS) -> dict[int, float]:
+    """Maps a text to sparse hashed term-frequency weights.
+
+    Words are lower-cased and hashed (crc32) into `dimensions` buckets with a
+    hash-derived sign, so colliding words tend to cancel out instead of
+    adding up. Term frequencies are sublinear (1 + log tf).
+    """
+    weights = {}
+    for token, count in Counter(TOKEN_PATTERN.findall(text.lower())).items():
+        token_hash = zlib.crc32(token.encode('utf-8'))
+        bucket = token_hash % dimensions
+        sign = 1.0 if token_hash & 0x80000000 else -1.0
+        weights[bucket] = weights.get(bucket, 0.0) + sign * (1.0 + math.log(count))
+    return weights
+
+
+def _row_vector(weights: dict[int, float], dimensions: int) -> array:
+    """Returns the L2-normalized dense float32 row for sparse weights."""
+    row = array('f', bytes(4 * dimensions))
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    if norm:
+        for bucket, weight in weights.items():
+            row[bucket] = weight / norm
+    return row
+
+
+class VectorIndex:
+    """A hashed TF-IDF vector index over the chunks of docs.md bundles.
+
+    Bundles are split with `chunked_output.iter_chunks` (at the source
+    markers and headings). Each chunk is one row of a float32 matrix in
+    `vectors.f32`, holding its L2-normalized hashed term frequencies (with
+    the heading path counted HEADING_REPEAT extra times); an
+    SQLite file next to it maps rows to bundle, source, heading and byte
+    range, and keeps the document frequency of every bucket. IDF is applied
+    at query time (the query is weighted with idf squared, which scores like
+    idf on both sides), so adding or removing chunks only touches their own
+    rows and the document frequencies, never the rest of the matrix.
+
+    Opening an index reads no vectors: the matrix is memory-mapped when
+    searched, so a loaded index costs milliseconds and the page cache.
+    """
+
+    def __init__(self, index_dir: str = VECTOR_INDEX_DIR, dimensions: int = VECTOR_DIMENSIONS):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.index_dir / "vectors.f32"
+        self.dimensions = dimensions
+        self._row_bytes = 4 * dimensions
+        self._db = sqlite3.connect(self.index_dir / "index.sqlite3", check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+            CREATE TABLE IF NOT EXISTS bundles (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT);
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY, bundle TEXT, source TEXT, heading TEXT,
+                offset INTEGER, length INTEGER, sha256 TEXT);
+            CREATE INDEX IF NOT EXISTS chunks_bundle ON chunks (bundle, sha256);
+            CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+        """)
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if meta.get("dimensions") != dimensions or meta.get("version") != VECTOR_INDEX_VERSION:
+            if meta:
+                print(f"Vector index {self.index_dir} was built with other settings; rebuilding it.")
+            self._reset()
+            meta = {}
+        self._document_frequency = array('i', meta["df"]) if "df" in meta else array('i', bytes(4 * dimensions))
+        self.vectors_path.touch(exist_ok=True)
+        self._live_rows = None # Cached (rows, bundles) of indexed chunks, for search
+
+    def _reset(self):
+        self._db.executescript("DELETE FROM bundles; DELETE FROM chunks; DELETE FROM free_rows; DELETE FROM meta;")
+        self._db.executemany("INSERT INTO meta VALUES (?, ?)", [("dimensions", self.dimensions),
+                                                               ("version", VECTOR_INDEX_VERSION)])
+        self._db.commit()
+        with open(self.vectors_path, 'wb'):
+            pass
+
+    @property
+    def row_count(self) -> int:
+        """Rows in the matrix, including free ones."""
+        try:
+            return self.vectors_path.stat().st_size // self._row_bytes
+        except OSError:
+            return 0
+
+    @property
+    def chunk_count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        """Bytes on disk: the matrix plus the SQLite metadata."""
+        return sum(path.stat().st_size for path in self.index_dir.iterdir() if path.is_file())
+
+    # --- Updates ---
+
+    def update_bundle(self, docs_path: Path) -> tuple[int, int, int]:
+        """Brings the index up to date with one docs.md.
+
+        As in docs_search.index_bundle, chunks are matched to existing rows
+        by content hash: unchanged chunks keep their vectors and only get
+        their offsets and headings refreshed, new chunks are vectorized into
+        free (or appended) rows, and the rows of chunks that disappeared are
+        freed. A bundle whose size and mtime are unchanged is not
+        read at all.
+
+        Returns:
+            (added, kept, removed) chunk counts.
+        """
+        docs_path = Path(docs_path)
+        bundle = docs_path.as_posix()
+        stat = docs_path.stat()
+        row = self._db.execute("SELECT size, mtime_ns, sha256 FROM bundles WHERE path = ?", (bundle,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return 0, 0, 0
+
+        data = docs_path.read_bytes()
+        bundle_sha256 = hashlib.sha256(data).hexdigest()
+        if row and row[2] == bundle_sha256:
+            self._db.execute("UPDATE bundles SET size = ?, mtime_ns = ? WHERE path = ?", (stat.st_size, stat.st_mtime_ns, bundle))
+            self._db.commit()
+            return 0, 0, 0
+
+        existing = {} # sha256 -> list of rows, so repeated chunks are matched one to one
+        for chunk_row, chunk_sha256 in self._db.execute("SELECT row, sha256 FROM chunks WHERE bundle = ?", (bundle,)):
+            existing.setdefault(chunk_sha256, []).append(chunk_row)
+        free_rows = [free_row for free_row, in self._db.execute("SELECT row FROM free_rows ORDER BY row DESC")]
+
+        added = kept = 0
+        next_row = self.row_count
+        with open(self.vectors_path, 'r+b') as vectors:
+            new_chunks = []
+            for chunk in iter_chunks(data):
+                chunk_bytes = data[chunk["offset"]:chunk["offset"] + chunk["length"]]
+                heading = " > ".join(chunk["heading_path"])
+                # The heading path is part of the vector, so a renamed parent heading re-vectorizes the chunk
+                chunk_sha256 = hashlib.sha256(heading.encode('utf-8') + b"\0" + chunk_bytes).hexdigest()
+                values = (chunk["source"], heading, chunk["offset"], chunk["length"])
+                if existing.get(chunk_sha256):
+                    self._db.execute("UPDATE chunks SET source = ?, heading = ?, offset = ?, length = ? WHERE row = ?",
+                                     values + (existing[chunk_sha256].pop(),))
+                    kept += 1
+                else:
+                    new_chunks.append((values, chunk_sha256, chunk_bytes))
+            stale_rows = [chunk_row for chunk_rows in existing.values() for chunk_row in chunk_rows]
+
+            for chunk_row in stale_rows:
+                vectors.seek(chunk_row * self._row_bytes)
+                self._count_buckets(array('f', vectors.read(self._row_bytes)), -1)
+            self._db.executemany("DELETE FROM chunks WHERE row = ?", [(chunk_row,) for chunk_row in stale_rows])
+
+            # New chunks only overwrite rows that were already free in the committed metadata, so an
+            # interrupted update never changes a vector the index still points at
+            for values, chunk_sha256, chunk_bytes in new_chunks:
+                text = chunk_bytes.decode('utf-8', errors='replace') + ("\n" + values[1]) * HEADING_REPEAT
+                vector = _row_vector(hashed_term_weights(text, self.dimensions), self.dimensions)
+                if free_rows:
+                    chunk_row = free_rows.pop()
+                else:
+                    chunk_row = next_row
+                    next_row += 1
+                vectors.seek(chunk_row * self._row_bytes)
+                vectors.write(vector.tobytes())
+                self._count_buckets(vector, 1)
+                self._db.execute("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (chunk_row, bundle) + values + (chunk_sha256,))
+                added += 1
+            vectors.flush()
+            os.fsync(vectors.fileno()) # Rows are on disk before the metadata that points at them
+
+        free_rows += stale_rows # Left as they are: search only scores rows of indexed chunks
+        self._db.execute("DELETE FROM free_rows")
+        self._db.executemany("INSERT INTO free_rows VALUES (?)", [(free_row,) for free_row in free_rows])
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('df', ?)", (self._document_frequency.tobytes(),))
+        self._db.execute("INSERT OR REPLACE INTO bundles VALUES (?, ?, ?, ?)", (bundle, stat.st_size, stat.st_mtime_ns, bundle_sha256))
+        self._db.commit()
+        self._live_rows = None
+        return added, kept, len(stale_rows)
+
+    def _count_buckets(self, vector: array, delta: int):
+        """Adds `delta` to the document frequency of every bucket the row uses."""
+        document_frequency = self._document_frequency
+        for bucket in [bucket for bucket, value in enumerate(vector) if value]:
+            document_frequency[bucket] += delta
+
+    # --- Queries ---
+
+    def _query_weights(self, query: str) -> dict[int, float]:
+        """Returns the sparse query vector: hashed term weights times idf squared, L2-normalized."""
+        chunk_count = max(self.chunk_count, 1)
+        weights = {}
+        for bucket, weight in hashed_term_weights(query, self.dimensions).items():
+            idf = math.log((1 + chunk_count) / (1 + self._document_frequency[bucket])) + 1.0
+            weights[bucket] = weight * idf * idf
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {bucket: weight / norm for bucket, weight in weights.items()} if norm else {}
+
+    def _load_live_rows(self, bundle: str | None) -> list[int]:
+        if self._live_rows is None:
+            self._live_rows = self._db.execute("SELECT row, bundle FROM chunks ORDER BY row").fetchall()
+        return [chunk_row for chunk_row, chunk_bundle in self._live_rows if not bundle or bundle in chunk_bundle]
+
+    def search(self, queries: list[str], limit: int = DEFAULT_RESULT_LIMIT, bundle: str | None = None) -> list[list[dict]]:
+        """Returns the `limit` chunks most similar to each query.
+
+        With NumPy, all queries are scored together: the memory-mapped matrix
+        is multiplied with the matrix of query vectors in blocks of
+        VECTOR_QUERY_BLOCK_ROWS rows, and the top k of every block are kept
+        with argpartition. Without NumPy, the few matrix columns each query
+        touches are summed in pure Python, which is slower but returns the
+        same ranking.
+
+        Args:
+            queries: Free-text queries.
+            limit: Results per query.
+            bundle: Optional substring of the bundle path to restrict results to.
+
+        Returns:
+            One list per query of result dicts with "bundle", "source",
+            "heading", "offset", "length", "row" and "score" (cosine-like,
+            higher is better).
+        """
+        query_weights = [self._query_weights(query) for query in queries]
+        rows = self._load_live_rows(bundle)
+        if not rows or limit <= 0:
+            return [[] for _ in queries]
+        if NUMPY_AVAILABLE:
+            ranked = self._rank_numpy(query_weights, rows, limit)
+        else:
+            ranked = self._rank_python(query_weights, rows, limit)
+
+        keys = ("bundle", "source", "heading", "offset", "length")
+        results = []
+        for matches in ranked:
+            query_results = []
+            for chunk_row, score in matches:
+                if score <= 0:
+                    break
+                values = self._db.execute("SELECT bundle, source, heading, offset, length FROM chunks WHERE row = ?",
+                                          (chunk_row,)).fetchone()
+                query_results.append(dict(zip(keys, values), row=chunk_row, score=score))
+            results.append(query_results)
+        return results
+
+    def _rank_numpy(self, query_weights: list[dict], rows: list[int], limit: int) -> list[list[tuple[int, float]]]:
+        matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.row_count, self.dimensions))
+        query_matrix = np.zeros((self.dimensions, len(query_weights)), dtype=np.float32)
+        for column, weights in enumerate(query_weights):
+            for bucket, weight in weights.items():
+                query_matrix[bucket, column] = weight
+        live = np.zeros(self.row_count, dtype=bool) # Free rows and rows of other bundles never match
+        live[rows] = True
+        candidate_rows, candidate_scores = [], []
+        for start in range(0, self.row_count, VECTOR_QUERY_BLOCK_ROWS):
+            end = min(start + VECTOR_QUERY_BLOCK_ROWS, self.row_count)
+            scores = matrix[start:end] @ query_matrix # (block rows, queries), read straight from the mapping
+            scores[~live[start:end]] = -np.inf
+            keep = min(limit, end - start)
+            top = np.argpartition(-scores, keep - 1, axis=0)[:keep]
+            candidate_rows.append(top + start)
+            candidate_scores.append(np.take_along_axis(scores, top, axis=0))
+        candidate_rows = np.concatenate(candidate_rows)
+        candidate_scores = np.concatenate(candidate_scores)
+        order = np.argsort(-candidate_scores, axis=0, kind='stable')[:limit]
+        return [[(int(candidate_rows[index, column]), float(candidate_scores[index, column])) for index in order[:, column]]
+                for column in range(len(query_weights))]
+
+    def _rank_python(self, query_weights: list[dict], rows: list[int], limit: int) -> list[list[tuple[int, float]]]:
+        ranked = []
+        with open(self.vectors_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            values = memoryview(mapped).cast('f')
+            try:
+                for weights in query_weights:
+                    scores = [0.0] * self.row_count
+                    for bucket, weight in weights.items():
+                        column = values[bucket::self.dimensions] # Strided view of one bucket over all rows
+                        for chunk_row in rows:
+                            scores[chunk_row] += weight * column[chunk_row]
+                        column.release()
+                    top = heapq.nlargest(limit, rows, key=scores.__getitem__)
+                    ranked.append([(chunk_row, scores[chunk_row]) for chunk_row in top])
+            finally:
+                values.release()
+        return ranked
+
+    def close(self):
+        self._db.close()
+
+
+_update_lock = threading.Lock()
+
+def update_vector_index(docs_paths: list, index_dir: str = VECTOR_INDEX_DIR):
+    """Incrementally indexes the given docs.md files and prints what changed.
+
+    Args:
+        docs_paths: Paths of docs.md files to (re)index.
+        index_dir: Directory of the vector index.
+    """
+    with _update_lock: # Sources crawled in parallel share the matrix file
+        try:
+            index = VectorIndex(index_dir)
+            for docs_path in docs_paths:
+                started_at = time.perf_counter()
+                added, kept, removed = index.update_bundle(docs_path)
+                elapsed_ms = (time.perf_counter() - started_at) * 1000
+                if added or removed or kept:
+                    print(f"Vector index: {docs_path}: {added} added, {kept} unchanged, {removed} removed ({elapsed_ms:.0f} ms)")
+                else:
+                    print(f"Vector index: {docs_path} is up to date.")
+            index.close()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error updating vector index {index_dir}: {e}")
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run_benchmark(index_dir: str, query_count: int, limit: int):
+    """Measures load time, query latency, batched throughput and index size.
+
+    Queries are headings that occur only once in the index, and each one is
+    expected to find its own chunk, which gives a rough retrieval quality
+    figure (hit@1, hit@k) next to the timings.
+    """
+    started_at = time.perf_counter()
+    index = VectorIndex(index_dir)
+    load_ms = (time.perf_counter() - started_at) * 1000
+    samples = index._db.execute("SELECT heading, row FROM chunks WHERE heading != '' ORDER BY row").fetchall()
+    samples = [(heading.rsplit(" > ", 1)[-1], chunk_row) for heading, chunk_row in samples]
+    heading_counts = Counter(heading.lower() for heading, _ in samples)
+    samples = [(heading, chunk_row) for heading, chunk_row in samples if heading_counts[heading.lower()] == 1]
+    samples = samples[::max(1, len(samples) // query_count)][:query_count]
+    if not samples:
+        print(f"Error: Vector index {index_dir} has no chunks with headings to query.")
+        return
+    queries = [heading for heading, _ in samples]
+
+    latencies = []
+    hits_at_1 = hits_at_k = 0
+    for (query, expected_row) in samples:
+        query_started_at = time.perf_counter()
+        results = index.search([query], limit)[0]
+        latencies.append((time.perf_counter() - query_started_at) * 1000)
+        result_rows = [result["row"] for result in results]
+        hits_at_1 += bool(result_rows[:1] == [expected_row])
+        hits_at_k += expected_row in result_rows
+    batch_started_at = time.perf_counter()
+    index.search(queries, limit)
+    batch_seconds = time.perf_counter() - batch_started_at
+
+    backend = "NumPy" if NUMPY_AVAILABLE else "pure Python (NumPy not installed)"
+    print(f"Vector index {index_dir}: {index.chunk_count} chunks, {index.row_count} rows x {index.dimensions} dims, "
+          f"{index.size_bytes() / 1024 / 1024:.1f} MiB on disk, opened in {load_ms:.1f} ms; scoring with {backend}")
+    print(f"{len(samples)} queries, one at a time: p50 {_percentile(latencies, 0.5):.2f} ms, "
+          f"p99 {_percentile(latencies, 0.99):.2f} ms")
+    print(f"Batched: {len(queries) / max(batch_seconds, 1e-9):.0f} queries/s ({batch_seconds * 1000:.1f} ms for the batch)")
+    print(f"Heading self-retrieval: hit@1 {hits_at_1 / len(samples):.1%}, hit@{limit} {hits_at_k / len(samples):.1%}")
+    index.close()
+
+
+def main():
+    """Command-line entry point: `index` builds/refreshes the index, `query` searches it, `bench` measures it."""
+    parser = argparse.ArgumentParser(description="Hashed TF-IDF vector search over crawled docs.md bundles.")
+    parser.add_argument("--index", default=VECTOR_INDEX_DIR, help="Directory of the vector index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    index_parser = subcommands.add_parser("index", help="Index docs.md files (default: */docs.md).")
+    index_parser.add_argument("paths", nargs="*", help="docs.md files to index.")
+    query_parser = subcommands.add_parser("query", help="Find the sections most relevant to a query.")
+    query_parser.add_argument("text", nargs="+", help="The query.")
+    query_parser.add_argument("-k", "--limit", type=int, default=DEFAULT_RESULT_LIMIT, help="Number of results.")
+    query_parser.add_argument("--bundle", help="Only search bundles whose path contains this text, e.g. laravel.")
+    bench_parser = subcommands.add_parser("bench", help="Measure query latency and index size.")
+    bench_parser.add_argument("--queries", type=int, default=200, help="Number of sample queries.")
+    bench_parser.add_argument("-k", "--limit", type=int, default=DEFAULT_RESULT_LIMIT, help="Results per query.")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        paths = [Path(p) for p in args.paths] or sorted(Path(".").glob("*/docs.md"))
+        update_vector_index(paths, args.index)
+        return
+
+    if not (Path(args.index) / "vectors.f32").is_file():
+        print(f"Error: Vector index {args.index} not found. Run: python docs_vectors.py index")
+        sys.exit(1)
+    if args.command == "bench":
+        run_benchmark(args.index, args.queries, args.limit)
+        return
+    index = VectorIndex(args.index)
+    started_at = time.perf_counter()
+    results = index.search([" ".join(args.text)], args.limit, args.bundle)[0]
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    for rank, result in enumerate(results, 1):
+        print(f"{rank:2}. {result['bundle']} :: {result['source']}")
+        if result["heading"]:
+            print(f"    {result['heading']}")
+        print(f"    bytes {result['offset']}+{result['length']}, score {result['score']:.3f}")
+        try:
+            preview = " ".join(read_chunk(Path(result["bundle"]), result["offset"], result["length"]).split())
+            print(f"    {preview[:PREVIEW_CHARS]}")
+        except (OSError, ValueError, UnicodeDecodeError):
+            pass # The bundle changed since it was indexed; rerun `index`
+    print(f"\n{len(results)} result(s) in {elapsed_ms:.2f} ms")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
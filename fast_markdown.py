@@ -0,0 +1,657 @@
+# fast_markdown.py
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+from content_extraction import (BOILERPLATE_TAGS, MAIN_CONTENT_SELECTORS, NON_CONTENT_TAGS, PRESERVED_TAGS,
+                                has_boilerplate_name)
+
+# --- Configuration Constants ---
+# Output follows markdownify's defaults (underlined h1/h2, '*+-' bullets,
+# fenced code, '*'/'_' escaping) so both engines produce the same docs.md.
+BULLETS = '*+-'
+STRONG_MARKUP = '**'
+EMPHASIS_MARKUP = '*'
+STRIKETHROUGH_MARKUP = '~~'
+LINE_BREAK = '  \n'
+
+# Elements html.parser-based BeautifulSoup treats as closed on the start tag
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+                 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+                 'nextid', 'spacer'}
+# Whitespace next to (or just inside) these elements is dropped, as in markdownify
+BLOCK_ELEMENTS = {'p', 'blockquote', 'article', 'div', 'section', 'ol', 'ul', 'li', 'dl', 'dt', 'dd',
+                  'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th'}
+
+# Named references as BeautifulSoup resolves them (the same table as its EntitySubstitution)
+HTML_ENTITIES = {name[:-1]: value for name, value in html5.items() if name.endswith(';')}
+
+re_heading = re.compile(r'h(\d+)')
+re_whitespace = re.compile(r'[\t ]+')
+re_all_whitespace = re.compile(r'[\t \r\n]+')
+re_newline_whitespace = re.compile(r'[\t \r\n]*[\r\n][\t \r\n]*')
+re_extract_newlines = re.compile(r'^(\n*)((?:.*[^\n])?)(\n*)$', flags=re.DOTALL)
+re_line_with_content = re.compile(r'^(.*)', flags=re.MULTILINE)
+re_simple_selector = re.compile(
+    r'#([\w-]+)|\.([\w-]+)|\[\s*([\w-]+)\s*(?:=\s*("[^"]*"|\'[^\']*\'|[\w-]+)\s*)?\]')
+
+
+def _decode_charref(name: str) -> str:
+    """Decodes a numeric character reference the way BeautifulSoup's html.parser builder does.
+
+    Code points below 256 are read as windows-1252 (so `&#147;` is a curly
+    quote, as browsers show it), others with chr(); out-of-range numbers
+    become U+FFFD. Unlike html.unescape, `&#0;` and surrogates such as
+    `&#xD800;` are passed through unchanged.
+    """
+    code_point = int(name[1:], 16) if name[:1] in 'xX' else int(name)
+    if code_point < 256:
+        try:
+            return bytes([code_point]).decode('windows-1252')
+        except UnicodeDecodeError:
+            pass
+    try:
+        return chr(code_point)
+    except (ValueError, OverflowError):
+        return '\N{REPLACEMENT CHARACTER}'
+
+
+class UnsupportedSelectorError(ValueError):
+    """Raised for CSS selectors outside the subset `parse_selector` understands."""
+
+
+def parse_selector(selector: str) -> list[tuple]:
+    """Parses a CSS selector into compounds matched against open elements.
+
+    Supported: type selectors, `#id`, `.class`, `[attr]`, `[attr="value"]`,
+    compounds of these and the descendant combinator (whitespace), which
+    covers MAIN_CONTENT_SELECTORS and typical `content-selector` options.
+
+    Returns:
+        One (tag, id, classes, attributes) tuple per compound, outermost first.
+
+    Raises:
+        UnsupportedSelectorError: For combinators, pseudo-classes, selector
+            lists and anything else, so the caller can fall back to a full
+            DOM engine.
+    """
+    compounds = []
+    for token in selector.split():
+        match = re.match(r'([a-zA-Z][\w-]*|\*)?', token)
+        tag = match.group(1).lower() if match.group(1) and match.group(1) != '*' else None
+        element_id = None
+        classes = []
+        attributes = []
+        position = match.end()
+        for part in re_simple_selector.finditer(token, position):
+            if part.start() != position:
+                break
+            if part.group(1):
+                element_id = part.group(1)
+            elif part.group(2):
+                classes.append(part.group(2))
+            else:
+                value = part.group(4)
+                if value is not None and value[:1] in ('"', "'"):
+                    value = value[1:-1]
+                attributes.append((part.group(3).lower(), value))
+            position = part.end()
+        if position != len(token) or not token or (tag is None and match.group(1) != '*'
+                                                    and not (element_id or classes or attributes)):
+            raise UnsupportedSelectorError(f"Unsupported CSS selector for the streaming converter: {selector!r}")
+        compounds.append((tag, element_id, classes, attributes))
+    if not compounds:
+        raise UnsupportedSelectorError(f"Empty CSS selector: {selector!r}")
+    return compounds
+
+
+def _matches_compound(compound: tuple, tag: str, attrs: dict) -> bool:
+    compound_tag, element_id, classes, attributes = compound
+    if compound_tag is not None and compound_tag != tag:
+        return False
+    if element_id is not None and attrs.get('id') != element_id:
+        return False
+    if classes and not set(classes).issubset(attrs.get('class', '').split()):
+        return False
+    return all(name in attrs and (value is None or attrs[name] == value) for name, value in attributes)
+
+
+def _is_boilerplate(tag: str, attrs: dict) -> bool:
+    """Mirrors content_extraction's pruning rule for one element."""
+    if tag in BOILERPLATE_TAGS:
+        return True
+    if tag in PRESERVED_TAGS:
+        return False
+    return has_boilerplate_name(attrs.get('class', '').split(), attrs.get('id'))
+
+
+_block_cache = {}
+
+def _is_block(name) -> bool:
+    """Tells whether whitespace next to a sibling named `name` is dropped (None/'text'/'comment' never are)."""
+    if name is None:
+        return False
+    block = _block_cache.get(name)
+    if block is None:
+        block = name in BLOCK_ELEMENTS or name == 'pre' or re_heading.match(name) is not None
+        _block_cache[name] = block
+    return block
+
+
+def _escape(text: str) -> str:
+    return text.replace('*', r'\*').replace('_', r'\_')
+
+
+def _join_children(parts: list[str]) -> str:
+    """Joins child output, collapsing newlines at child boundaries to at most two."""
+    joined = ['']
+    for part in parts:
+        if not part:
+            continue
+        leading, content, trailing = re_extract_newlines.match(part).groups()
+        if joined[-1] and leading:
+            leading = '\n' * min(2, max(len(joined.pop()), len(leading)))
+        joined.extend((leading, content, trailing))
+    return ''.join(joined)
+
+
+class _Element:
+    """An open element: its converted children so far and the sibling state needed to convert the next child."""
+
+    __slots__ = ('tag', 'attrs', 'child_tags', 'block_inside', 'parts', 'last', 'text', 'text_lstrip', 'text_closed',
+                 'list_index', 'list_captures', 'tag_count', 'li_count', 'li_index', 'first_sibling', 'ul_depth', 'rows', 'cells',
+                 'tr_count', 'has_thead', 'has_preserved', 'boilerplate', 'keep_all', 'captures')
+
+    def __init__(self, tag: str, attrs: dict, child_tags: frozenset, ul_depth: int = 0):
+        self.tag = tag
+        self.attrs = attrs
+        self.child_tags = child_tags # markdownify's parent_tags for this element's children
+        self.block_inside = _is_block(tag) and tag != 'pre'
+        self.parts = []
+        self.last = None # Name of the previous sibling of the next child: a tag, 'text', 'comment' or None
+        self.text = None # Raw data of the current text child; converted once its next sibling is known
+        self.text_lstrip = False
+        self.text_closed = False # A pruned element ended the text node; more data starts a new one
+        self.list_index = None # parts index of a list waiting to learn whether a paragraph follows it
+        self.list_captures = None # Content selectors that list is the match of
+        self.tag_count = 0
+        self.li_count = 0
+        self.li_index = 0
+        self.first_sibling = True
+        self.ul_depth = ul_depth
+        self.rows = None # Table rows, rendered when this element closes
+        self.cells = None # (colspan, is_th) of the table cells kept inside, for the enclosing tr
+        self.tr_count = 0 # Rows kept anywhere inside
+        self.has_thead = False
+        self.has_preserved = False # An h1, table, pre or code sits somewhere inside
+        self.boilerplate = False
+        self.keep_all = False # Inside the content_selector match: nothing is pruned
+        self.captures = None # Indexes of the content selectors this element is the first match of
+
+
+# --- Conversion of closed elements (markdownify's convert_* functions) ---
+
+def _chomped(markup: str):
+    def convert(el, text, parent_tags, parent):
+        if '_noformat' in parent_tags:
+            return text
+        prefix = ' ' if text and text[0] == ' ' else ''
+        suffix = ' ' if text and text[-1] == ' ' else ''
+        text = text.strip()
+        if not text:
+            return ''
+        return prefix + markup + text + markup + suffix
+    return convert
+
+_convert_strong = _chomped(STRONG_MARKUP)
+_convert_emphasis = _chomped(EMPHASIS_MARKUP)
+_convert_strikethrough = _chomped(STRIKETHROUGH_MARKUP)
+_convert_inline_code = _chomped('`')
+_convert_plain = _chomped('')
+
+def _convert_code(el, text, parent_tags, parent):
+    return text if 'pre' in parent_tags else _convert_inline_code(el, text, parent_tags, parent)
+
+def _convert_a(el, text, parent_tags, parent):
+    if '_noformat' in parent_tags:
+        return text
+    prefix = ' ' if text and text[0] == ' ' else ''
+    suffix = ' ' if text and text[-1] == ' ' else ''
+    text = text.strip()
+    if not text:
+        return ''
+    href = el.attrs.get('href')
+    title = el.attrs.get('title')
+    if text.replace(r'\_', '_') == href and not title:
+        return '<%s>' % href
+    title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+    return '%s[%s](%s%s)%s' % (prefix, text, href, title_part, suffix) if href else text
+
+def _convert_blockquote(el, text, parent_tags, parent):
+    text = text.strip(' \t\r\n')
+    if '_inline' in parent_tags:
+        return ' ' + text + ' '
+    if not text:
+        return '\n'
+    text = re_line_with_content.sub(lambda m: '> ' + m.group(1) if m.group(1) else '>', text)
+    return '\n' + text + '\n\n'
+
+def _convert_br(el, text, parent_tags, parent):
+    return ' ' if '_inline' in parent_tags else LINE_BREAK
+
+def _convert_div(el, text, parent_tags, parent):
+    if '_inline' in parent_tags:
+        return ' ' + text.strip() + ' '
+    text = text.strip()
+    return '\n\n%s\n\n' % text if text else ''
+
+def _convert_dd(el, text, parent_tags, parent):
+    text = text.strip()
+    if '_inline' in parent_tags:
+        return ' ' + text + ' '
+    if not text:
+        return '\n'
+    text = re_line_with_content.sub(lambda m: '    ' + m.group(1) if m.group(1) else '', text)
+    return ':' + text[1:] + '\n'
+
+def _convert_dt(el, text, parent_tags, parent):
+    text = re_all_whitespace.sub(' ', text.strip())
+    if '_inline' in parent_tags:
+        return ' ' + text + ' '
+    if not text:
+        return '\n'
+    return '\n\n%s\n' % text
+
+def _convert_heading(level: int):
+    def convert(el, text, parent_tags, parent):
+        if '_inline' in parent_tags:
+            return text
+        text = text.strip()
+        if level <= 2:
+            text = text.rstrip()
+            return '\n\n%s\n%s\n\n' % (text, ('=' if level == 1 else '-') * len(text)) if text else ''
+        return '\n\n%s %s\n\n' % ('#' * level, re_all_whitespace.sub(' ', text))
+    return convert
+
+def _convert_hr(el, text, parent_tags, parent):
+    return '\n\n---\n\n'
+
+def _convert_img(el, text, parent_tags, parent):
+    alt = el.attrs.get('alt') or ''
+    if '_inline' in parent_tags:
+        return alt
+    title = el.attrs.get('title') or ''
+    title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+    return '![%s](%s%s)' % (alt, el.attrs.get('src') or '', title_part)
+
+def _convert_list(el, text, parent_tags, parent):
+    if 'li' in parent_tags:
+        return '\n' + text.rstrip()
+    return '\n\n' + text # The newline before a following paragraph is added once that sibling arrives
+
+def _convert_li(el, text, parent_tags, parent):
+    text = text.strip()
+    if not text:
+        return '\n'
+    if parent.tag == 'ol':
+        start = parent.attrs.get('start', '')
+        bullet = '%d.' % ((int(start) if start.isnumeric() else 1) + el.li_index)
+    else:
+        bullet = BULLETS[(el.ul_depth - 1) % len(BULLETS)]
+    bullet += ' '
+    indent = ' ' * len(bullet)
+    text = re_line_with_content.sub(lambda m: indent + m.group(1) if m.group(1) else '', text)
+    return bullet + text[len(bullet):] + '\n'
+
+def _convert_p(el, text, parent_tags, parent):
+    text = text.strip(' \t\r\n')
+    if '_inline' in parent_tags:
+        return ' ' + text + ' '
+    return '\n\n%s\n\n' % text if text else ''
+
+def _convert_pre(el, text, parent_tags, parent):
+    return '\n\n```\n%s\n```\n\n' % text if text else ''
+
+def _convert_nothing(el, text, parent_tags, parent):
+    return ''
+
+def _convert_table(el, text, parent_tags, parent):
+    return '\n\n' + text.strip() + '\n\n'
+
+def _convert_caption(el, text, parent_tags, parent):
+    return text.strip() + '\n\n'
+
+def _convert_figcaption(el, text, parent_tags, parent):
+    return '\n\n' + text.strip() + '\n\n'
+
+def _colspan(el) -> int:
+    colspan = el.attrs.get('colspan', '')
+    return int(colspan) if colspan.isdigit() else 1
+
+def _convert_cell(el, text, parent_tags, parent):
+    return ' ' + text.strip().replace('\n', ' ') + ' |' * _colspan(el)
+
+_CONVERTERS = {
+    'a': _convert_a, 'b': _convert_strong, 'strong': _convert_strong, 'em': _convert_emphasis, 'i': _convert_emphasis,
+    'del': _convert_strikethrough, 's': _convert_strikethrough, 'code': _convert_code, 'kbd': _convert_code,
+    'samp': _convert_code, 'sub': _convert_plain, 'sup': _convert_plain, 'blockquote': _convert_blockquote,
+    'br': _convert_br, 'div': _convert_div, 'article': _convert_div, 'section': _convert_div, 'dl': _convert_div,
+    'dd': _convert_dd, 'dt': _convert_dt, 'hr': _convert_hr, 'img': _convert_img, 'ul': _convert_list,
+    'ol': _convert_list, 'li': _convert_li, 'p': _convert_p, 'pre': _convert_pre, 'script': _convert_nothing,
+    'style': _convert_nothing, 'table': _convert_table, 'caption': _convert_caption, 'figcaption': _convert_figcaption,
+    'td': _convert_cell, 'th': _convert_cell,
+}
+
+def _converter(tag: str):
+    converter = _CONVERTERS.get(tag)
+    if converter is None:
+        match = re_heading.match(tag)
+        if match:
+            converter = _convert_heading(max(1, min(6, int(match.group(1)))))
+            _CONVERTERS[tag] = converter
+    return converter
+
+
+def _render_row(row: _Element, text: str, section: _Element, table: _Element | None) -> str:
+    """Renders a tr once its section is complete, since the header rules look at the whole section."""
+    cells = row.cells or []
+    is_headrow = all(is_th for colspan, is_th in cells) or (section.tag == 'thead' and section.tr_count == 1)
+    is_head_row_missing = row.first_sibling and (section.tag != 'tbody' or not (table and table.has_thead))
+    columns = sum(colspan for colspan, is_th in cells)
+    if is_headrow and row.first_sibling:
+        return '|' + text + '\n' + '| ' + ' | '.join(['---'] * columns) + ' |' + '\n'
+    if is_head_row_missing or (row.first_sibling and (section.tag == 'table' or (
+            section.tag == 'tbody' and section.first_sibling))):
+        overline = '| ' + ' | '.join([''] * columns) + ' |' + '\n' + '| ' + ' | '.join(['---'] * columns) + ' |' + '\n'
+        return overline + '|' + text + '\n'
+    return '|' + text + '\n'
+
+
+class StreamingMarkdownConverter(HTMLParser):
+    """Converts HTML to Markdown in one pass over the parser events.
+
+    No document tree is built. Each open element keeps only the Markdown of
+    its already-closed children; when it closes, they are joined and
+    converted, and the result is handed to its parent, so memory is bounded
+    by the output plus the current nesting depth. Whitespace handling and
+    per-tag output follow markdownify's defaults exactly (see the
+    parity check in benchmark.py), which needs a little look-ahead: a text
+    node is only converted once its next sibling is known, a list only
+    learns whether a paragraph follows it when that sibling arrives, and
+    table rows are rendered when their section closes.
+
+    Content extraction (see content_extraction.extract_main_content) runs
+    in the same pass: non-content elements are skipped as they open, page
+    chrome is dropped when it closes unless it held the h1, and the output
+    of the first element matching each content selector is kept aside; the
+    best one is picked at the end.
+    """
+
+    def __init__(self, extract_content: bool = True, content_selector: str | None = None):
+        super().__init__(convert_charrefs=False) # References are resolved like BeautifulSoup does, see handle_charref
+        self.extract_content = extract_content
+        self._document = _Element('[document]', {}, frozenset(['[document]']))
+        self._stack = [self._document]
+        self._skip_tag = None
+        self._skip_depth = 0
+        self._child_tags_cache = {}
+        selectors = []
+        self._custom_selector = bool(content_selector) and extract_content
+        if extract_content:
+            if content_selector:
+                selectors.append(parse_selector(content_selector))
+            selectors += [parse_selector(selector) for selector in MAIN_CONTENT_SELECTORS]
+            selectors.append([('body', None, [], [])]) # soup.body, the last resort before the whole document
+        self._pending_selectors = list(enumerate(selectors)) # In order of preference, not matched yet
+        self._captured = [None] * len(selectors)
+        self._result = None
+
+    # --- Parser events ---
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if self.extract_content and tag in NON_CONTENT_TAGS:
+            if tag not in VOID_ELEMENTS:
+                self._skip_tag = tag
+                self._skip_depth = 1
+            return
+        self._open(tag, {name: value or '' for name, value in attrs})
+        if tag in VOID_ELEMENTS:
+            self._close()
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag in VOID_ELEMENTS:
+            return
+        for depth in range(len(self._stack) - 1, 0, -1):
+            if self._stack[depth].tag == tag:
+                while len(self._stack) > depth:
+                    self._close()
+                return
+
+    def handle_data(self, data):
+        if self._skip_tag is not None:
+            return
+        element = self._stack[-1]
+        if element.text is not None and element.text_closed:
+            self._flush_text(element, 'text')
+        if element.text is None:
+            element.text = [data]
+            element.text_closed = False
+            element.text_lstrip = _is_block(element.last) or (element.block_inside and element.last is None)
+        else:
+            element.text.append(data)
+
+    def handle_charref(self, name):
+        self.handle_data(_decode_charref(name))
+
+    def handle_entityref(self, name):
+        # An unknown name is kept as literal text, without its ';'
+        self.handle_data(HTML_ENTITIES.get(name, f"&{name}"))
+
+    def handle_comment(self, data):
+        if self._skip_tag is not None:
+            return
+        element = self._stack[-1]
+        if element.text is not None:
+            self._flush_text(element, 'comment')
+        element.last = 'comment'
+
+    handle_decl = handle_comment # A doctype is a sibling too, but never content
+
+    # --- Tree bookkeeping ---
+
+    def _child_tags(self, parent: _Element, tag: str) -> frozenset:
+        key = (parent.child_tags, tag)
+        child_tags = self._child_tags_cache.get(key)
+        if child_tags is None:
+            tags = set(parent.child_tags)
+            tags.add(tag)
+            if tag in ('td', 'th') or re_heading.match(tag):
+                tags.add('_inline')
+            if tag in ('pre', 'code', 'kbd', 'samp'):
+                tags.add('_noformat')
+            child_tags = self._child_tags_cache[key] = frozenset(tags)
+        return child_tags
+
+    def _open(self, tag: str, attrs: dict):
+        parent = self._stack[-1]
+        element = _Element(tag, attrs, self._child_tags(parent, tag), parent.ul_depth + (tag == 'ul'))
+        element.first_sibling = parent.tag_count == 0
+        parent.tag_count += 1
+        if tag == 'li':
+            element.li_index = parent.li_count
+            parent.li_count += 1
+        elif tag == 'thead':
+            parent.has_thead = True
+        element.keep_all = parent.keep_all
+        if self.extract_content:
+            for index, compounds in self._pending_selectors:
+                if self._matches(compounds, element):
+                    element.captures = (element.captures or []) + [index]
+                    if index == 0 and self._custom_selector:
+                        element.keep_all = True
+            if element.captures:
+                # Only the first match of a selector counts, and less preferred selectors are no longer needed
+                self._pending_selectors = [(index, compounds) for index, compounds in self._pending_selectors
+                                           if index < element.captures[0]]
+            element.boilerplate = not element.keep_all and _is_boilerplate(tag, attrs)
+        if not element.boilerplate:
+            self._attach(parent, tag)
+        self._stack.append(element)
+
+    def _matches(self, compounds: list[tuple], element: _Element) -> bool:
+        if not _matches_compound(compounds[-1], element.tag, element.attrs):
+            return False
+        remaining = len(compounds) - 2
+        for ancestor in reversed(self._stack[1:]):
+            if remaining < 0:
+                break
+            if _matches_compound(compounds[remaining], ancestor.tag, ancestor.attrs):
+                remaining -= 1
+        return remaining < 0
+
+    def _attach(self, parent: _Element, tag: str):
+        """Makes `tag` the next sibling in `parent`: settles the text and list before it."""
+        if parent.text is not None:
+            self._flush_text(parent, tag)
+        if parent.list_index is not None:
+            self._end_list(parent, tag not in ('ul', 'ol'))
+        parent.last = tag
+
+    def _end_list(self, element: _Element, before_paragraph: bool):
+        """Settles the pending list in `element`, adding the blank line before a following paragraph."""
+        if before_paragraph:
+            element.parts[element.list_index] += '\n'
+            for index in element.list_captures or ():
+                self._captured[index] += '\n'
+        element.list_index = None
+        element.list_captures = None
+
+    def _flush_text(self, element: _Element, next_sibling):
+        """Converts the pending text child of `element` now that its next sibling (or the end) is known."""
+        raw = ''.join(element.text)
+        element.text = None
+        parent_tags = element.child_tags
+        text = raw
+        if 'pre' not in parent_tags:
+            text = re_whitespace.sub(' ', re_newline_whitespace.sub('\n', text))
+        if '_noformat' not in parent_tags:
+            text = _escape(text)
+        if element.text_lstrip:
+            text = text.lstrip(' \t\r\n')
+        if _is_block(next_sibling) or (element.block_inside and next_sibling is None):
+            text = text.rstrip()
+        if element.list_index is not None and raw.strip():
+            self._end_list(element, True)
+        if text:
+            element.parts.append(text)
+        element.last = 'text'
+
+    def _close(self):
+        element = self._stack.pop()
+        parent = self._stack[-1]
+        if element.text is not None:
+            self._flush_text(element, None)
+        if element.rows:
+            for index, row, row_text in element.rows:
+                element.parts[index] = _render_row(row, row_text, element, parent)
+        parts = element.parts
+        text = ''.join(parts) if 'pre' in element.child_tags else _join_children(parts)
+        tag = element.tag
+        converter = _converter(tag)
+        if element.captures:
+            if tag == 'tr':
+                root_text = _render_row(element, text, parent, None)
+            else:
+                root_text = converter(element, text, frozenset(), parent) if converter else text
+            for index in element.captures:
+                self._captured[index] = root_text
+
+        # Like extract_main_content, which checks outer elements before pruning inner ones, a preserved
+        # element counts even when it sits in chrome that is dropped itself
+        parent.has_preserved = parent.has_preserved or element.has_preserved or tag in PRESERVED_TAGS
+        if element.boilerplate and not element.has_preserved:
+            parent.tag_count -= 1
+            if tag == 'li':
+                parent.li_count -= 1
+            if parent.text is not None:
+                parent.text_closed = True
+            return
+        if element.boilerplate:
+            self._attach(parent, tag)
+        parent.tr_count += element.tr_count + (tag == 'tr')
+        cells = element.cells
+        if tag in ('td', 'th'):
+            cells = [(_colspan(element), tag == 'th')] + (cells or [])
+        if cells: # A tr counts every cell below it, as markdownify's find_all(['td', 'th']) does
+            if parent.cells is None:
+                parent.cells = []
+            parent.cells.extend(cells)
+
+        if tag == 'tr':
+            if parent.rows is None:
+                parent.rows = []
+            parent.rows.append((len(parent.parts), element, text))
+            parent.parts.append('')
+            return
+        result = converter(element, text, parent.child_tags, parent) if converter else text
+        if result:
+            parent.parts.append(result)
+            if tag in ('ul', 'ol') and 'li' not in parent.child_tags:
+                parent.list_index = len(parent.parts) - 1
+                parent.list_captures = element.captures
+
+    def close(self):
+        super().close()
+        while len(self._stack) > 1:
+            self._close()
+        document = self._document
+        if document.text is not None:
+            self._flush_text(document, None)
+        if document.rows:
+            for index, row, row_text in document.rows:
+                document.parts[index] = _render_row(row, row_text, document, None)
+        self._result = _join_children(document.parts).strip('\n')
+
+    def markdown(self) -> str:
+        """Returns the Markdown of the main content (or whole document); call after `close()`."""
+        for captured in self._captured:
+            if captured is not None:
+                return captured
+        return self._result
+
+
+def convert_html(html_content: str, content_selector: str | None = None, extract_content: bool = True) -> str:
+    """Converts an HTML page to Markdown with `StreamingMarkdownConverter`.
+
+    Args:
+        html_content: The full page HTML.
+        content_selector: Optional CSS selector for the main content element.
+        extract_content: Prune the page to its main content first, like
+            content_extraction.extract_main_content.
+
+    Returns:
+        The Markdown, the same as markdownify would produce for the page.
+
+    Raises:
+        UnsupportedSelectorError: If `content_selector` is outside the
+            supported subset; use markdownify for such sources.
+    """
+    converter = StreamingMarkdownConverter(extract_content, content_selector)
+    converter.feed(html_content)
+    converter.close()
+    return converter.markdown()
@@ -1,8 +1,27 @@
-import os
+import contextvars
 import json
 import requests
-from pathlib import Path
+import tarfile
+import threading
 import time
+import urllib3
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+from block_dedup import DEDUP_ENABLED, DEDUP_MIN_PAGES, deduplicate_docs_file
+from chunked_output import CHUNK_INDEX_ENABLED, build_chunk_index
+from compressed_output import OUTPUT_COMPRESSION, write_compressed_copy
+from content_store import get_store, print_content_store_stats
+from crawl_journal import CrawlJournal, print_write_stats
+from crawl_metrics import NORMAL, VERBOSE, Span, log, print_metrics_summary
+from docs_search import SEARCH_INDEX_ENABLED, update_search_index
+from docs_vectors import VECTOR_INDEX_ENABLED, update_vector_index
+from github_rate_limit import GITHUB_RETRY_POLICY, github_get, github_tokens_from_env, print_rate_limit_stats
+from http_cache import print_cache_stats
+from http_session import print_connection_stats
+from retry_policy import get_with_retries, is_rate_limit_response
 
 def get_api_urls_from_knowledge_file(knowledge_file_path_str: str) -> list[str]:
     """Reads API URLs from a .knowledge file.
@@ -40,138 +59,458 @@ def get_api_urls_from_knowledge_file(knowledge_file_path_str: str) -> list[str]:
         print(f"Error reading knowledge file {knowledge_file_path_str}: {e}")
         return []
 
-MAX_RETRIES = 3
-RETRY_DELAY_SECONDS = 5 # Initial delay, can be increased
 REQUEST_TIMEOUT_SECONDS = 15 # Timeout for requests
+USE_REPO_SNAPSHOT = True # Download each repository once as a tarball instead of walking the contents API
+SNAPSHOT_TIMEOUT_SECONDS = 120 # Timeout for the (much larger) tarball download
+GITHUB_WALK_WORKERS = 8 # Contents API listings and downloads in flight per root; 1 walks the tree one request at a time
+
+def _fetch_listing(api_url: str, headers: dict, indent: str = "") -> list | None:
+    """Fetches one contents API listing.
+
+    Args:
+        api_url: The GitHub API URL of a directory (or of a single .md file).
+        headers: Headers for the API request (may include auth).
+        indent: Prefix for printed messages.
+
+    Returns:
+        The listed items, or None if the listing could not be fetched (the
+        reason has been printed).
+    """
+    try:
+        response = get_with_retries(api_url, headers, REQUEST_TIMEOUT_SECONDS, get=github_get, policy=GITHUB_RETRY_POLICY)
+        items = response.json()
+    except requests.exceptions.HTTPError as e_http:
+        if is_rate_limit_response(e_http.response):
+            print(f"{indent}Rate limit exceeded for {api_url}. Check GITHUB_TOKEN or wait. Giving up on this directory.")
+        elif e_http.response.status_code == 404:
+            # Retrying can't fix a wrong path, so 404s are not retried.
+            print(f"{indent}Error 404: Not Found for API URL: {api_url}. This might mean the path in your .knowledge file is incorrect or the resource is private and requires a token with permissions.")
+        else:
+            print(f"{indent}HTTP error for {api_url}: {e_http}. Giving up on {api_url}.")
+        return None
+    except requests.exceptions.RequestException as e_req:
+        print(f"{indent}Request error for {api_url}: {e_req}. Giving up on {api_url}.")
+        return None
+    except json.JSONDecodeError as e_json:
+        print(f"{indent}Error decoding JSON from API response for {api_url}: {e_json}. Content: {response.text[:200]}...")
+        return None # Cannot proceed if JSON is invalid
+
+    if not isinstance(items, list):
+        # If the API URL points directly to a file, it returns a dict, not a list.
+        if isinstance(items, dict) and items.get('type') == 'file' and items.get('name', '').endswith('.md'):
+            # This means the initial api_url was for a single file.
+            items = [items] # Treat as a list with one item
+        else:
+            print(f"{indent}Error: Expected a list of items from API, but got {type(items)}. URL: {api_url}")
+            return None
+    return items
+
+def _download_markdown(item: dict, headers: dict, indent: str = "") -> str | None:
+    """Downloads a listed Markdown file, storing it under its blob SHA.
+
+    Args:
+        item: The file's entry from a contents API listing.
+        headers: Headers for the request (may include auth).
+        indent: Prefix for printed messages.
+
+    Returns:
+        The file's Markdown, or None if the download failed (the reason has
+        been printed).
+    """
+    item_path = item.get('path', '[Unknown Path]')
+    download_url = item.get('download_url')
+    try:
+        file_content_response = get_with_retries(download_url, headers, REQUEST_TIMEOUT_SECONDS,
+                                                 get=github_get, policy=GITHUB_RETRY_POLICY)
+    except requests.exceptions.RequestException as e_file:
+        print(f"{indent}    Error downloading file {item_path} from {download_url}: {e_file}")
+        return None
+    markdown_content = file_content_response.text
+    blob_store, blob_sha = get_store("github_blobs"), item.get('sha')
+    if blob_store is not None and blob_sha:
+        blob_store.put_text(blob_sha, markdown_content)
+    return markdown_content
+
+def _stored_markdown(item: dict, indent: str = "") -> str | None:
+    """Returns a listed file's Markdown from the blob store if its SHA is already there."""
+    # The listing's blob SHA names the file's exact content, so an unchanged file is never downloaded again
+    blob_store, blob_sha = get_store("github_blobs"), item.get('sha')
+    markdown_content = blob_store.get_text(blob_sha) if blob_store is not None and blob_sha else None
+    if markdown_content is not None:
+        log(VERBOSE, "%s    Blob %s is unchanged; reusing the stored copy.", indent, blob_sha[:12])
+    return markdown_content
+
+def _write_markdown_file(output_file_handle, item_path: str, markdown_content: str, indent: str = "",
+                         journal: CrawlJournal = None, journal_key: str = None):
+    """Appends one file's section to docs.md and records it in the journal."""
+    try:
+        output_file_handle.write(f"\n\n---\n\n<!-- Source: {item_path} -->\n\n---\n\n{markdown_content}".encode('utf-8'))
+        if journal is not None:
+            journal.mark_done(journal_key)
+        log(VERBOSE, "%s    Successfully processed and appended: %s", indent, item_path)
+    except IOError as e_io:
+        print(f"{indent}    Error writing file content for {item_path} to output: {e_io}")
+
+def _classify_item(item: dict, indent: str, journal: CrawlJournal, root_api_url: str) -> tuple[str, str | None]:
+    """Decides what the walkers do with one listing entry.
+
+    Returns:
+        A (kind, target) tuple: ("file", journal key) for a Markdown file to
+        fetch, ("dir", API URL) for a directory to descend into, or
+        ("skip", None).
+    """
+    item_name = item.get('name', '[Unknown Name]')
+    item_type = item.get('type', '[Unknown Type]')
+    item_path = item.get('path', '[Unknown Path]') # Full path in repo
 
-def crawl_github_docs(api_url: str, output_file_handle, headers: dict, depth: int = 0):
+    if item_type == 'file' and item_name.endswith('.md'):
+        journal_key = f"{root_api_url}|{item_path}"
+        if journal is not None and journal.is_done(journal_key):
+            log(VERBOSE, "%s  - Already written in an earlier run, skipping: %s", indent, item_path)
+            return "skip", None
+        log(VERBOSE, "%s  - Found Markdown file: %s", indent, item_path)
+        if not item.get('download_url'):
+            print(f"{indent}    Warning: No download_url found for file: {item_path}")
+            return "skip", None
+        return "file", journal_key
+    if item_type == 'dir':
+        log(VERBOSE, "%s  - Found directory: %s. Descending...", indent, item_path)
+        dir_api_url = item.get('url')
+        if not dir_api_url:
+            print(f"{indent}    Warning: No API URL found for directory: {item_path}")
+            return "skip", None
+        return "dir", dir_api_url
+    return "skip", None
+
+def crawl_github_docs(api_url: str, output_file_handle, headers: dict, depth: int = 0,
+                      journal: CrawlJournal = None, root_api_url: str = None):
     """Recursively crawls GitHub API for markdown files and appends their content.
 
+    Every listing and download waits for the previous one; `GitHubTreeWalker`
+    issues them concurrently and writes the same output.
+
     Args:
         api_url: The GitHub API URL for the current directory.
-        output_file_handle: File handle for the output markdown file.
+        output_file_handle: Binary file handle for the output markdown file.
         headers: Headers for the API request (may include auth).
         depth: Current recursion depth (for logging/debugging).
+        journal: Optional checkpoint journal; files it already records are
+            skipped and newly written files are recorded.
+        root_api_url: The .knowledge API URL this crawl started from, used to
+            scope journal keys. Defaults to `api_url`.
     """
+    if root_api_url is None:
+        root_api_url = api_url
     indent = "  " * depth
-    print(f"{indent}Crawling API URL ({depth=}): {api_url}")
+    log(VERBOSE, "%sCrawling API URL (depth=%d): %s", indent, depth, api_url)
+
+    items = _fetch_listing(api_url, headers, indent)
+    if items is None:
+        return
+
+    for item in items:
+        kind, target = _classify_item(item, indent, journal, root_api_url)
+        if kind == "file":
+            markdown_content = _stored_markdown(item, indent)
+            if markdown_content is None:
+                markdown_content = _download_markdown(item, headers, indent)
+            if markdown_content is not None:
+                _write_markdown_file(output_file_handle, item.get('path', '[Unknown Path]'), markdown_content, indent,
+                                     journal, target)
+        elif kind == "dir":
+            crawl_github_docs(target, output_file_handle, headers, depth + 1, journal, root_api_url)
+
+class GitHubTreeWalker:
+    """Walks a contents API tree on a bounded worker pool, writing files in sequential order.
+
+    Each fetched listing immediately queues the listings of its
+    subdirectories, then the downloads of its Markdown files, so sibling
+    directories are listed and files downloaded while the rest of the tree
+    is still being discovered. Requests run on `workers` threads in roughly
+    breadth-first order.
 
-    for attempt in range(MAX_RETRIES):
+    Results are written by the calling thread, which visits the tree
+    depth-first in listing order like `crawl_github_docs` and waits for
+    whichever listing or download comes next; files that arrive early wait
+    in that reorder buffer. docs.md is therefore byte-identical to the
+    sequential crawl.
+
+    Attributes:
+        requests: Listings and downloads issued so far.
+        peak_in_flight: Most requests running at the same time.
+        critical_path_depth: Longest chain of requests that each had to
+            wait for the previous one (the listings down to a file's
+            directory, plus the download).
+        critical_path_seconds: Summed request time of the slowest such
+            chain. Even unlimited workers could not finish sooner.
+    """
+
+    def __init__(self, headers: dict, workers: int | None = None, journal: CrawlJournal = None):
+        """
+        Args:
+            headers: Headers for the API requests (may include auth).
+            workers: Requests in flight at once. Defaults to GITHUB_WALK_WORKERS.
+            journal: Optional checkpoint journal; files it already records
+                are neither downloaded nor written again.
+        """
+        self.headers = headers
+        self.workers = max(1, GITHUB_WALK_WORKERS if workers is None else workers)
+        self.journal = journal
+        self.requests = 0
+        self.peak_in_flight = 0
+        self.critical_path_depth = 0
+        self.critical_path_seconds = 0.0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._context = None
+        self._root_api_url = None
+
+    @property
+    def in_flight(self) -> int:
+        """Requests running right now."""
+        return self._in_flight
+
+    def walk(self, api_url: str, output_file_handle, root_api_url: str = None):
+        """Crawls one API root and appends its Markdown files to the output.
+
+        Args:
+            api_url: The GitHub API URL of the root directory.
+            output_file_handle: Binary file handle for the output markdown file.
+            root_api_url: The .knowledge API URL that scopes journal keys.
+                Defaults to `api_url`.
+        """
+        self._root_api_url = root_api_url or api_url
+        # Requests run in a copy of the caller's context, taken before the walk span so they don't report to it
+        self._context = contextvars.copy_context()
+        started_at = time.perf_counter()
+        with Span("github_walk", root=self._root_api_url) as walk_span, \
+                ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self._executor = executor
+            try:
+                self._emit(self._submit(self._list_directory, api_url, 0, (0, 0.0)), 0, output_file_handle)
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+            walk_span.set(requests=self.requests, peak_in_flight=self.peak_in_flight,
+                          critical_path_depth=self.critical_path_depth,
+                          critical_path_ms=round(self.critical_path_seconds * 1000, 3))
+        log(NORMAL, "  %s", self.summary(time.perf_counter() - started_at))
+
+    def summary(self, wall_seconds: float) -> str:
+        """Returns a one-line report of the walk's concurrency."""
+        return (f"Walked the tree with {self.requests} request(s), at most {self.peak_in_flight} of {self.workers} in flight; "
+                f"critical path {self.critical_path_depth} request(s) deep, {self.critical_path_seconds:.2f}s "
+                f"of {wall_seconds:.2f}s wall time")
+
+    def _submit(self, fn, *args) -> Future:
+        return self._executor.submit(self._context.copy().run, fn, *args)
+
+    def _request(self, chain: tuple[int, float], fetch, *args):
+        """Runs one listing or download and extends the request chain that led to it.
+
+        Returns:
+            (result of fetch, chain) where chain is the (requests, seconds) of
+            the dependency chain ending with this request.
+        """
+        with self._lock:
+            self.requests += 1
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        started_at = time.perf_counter()
         try:
-            response = requests.get(api_url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
-            response.raise_for_status()  # Raises HTTPError for bad responses (4XX or 5XX)
-            
-            items = response.json()
-            if not isinstance(items, list):
-                # If the API URL points directly to a file, it returns a dict, not a list.
-                # We should ideally handle this if a .knowledge file could point to a single .md file API URL.
-                # For now, assuming .knowledge points to a directory listing API URL.
-                if isinstance(items, dict) and items.get('type') == 'file' and items.get('name', '').endswith('.md'):
-                    # This means the initial api_url was for a single file.
-                    items = [items] # Treat as a list with one item
-                else:
-                    print(f"{indent}Error: Expected a list of items from API, but got {type(items)}. URL: {api_url}")
-                    return
-
-            # Small delay to be polite to the API, especially if unauthenticated
-            time.sleep(0.5 if headers.get("Authorization") else 1.5) 
-
-            for item in items:
-                item_name = item.get('name', '[Unknown Name]')
-                item_type = item.get('type', '[Unknown Type]')
-                item_path = item.get('path', '[Unknown Path]') # Full path in repo
-
-                if item_type == 'file' and item_name.endswith('.md'):
-                    print(f"{indent}  - Found Markdown file: {item_path}")
-                    download_url = item.get('download_url')
-                    if not download_url:
-                        print(f"{indent}    Warning: No download_url found for file: {item_path}")
-                        continue
-                    
-                    try:
-                        file_content_response = requests.get(download_url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
-                        file_content_response.raise_for_status()
-                        markdown_content = file_content_response.text
-                        
-                        output_file_handle.write(f"\n\n---\n\n<!-- Source: {item_path} -->\n\n---\n\n")
-                        output_file_handle.write(markdown_content)
-                        output_file_handle.flush() # Ensure content is written immediately
-                        print(f"{indent}    Successfully processed and appended: {item_path}")
-                        time.sleep(0.2) # Small delay after successful file download
-                    except requests.exceptions.RequestException as e_file:
-                        print(f"{indent}    Error downloading file {item_path} from {download_url}: {e_file}")
-                    except IOError as e_io:
-                        print(f"{indent}    Error writing file content for {item_path} to output: {e_io}")
-
-                elif item_type == 'dir':
-                    print(f"{indent}  - Found directory: {item_path}. Descending...")
-                    dir_api_url = item.get('url')
-                    if not dir_api_url:
-                        print(f"{indent}    Warning: No API URL found for directory: {item_path}")
-                        continue
-                    crawl_github_docs(dir_api_url, output_file_handle, headers, depth + 1)
-            
-            return # Success, exit retry loop
-
-        except requests.exceptions.HTTPError as e_http:
-            if e_http.response.status_code == 403 and 'rate limit exceeded' in e_http.response.text.lower():
-                print(f"{indent}Rate limit exceeded for {api_url}. Check GITHUB_TOKEN or wait. Attempt {attempt + 1}/{MAX_RETRIES}")
-                if "Retry-After" in e_http.response.headers:
-                    retry_after = int(e_http.response.headers["Retry-After"])
-                    print(f"{indent}GitHub suggests waiting {retry_after} seconds.")
-                    time.sleep(retry_after + 1) # Add a small buffer
-                else:
-                    time.sleep(RETRY_DELAY_SECONDS * (attempt + 1)) # Exponential backoff
-            elif e_http.response.status_code == 404:
-                 print(f"{indent}Error 404: Not Found for API URL: {api_url}. This might mean the path in your .knowledge file is incorrect or the resource is private and requires a token with permissions. Attempt {attempt + 1}/{MAX_RETRIES}")
-                 # For 404, retrying might not help if the URL is fundamentally wrong.
-                 if attempt < MAX_RETRIES -1:
-                     time.sleep(RETRY_DELAY_SECONDS)
-                 else:
-                     print(f"{indent}Giving up on {api_url} after {MAX_RETRIES} attempts for 404 error.")
-                     return # Give up on this URL after max retries for 404
-            else:
-                print(f"{indent}HTTP error for {api_url}: {e_http}. Attempt {attempt + 1}/{MAX_RETRIES}")
-                if attempt < MAX_RETRIES -1:
-                    time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
-                else:
-                    print(f"{indent}Giving up on {api_url} after {MAX_RETRIES} attempts.")
-                    return # Give up on this URL
-        except requests.exceptions.RequestException as e_req:
-            print(f"{indent}Request error for {api_url}: {e_req}. Attempt {attempt + 1}/{MAX_RETRIES}")
-            if attempt < MAX_RETRIES -1:
-                time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
-            else:
-                print(f"{indent}Giving up on {api_url} after {MAX_RETRIES} request error attempts.")
-                return # Give up on this URL
-        except json.JSONDecodeError as e_json:
-            print(f"{indent}Error decoding JSON from API response for {api_url}: {e_json}. Content: {response.text[:200]}...")
-            return # Cannot proceed if JSON is invalid
-        except Exception as e_gen:
-            print(f"{indent}An unexpected error occurred while processing {api_url}: {e_gen}. Attempt {attempt + 1}/{MAX_RETRIES}")
-            if attempt < MAX_RETRIES -1:
-                time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
-            else:
-                print(f"{indent}Giving up on {api_url} after {MAX_RETRIES} unexpected error attempts.")
-                return # Give up on this URL
+            result = fetch(*args)
+        finally:
+            chain = (chain[0] + 1, chain[1] + time.perf_counter() - started_at)
+            with self._lock:
+                self._in_flight -= 1
+                self.critical_path_depth = max(self.critical_path_depth, chain[0])
+                self.critical_path_seconds = max(self.critical_path_seconds, chain[1])
+        return result, chain
 
-def main():
+    def _list_directory(self, api_url: str, depth: int, chain: tuple[int, float]) -> list | None:
+        """Fetches a listing and queues its subdirectories and files.
+
+        Returns:
+            One entry per kept item, in listing order: the listing Future of a
+            subdirectory, or an (item path, journal key, Markdown or download
+            Future) tuple for a file. None if the listing failed.
+        """
+        indent = "  " * depth
+        log(VERBOSE, "%sCrawling API URL (depth=%d): %s", indent, depth, api_url)
+        items, chain = self._request(chain, _fetch_listing, api_url, self.headers, indent)
+        if items is None:
+            return None
+
+        classified = [(item, *_classify_item(item, indent, self.journal, self._root_api_url)) for item in items]
+        entries = [None] * len(classified)
+        # Listings are queued ahead of downloads: they uncover more of the tree, so they are on the critical path
+        for index, (item, kind, target) in enumerate(classified):
+            if kind == "dir":
+                entries[index] = self._submit(self._list_directory, target, depth + 1, chain)
+        for index, (item, kind, target) in enumerate(classified):
+            if kind == "file":
+                markdown_content = _stored_markdown(item, indent)
+                if markdown_content is None:
+                    markdown_content = self._submit(self._download, item, indent, chain)
+                entries[index] = (item.get('path', '[Unknown Path]'), target, markdown_content)
+        return [entry for entry in entries if entry is not None]
+
+    def _download(self, item: dict, indent: str, chain: tuple[int, float]) -> str | None:
+        markdown_content, _ = self._request(chain, _download_markdown, item, self.headers, indent)
+        return markdown_content
+
+    def _emit(self, listing: Future, depth: int, output_file_handle):
+        """Writes a directory's files and subdirectories in listing order, waiting for each as needed."""
+        indent = "  " * depth
+        for entry in listing.result() or ():
+            if isinstance(entry, Future):
+                self._emit(entry, depth + 1, output_file_handle)
+                continue
+            item_path, journal_key, markdown_content = entry
+            if isinstance(markdown_content, Future):
+                markdown_content = markdown_content.result()
+            if markdown_content is not None:
+                _write_markdown_file(output_file_handle, item_path, markdown_content, indent, self.journal, journal_key)
+
+def crawl_github_tree(api_url: str, output_file_handle, headers: dict, journal: CrawlJournal = None,
+                      workers: int | None = None):
+    """Crawls one contents API root, concurrently unless `workers` is 1 or less.
+
+    Args:
+        api_url: The GitHub API URL of the root directory.
+        output_file_handle: Binary file handle for the output markdown file.
+        headers: Headers for the API requests (may include auth).
+        journal: Optional checkpoint journal (see `crawl_github_docs`).
+        workers: Requests in flight at once; see `GitHubTreeWalker`. Defaults to
+            GITHUB_WALK_WORKERS, read at call time.
     """
-    Main function to orchestrate the documentation crawling process.
+    if workers is None:
+        workers = GITHUB_WALK_WORKERS
+    if workers <= 1:
+        crawl_github_docs(api_url, output_file_handle, headers, journal=journal)
+    else:
+        GitHubTreeWalker(headers, workers, journal).walk(api_url, output_file_handle)
+
+def parse_github_contents_url(api_url: str) -> tuple[str, str, str, str | None] | None:
+    """Splits a GitHub contents API URL into its repository coordinates.
+
+    Args:
+        api_url: A URL like https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={ref}
+
+    Returns:
+        An (owner, repo, path, ref) tuple, where path has no leading/trailing
+        slashes and ref is None for the default branch. Returns None if the URL
+        is not a contents API URL.
     """
-    KNOWLEDGE_FILES = [
-        # "nuxtjs/.knowledge", 
-        # "ionicframework/.knowledge",
-        # "laravel/.knowledge",
-        # "filamentphp/.knowledge",
-        # "livewire/.knowledge",
-        "editorjs/.knowledge"
-    ]  # TODO: Make this dynamic or configurable
-    GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+    parts = urlsplit(api_url)
+    segments = parts.path.strip('/').split('/')
+    if parts.netloc != "api.github.com" or len(segments) < 4 or segments[0] != "repos" or segments[3] != "contents":
+        return None
+    owner, repo = segments[1], segments[2]
+    path = '/'.join(segments[4:]).strip('/')
+    ref = parse_qs(parts.query).get('ref', [None])[0]
+    return owner, repo, path, ref
+
+def _path_in_root(file_path: str, root_path: str) -> bool:
+    """Returns True if a repository file path lies under a contents API root path."""
+    if not root_path:
+        return True
+    return file_path == root_path or file_path.startswith(root_path + '/')
+
+def fetch_github_snapshots(api_urls: list[str], headers: dict) -> dict[str, dict[str, str]]:
+    """Fetches Markdown files for API roots from one tarball per repository.
+
+    Roots that share a repository and ref (e.g. the filamentphp packages) are
+    served by a single tarball download. The archive is streamed straight from
+    the response and only matching `.md` members are kept, so it never touches
+    the disk.
+
+    Args:
+        api_urls: GitHub contents API URLs.
+        headers: Headers for the API request (may include auth).
+
+    Returns:
+        A dict mapping each API URL that could be served from a snapshot to a
+        dict of {repository file path: Markdown content}. API URLs missing from
+        the result should be crawled with `crawl_github_tree` instead.
+    """
+    repos = {} # (owner, repo, ref) -> list of (api_url, path)
+    for api_url in api_urls:
+        coordinates = parse_github_contents_url(api_url)
+        if coordinates is None:
+            print(f"Warning: Cannot snapshot {api_url}; it will be crawled with the contents API.")
+            continue
+        owner, repo, path, ref = coordinates
+        repos.setdefault((owner, repo, ref), []).append((api_url, path))
+
+    files_by_root = {}
+    for (owner, repo, ref), roots in repos.items():
+        tarball_url = f"https://api.github.com/repos/{owner}/{repo}/tarball" + (f"/{ref}" if ref else "")
+        log(NORMAL, f"Downloading repository snapshot: {tarball_url}")
+        try:
+            with get_with_retries(tarball_url, headers, SNAPSHOT_TIMEOUT_SECONDS, get=github_get,
+                                  policy=GITHUB_RETRY_POLICY, stream=True) as response:
+                response.raw.decode_content = True
+                matched = {api_url: {} for api_url, _ in roots}
+                with tarfile.open(fileobj=response.raw, mode='r|*') as archive:
+                    for member in archive:
+                        if not member.isfile() or not member.name.endswith('.md'):
+                            continue
+                        # Members are prefixed with a "{owner}-{repo}-{sha}/" directory
+                        file_path = member.name.split('/', 1)[-1]
+                        owning_roots = [api_url for api_url, path in roots if _path_in_root(file_path, path)]
+                        if not owning_roots:
+                            continue
+                        content = archive.extractfile(member).read().decode('utf-8', errors='replace')
+                        for api_url in owning_roots:
+                            matched[api_url][file_path] = content
+            files_by_root.update(matched)
+            log(NORMAL, f"Extracted {sum(len(files) for files in matched.values())} Markdown file(s) from {owner}/{repo}.")
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, tarfile.TarError, EOFError,
+                zlib.error, OSError) as e:
+            # The archive is read straight off the socket, so a dropped connection or a cut-off gzip stream
+            # surfaces here as urllib3, EOF or zlib errors rather than requests exceptions
+            print(f"Error downloading snapshot for {owner}/{repo}: {e}. Falling back to the contents API.")
+    return files_by_root
 
-    print("Starting documentation crawler...")
+def write_snapshot_files(files: dict[str, str], output_file_handle, journal: CrawlJournal = None, root_api_url: str = ""):
+    """Writes snapshot Markdown files in the order the contents API walker uses.
 
-    if not GITHUB_TOKEN:
+    Args:
+        files: A dict of {repository file path: Markdown content}.
+        output_file_handle: Binary file handle for the output markdown file.
+        journal: Optional checkpoint journal, keyed like `crawl_github_docs`.
+        root_api_url: The .knowledge API URL the files belong to.
+    """
+    # The contents API lists entries by name, so sorting on path components
+    # reproduces the depth-first order of the recursive walker.
+    for file_path in sorted(files, key=lambda p: p.split('/')):
+        journal_key = f"{root_api_url}|{file_path}"
+        if journal is not None and journal.is_done(journal_key):
+            continue
+        try:
+            output_file_handle.write(f"\n\n---\n\n<!-- Source: {file_path} -->\n\n---\n\n{files[file_path]}".encode('utf-8'))
+            if journal is not None:
+                journal.mark_done(journal_key)
+        except IOError as e_io:
+            print(f"  Error writing file content for {file_path} to output: {e_io}")
+    output_file_handle.flush()
+    log(NORMAL, f"  Wrote {len(files)} file(s) from snapshot.")
+
+def build_github_headers() -> dict:
+    """Builds the GitHub API request headers, warning if no token is set.
+
+    GITHUB_TOKEN (or several comma-separated tokens in GITHUB_TOKENS) is used
+    for authentication; API requests rotate over all tokens, see
+    github_rate_limit.
+
+    Returns:
+        Headers for GitHub API and raw content requests.
+    """
+    github_tokens = github_tokens_from_env()
+
+    if not github_tokens:
         print("\n--------------------------------------------------------------------------------")
         print("Warning: GITHUB_TOKEN environment variable not set.")
         print("You will likely encounter GitHub API rate limits without a token.")
@@ -182,53 +521,116 @@ def main():
         # For now, we'll proceed, but crawling might fail quickly.
 
     headers = {"Accept": "application/vnd.github.v3+json"} # Recommended by GitHub API docs
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+    if github_tokens:
+        headers["Authorization"] = f"token {github_tokens[0]}" # Replaced per request for API calls
     headers["User-Agent"] = "MyDocsCrawler/1.0 (Python Script)" # Good practice to set a User-Agent
+    return headers
 
-    for knowledge_file_path_str in KNOWLEDGE_FILES:
-        print(f"\nProcessing knowledge file: {knowledge_file_path_str}")
-        start_api_urls = get_api_urls_from_knowledge_file(knowledge_file_path_str)
+def crawl_knowledge_file(knowledge_file_path_str: str, headers: dict) -> bool:
+    """Crawls every GitHub API root of one .knowledge file into its docs.md.
 
-        if not start_api_urls:
-            print(f"Skipping {knowledge_file_path_str} due to no valid URLs found or error reading file.")
-            continue
+    Args:
+        knowledge_file_path_str: The path to the .knowledge file.
+        headers: Headers for the API requests (see `build_github_headers`).
 
-        # Derive doc_name from the parent directory of the .knowledge file
-        doc_name = Path(knowledge_file_path_str).parent.name
-        if not doc_name: # Should not happen if path is like 'folder/.knowledge'
-            doc_name = Path(knowledge_file_path_str).stem # Fallback if .knowledge is in root
-        
-        output_dir = Path(doc_name)
-        try:
-            output_dir.mkdir(parents=True, exist_ok=True)
-            print(f"Output directory: {output_dir.resolve()}")
-        except Exception as e:
-            print(f"Error creating output directory {output_dir}: {e}")
-            continue
-            
-        output_md_path = output_dir / "docs.md"
+    Returns:
+        True if the docs.md was written, False if the source was skipped or failed.
+    """
+    start_api_urls = get_api_urls_from_knowledge_file(knowledge_file_path_str)
 
-        print(f"Processing documentation for: '{doc_name}'")
-        print(f"Found {len(start_api_urls)} GitHub API URL(s):")
-        for i, url in enumerate(start_api_urls):
-            print(f"  [{i+1}] {url}")
-        print(f"Output will be saved to: {output_md_path.resolve()}")
+    if not start_api_urls:
+        print(f"Skipping {knowledge_file_path_str} due to no valid URLs found or error reading file.")
+        return False
 
-        try:
-            with open(output_md_path, 'w', encoding='utf-8') as output_file_handle:
-                output_file_handle.write(f"# Combined Documentation for {doc_name}\n")
-                output_file_handle.write(f"<!-- Source .knowledge file: {knowledge_file_path_str} -->\n")
-                output_file_handle.write(f"<!-- GitHub API Roots: {', '.join(start_api_urls)} -->\n\n")
-                for start_api_url in start_api_urls:
-                    print(f"\n--- Starting crawl for API URL: {start_api_url} ---")
-                    crawl_github_docs(start_api_url, output_file_handle, headers)
-                    print(f"--- Finished crawl for API URL: {start_api_url} ---")
-
-            print(f"Successfully processed {doc_name}. Output at {output_md_path.resolve()}")
-        except IOError as e:
-            print(f"Error opening or writing to output file {output_md_path}: {e}")
-            continue
+    # Derive doc_name from the parent directory of the .knowledge file
+    doc_name = Path(knowledge_file_path_str).parent.name
+    if not doc_name: # Should not happen if path is like 'folder/.knowledge'
+        doc_name = Path(knowledge_file_path_str).stem # Fallback if .knowledge is in root
+
+    output_dir = Path(doc_name)
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        log(NORMAL, f"Output directory: {output_dir.resolve()}")
+    except Exception as e:
+        print(f"Error creating output directory {output_dir}: {e}")
+        return False
+
+    output_md_path = output_dir / "docs.md"
+
+    log(NORMAL, f"Processing documentation for: '{doc_name}'")
+    log(NORMAL, f"Found {len(start_api_urls)} GitHub API URL(s):")
+    for i, url in enumerate(start_api_urls):
+        log(NORMAL, f"  [{i+1}] {url}")
+    log(NORMAL, f"Output will be saved to: {output_md_path.resolve()}")
+
+    # Write to a journaled partial file so an interrupted run can resume,
+    # and only replace docs.md once every root has been crawled.
+    journal = CrawlJournal(output_md_path, fingerprint=json.dumps({
+        "knowledge_file": knowledge_file_path_str, "api_roots": start_api_urls}))
+    try:
+        # Binary, so the journal's tell() is a plain offset lookup rather than a flush of the text layer
+        output_file_handle = journal.start(binary=True)
+        if not journal.is_done(CrawlJournal.HEADER_KEY):
+            output_file_handle.write((f"# Combined Documentation for {doc_name}\n"
+                                      f"<!-- Source .knowledge file: {knowledge_file_path_str} -->\n"
+                                      f"<!-- GitHub API Roots: {', '.join(start_api_urls)} -->\n\n").encode('utf-8'))
+            journal.mark_header_written()
+        pending_api_urls = [url for url in start_api_urls if not journal.is_done(f"root:{url}")]
+        snapshots = fetch_github_snapshots(pending_api_urls, headers) if USE_REPO_SNAPSHOT else {}
+        for start_api_url in pending_api_urls:
+            log(NORMAL, f"\n--- Starting crawl for API URL: {start_api_url} ---")
+            if start_api_url in snapshots:
+                write_snapshot_files(snapshots[start_api_url], output_file_handle, journal, start_api_url)
+            else:
+                crawl_github_tree(start_api_url, output_file_handle, headers, journal)
+            journal.mark_done(f"root:{start_api_url}")
+            log(NORMAL, f"--- Finished crawl for API URL: {start_api_url} ---")
+
+        journal.finish()
+        if DEDUP_ENABLED:
+            deduplicate_docs_file(output_md_path, DEDUP_MIN_PAGES)
+        if CHUNK_INDEX_ENABLED:
+            build_chunk_index(output_md_path)
+        if SEARCH_INDEX_ENABLED:
+            update_search_index([output_md_path])
+        if VECTOR_INDEX_ENABLED:
+            update_vector_index([output_md_path])
+        if OUTPUT_COMPRESSION:
+            write_compressed_copy(output_md_path)
+        log(NORMAL, f"Successfully processed {doc_name}. Output at {output_md_path.resolve()}")
+    except IOError as e:
+        print(f"Error opening or writing to output file {output_md_path}: {e}")
+        return False
+    finally:
+        journal.close()
+    return True
+
+def main():
+    """
+    Main function to orchestrate the documentation crawling process.
+    """
+    KNOWLEDGE_FILES = [
+        # "nuxtjs/.knowledge", 
+        # "ionicframework/.knowledge",
+        # "laravel/.knowledge",
+        # "filamentphp/.knowledge",
+        # "livewire/.knowledge",
+        "editorjs/.knowledge"
+    ]  # Use crawl_all.py to crawl every */.knowledge source in one run
+
+    log(NORMAL, "Starting documentation crawler...")
+    headers = build_github_headers()
+
+    for knowledge_file_path_str in KNOWLEDGE_FILES:
+        log(NORMAL, f"\nProcessing knowledge file: {knowledge_file_path_str}")
+        crawl_knowledge_file(knowledge_file_path_str, headers)
+
+    print_rate_limit_stats()
+    print_cache_stats()
+    print_content_store_stats()
+    print_write_stats()
+    print_connection_stats()
+    print_metrics_summary()
 
     # TODO: Call to helper functions and the main crawler will be added
 
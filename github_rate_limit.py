@@ -0,0 +1,185 @@
+# github_rate_limit.py
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from http_cache import cached_get
+from retry_policy import RetryPolicy, is_rate_limit_response
+
+# --- Configuration Constants ---
+GITHUB_API_HOST = "api.github.com" # raw.githubusercontent.com downloads don't count against the API quota
+RATE_LIMIT_RESERVE_FRACTION = 0.2 # Below this share of a token's quota, requests are spread until the reset
+RATE_LIMIT_RESET_MARGIN_SECONDS = 1.0 # Extra wait past X-RateLimit-Reset to absorb clock skew
+RATE_LIMIT_FALLBACK_WAIT_SECONDS = 60 # GitHub asks to wait at least a minute when it gives no reset time
+RATE_LIMIT_LOG_WAIT_SECONDS = 5 # Waits longer than this are printed
+
+
+def github_tokens_from_env() -> list[str]:
+    """Returns the GitHub tokens to rotate through.
+
+    GITHUB_TOKENS may hold several comma-separated tokens; GITHUB_TOKEN is
+    added as well if set. Duplicates are dropped, order is kept.
+    """
+    tokens = [t.strip() for t in os.environ.get("GITHUB_TOKENS", "").split(",")]
+    tokens.append(os.environ.get("GITHUB_TOKEN", "").strip())
+    return list(dict.fromkeys(t for t in tokens if t))
+
+
+class _TokenState:
+    """Quota bookkeeping for one token (or for unauthenticated requests)."""
+
+    def __init__(self, token: str | None):
+        self.token = token
+        self.limit = None # Unknown until the first response
+        self.remaining = None
+        self.reset_at = 0.0 # Epoch seconds, as in X-RateLimit-Reset
+        self.next_allowed = 0.0 # Epoch seconds before which this token must not be used
+        self.requests = 0
+
+
+class GitHubRateLimiter:
+    """Schedules GitHub API requests from the X-RateLimit headers of every response.
+
+    Each token keeps its own quota. While a token has more than
+    `RATE_LIMIT_RESERVE_FRACTION` of its limit left, requests go out at full
+    speed; below that, they are spaced so the remaining requests are spread
+    evenly over the time left until `X-RateLimit-Reset`, and an exhausted
+    token waits for the reset. Requests rotate round-robin over the tokens
+    that are ready, so several tokens add up their quotas.
+    """
+
+    def __init__(self, tokens: list[str]):
+        self._states = [_TokenState(token) for token in tokens] or [_TokenState(None)]
+        self._next_index = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def token_count(self) -> int:
+        return sum(1 for state in self._states if state.token)
+
+    @staticmethod
+    def _pace(state: _TokenState, now: float):
+        """Pushes back `next_allowed` according to the quota left on `state`."""
+        if state.remaining is None or state.limit is None:
+            return
+        if state.remaining <= 0:
+            next_allowed = state.reset_at + RATE_LIMIT_RESET_MARGIN_SECONDS
+        elif state.remaining < state.limit * RATE_LIMIT_RESERVE_FRACTION:
+            next_allowed = now + max(state.reset_at - now, 0.0) / state.remaining
+        else:
+            return
+        state.next_allowed = max(state.next_allowed, next_allowed)
+
+    def _acquire(self) -> _TokenState:
+        """Blocks until a token may send a request and reserves one request on it."""
+        while True:
+            with self._lock:
+                now = time.time()
+                count = len(self._states)
+                ordered = [self._states[(self._next_index + i) % count] for i in range(count)]
+                for state in ordered:
+                    if state.limit is not None and state.reset_at and now >= state.reset_at:
+                        # A new window has started; its reset time comes with the next response
+                        state.remaining = state.limit
+                        state.reset_at = 0.0
+                ready = [state for state in ordered if state.next_allowed <= now]
+                if ready:
+                    state = ready[0]
+                    self._next_index = (self._states.index(state) + 1) % count
+                    state.requests += 1
+                    if state.remaining is not None:
+                        state.remaining -= 1 # Optimistic, corrected by the response headers
+                    self._pace(state, now)
+                    return state
+                wait_seconds = min(state.next_allowed for state in ordered) - now
+                self.wait_seconds += wait_seconds
+            if wait_seconds > RATE_LIMIT_LOG_WAIT_SECONDS:
+                print(f"GitHub rate limit: waiting {wait_seconds:.0f}s for quota.")
+            time.sleep(wait_seconds)
+
+    def _record(self, state: _TokenState, response: requests.Response):
+        """Updates a token's quota from the headers of its response."""
+        headers = response.headers
+        with self._lock:
+            now = time.time()
+            try:
+                if "X-RateLimit-Limit" in headers:
+                    state.limit = int(headers["X-RateLimit-Limit"])
+                if "X-RateLimit-Remaining" in headers:
+                    state.remaining = int(headers["X-RateLimit-Remaining"])
+                if "X-RateLimit-Reset" in headers:
+                    state.reset_at = float(headers["X-RateLimit-Reset"])
+            except ValueError:
+                pass # Malformed headers: keep the previous estimate
+            if is_rate_limit_response(response):
+                retry_after = headers.get("Retry-After")
+                if retry_after is not None and retry_after.isdigit():
+                    state.next_allowed = max(state.next_allowed, now + int(retry_after))
+                elif state.remaining == 0 and state.reset_at > now:
+                    state.next_allowed = max(state.next_allowed, state.reset_at + RATE_LIMIT_RESET_MARGIN_SECONDS)
+                else:
+                    state.next_allowed = max(state.next_allowed, now + RATE_LIMIT_FALLBACK_WAIT_SECONDS)
+            self._pace(state, now)
+
+    def get(self, url: str, headers: dict, timeout: float, **kwargs) -> requests.Response:
+        """Performs a GET through the shared HTTP cache, scheduled against the API quota.
+
+        Requests to hosts other than the API are passed through unchanged.
+
+        Args:
+            url: The URL to fetch.
+            headers: HTTP headers for the request; Authorization is replaced
+                with the token chosen for this request.
+            timeout: Request timeout in seconds.
+            **kwargs: Passed through to `cached_get`.
+
+        Returns:
+            The `requests.Response`.
+        """
+        if urlsplit(url).netloc.lower() != GITHUB_API_HOST:
+            return cached_get(url, headers=headers, timeout=timeout, **kwargs)
+        state = self._acquire()
+        request_headers = dict(headers)
+        if state.token:
+            request_headers["Authorization"] = f"token {state.token}"
+        response = cached_get(url, headers=request_headers, timeout=timeout, **kwargs)
+        self._record(state, response)
+        return response
+
+    def summary(self) -> str:
+        """Returns a one-line summary of requests, waiting time and quota left."""
+        with self._lock:
+            requests_made = sum(state.requests for state in self._states)
+            quotas = [f"{state.remaining}/{state.limit}" for state in self._states if state.limit is not None]
+        tokens = f"{self.token_count} token(s)" if self.token_count else "unauthenticated"
+        line = f"GitHub API: {requests_made} request(s), {tokens}, {self.wait_seconds:.1f}s waiting for quota"
+        if quotas:
+            line += f", remaining {', '.join(quotas)}"
+        return line
+
+
+GITHUB_RETRY_POLICY = RetryPolicy(wait_for_rate_limit_reset=False) # The limiter already holds requests until the reset
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+def get_default_rate_limiter() -> GitHubRateLimiter:
+    """Returns the process-wide limiter over the tokens from the environment."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = GitHubRateLimiter(github_tokens_from_env())
+        return _default_limiter
+
+def github_get(url: str, headers: dict, timeout: float, **kwargs) -> requests.Response:
+    """Drop-in replacement for `cached_get` for GitHub requests."""
+    return get_default_rate_limiter().get(url, headers, timeout, **kwargs)
+
+def print_rate_limit_stats():
+    """Prints GitHub API quota statistics for the run, if the limiter was used."""
+    if _default_limiter is not None:
+        print(_default_limiter.summary())
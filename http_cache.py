@@ -0,0 +1,273 @@
+# http_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from crawl_throttle import request_slot
+from http_session import session_get
+
+# --- Configuration Constants ---
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIR = ".http_cache" # Relative to the working directory, like the docs output folders
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024 # Least recently used bodies are evicted beyond this size
+UNMERGED_304_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "content-type"}
+
+
+class HttpCache:
+    """An on-disk HTTP cache that revalidates entries with conditional requests.
+
+    Response bodies are stored as files named by the hash of the request key,
+    and an SQLite index keeps their validators (ETag / Last-Modified), headers,
+    size and last access time. When a cached entry exists, the request is sent
+    with If-None-Match / If-Modified-Since, and a 304 answer is turned back
+    into a normal 200 response built from the stored body, so callers don't
+    need to know the cache exists.
+    """
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.bodies_dir = self.cache_dir / "bodies"
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.cache_dir / "index.sqlite3", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,"
+            " headers TEXT, size INTEGER, last_access REAL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key(url: str, headers: dict) -> str:
+        # Accept changes the representation (e.g. GitHub raw vs JSON), so it is part of the key
+        return hashlib.sha256(f"{url}\n{headers.get('Accept', '')}".encode('utf-8')).hexdigest()
+
+    def _lookup(self, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, headers, size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or not (self.bodies_dir / key).is_file():
+            return None
+        return row
+
+    def _read_body(self, key: str, size: int) -> bytes | None:
+        """Returns a stored body, or None if it is gone (e.g. evicted meanwhile) or not the size that was stored."""
+        try:
+            body = (self.bodies_dir / key).read_bytes()
+        except OSError:
+            return None
+        return body if len(body) == size else None
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+        (self.bodies_dir / key).unlink(missing_ok=True)
+
+    def _temp_path(self, key: str) -> Path:
+        return self.bodies_dir / f"{key}.{threading.get_ident()}.tmp"
+
+    def _store(self, key: str, response: requests.Response):
+        if not response.headers.get("ETag") and not response.headers.get("Last-Modified"):
+            return # Nothing to revalidate against
+        temp_path = self._temp_path(key)
+        try:
+            temp_path.write_bytes(response.content)
+        except OSError as e:
+            print(f"Error writing HTTP cache entry {self.bodies_dir / key}: {e}")
+            return
+        self._commit_body(key, response, temp_path)
+
+    def _commit_body(self, key: str, response: requests.Response, temp_path: Path):
+        """Moves a fully written body file into place and indexes it."""
+        path = self.bodies_dir / key
+        try:
+            size = temp_path.stat().st_size
+            temp_path.replace(path) # A crash or a concurrent writer never leaves a truncated body behind
+        except OSError as e:
+            print(f"Error writing HTTP cache entry {path}: {e}")
+            temp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                 json.dumps(dict(response.headers)), size, time.time()),
+            )
+            self._db.commit()
+        self._evict()
+
+    def _store_streamed(self, key: str, response: requests.Response):
+        """Arranges for a streamed body to be cached as the caller reads it.
+
+        The body is copied to a temp file chunk by chunk while the caller
+        consumes it with `iter_content`, and only committed once it has been
+        read to the end, so memory stays flat and a broken or abandoned
+        stream is never cached.
+        """
+        if not response.headers.get("ETag") and not response.headers.get("Last-Modified"):
+            return
+        response.raw = _TeeBody(response.raw, self._temp_path(key),
+                                lambda temp_path: self._commit_body(key, response, temp_path))
+
+    def _touch(self, key: str):
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                (self.bodies_dir / key).unlink(missing_ok=True)
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self._db.commit()
+
+    def get(self, url: str, headers: dict, timeout: float, **kwargs) -> requests.Response:
+        """Performs a GET through the cache.
+
+        Args:
+            url: The URL to fetch.
+            headers: HTTP headers for the request.
+            timeout: Request timeout in seconds.
+            **kwargs: Passed through to `http_session.session_get`.
+
+        Returns:
+            A `requests.Response`. Revalidated entries come back as status 200
+            with the cached body and headers.
+        """
+        key = self._key(url, headers)
+        cached = self._lookup(key)
+        request_headers = dict(headers)
+        if cached is not None:
+            etag, last_modified, _, _ = cached
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        with request_slot(url):
+            response = session_get(url, headers=request_headers, timeout=timeout, **kwargs)
+
+        body = None
+        if response.status_code == 304 and cached is not None:
+            body = self._read_body(key, cached[3])
+            if body is None:
+                # The body the 304 vouches for is missing or damaged: drop the entry and ask for the full response
+                self._forget(key)
+                with request_slot(url):
+                    response = session_get(url, headers=headers, timeout=timeout, **kwargs)
+        if body is not None:
+            cached_response = requests.Response()
+            cached_response.status_code = 200
+            cached_response.url = response.url
+            cached_response.headers.update(json.loads(cached[2]))
+            # As for any 304, its own headers (e.g. X-RateLimit-*) supersede the stored ones
+            cached_response.headers.update({name: value for name, value in response.headers.items()
+                                            if name.lower() not in UNMERGED_304_HEADERS})
+            cached_response.encoding = requests.utils.get_encoding_from_headers(cached_response.headers)
+            cached_response._content = body
+            cached_response._content_consumed = True # Streaming callers get the stored body from iter_content
+            cached_response.request = response.request
+            self._touch(key)
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += len(body)
+            return cached_response
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200:
+            if kwargs.get("stream"):
+                self._store_streamed(key, response)
+            else:
+                self._store(key, response)
+        return response
+
+    def summary(self) -> str:
+        """Returns a one-line hit/miss/bytes-saved summary."""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        return (f"HTTP cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+                f"{self.bytes_saved / 1024:.1f} KiB saved")
+
+
+class _TeeBody:
+    """Wraps a response's raw urllib3 body and copies the decoded chunks read through `stream()` to a file.
+
+    `on_complete(temp_path)` is called once the body has been read to the
+    end; if reading stops early or fails, the file is deleted instead.
+    """
+
+    def __init__(self, raw, temp_path: Path, on_complete):
+        self._raw = raw
+        self._temp_path = temp_path
+        self._on_complete = on_complete
+
+    def stream(self, amt=None, decode_content=None):
+        if not decode_content: # The cache holds decoded bodies only
+            yield from self._raw.stream(amt, decode_content=decode_content)
+            return
+        complete = False
+        try:
+            with open(self._temp_path, 'wb') as f:
+                for chunk in self._raw.stream(amt, decode_content=decode_content):
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                self._on_complete(self._temp_path)
+            else:
+                self._temp_path.unlink(missing_ok=True)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> HttpCache:
+    """Returns the process-wide cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
+
+def cached_get(url: str, headers: dict, timeout: float, **kwargs) -> requests.Response:
+    """Drop-in replacement for `requests.get` that goes through the shared cache and session.
+
+    Runs with HTTP_CACHE_ENABLED = False bypass the cache, and so do
+    streaming requests unless they pass `cache_stream=True`. Those are
+    revalidated like any other request; a 304 is served from the stored
+    body through `iter_content` (there is no `raw` stream to read), and a
+    200 is copied into the cache as the caller streams it.
+    """
+    cache_stream = kwargs.pop("cache_stream", False)
+    if not HTTP_CACHE_ENABLED or (kwargs.get("stream") and not cache_stream):
+        with request_slot(url):
+            return session_get(url, headers=headers, timeout=timeout, **kwargs)
+    return get_default_cache().get(url, headers, timeout, **kwargs)
+
+def print_cache_stats():
+    """Prints cache statistics for the run, if the cache was used."""
+    if _default_cache is not None:
+        print(_default_cache.summary())
@@ -0,0 +1,172 @@
+# http_session.py
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.request import ACCEPT_ENCODING # "gzip,deflate", plus br/zstd when brotli/zstandard are installed
+
+from crawl_metrics import Span, current_span
+
+# --- Configuration Constants ---
+HTTP_POOL_HOSTS = 32 # Hosts whose connection pools are kept at the same time
+HTTP_POOL_MAXSIZE = 16 # Keep-alive connections kept per host; at least the highest per-host concurrency
+HTTP2_ENABLED = False # Experimental urllib3 HTTP/2 (needs the 'h2' package); HTTPS hosts must then speak h2
+
+
+class ConnectionStats:
+    """Counts requests, new connections and time to first byte per host.
+
+    A request that didn't open a connection reused a pooled keep-alive one,
+    so `1 - connections / requests` is the reuse rate.
+    """
+
+    def __init__(self):
+        self._requests = {}
+        self._connections = {}
+        self._ttfb = {} # host -> list of seconds
+        self._lock = threading.Lock()
+
+    def record_connection(self, host: str):
+        """Records a newly opened (TCP, and TLS for HTTPS) connection to `host`."""
+        with self._lock:
+            self._connections[host] = self._connections.get(host, 0) + 1
+
+    def record_response(self, host: str, ttfb_seconds: float):
+        """Records one request to `host` whose response headers took `ttfb_seconds` to arrive."""
+        with self._lock:
+            self._requests[host] = self._requests.get(host, 0) + 1
+            self._ttfb.setdefault(host, []).append(ttfb_seconds)
+
+    @staticmethod
+    def _line(label: str, requests_made: int, connections: int, ttfb: list) -> str:
+        reuse_rate = (1 - connections / requests_made) * 100 if requests_made else 0.0
+        ttfb = sorted(ttfb)
+        p50 = ttfb[len(ttfb) // 2] if ttfb else 0.0
+        p90 = ttfb[min(len(ttfb) - 1, len(ttfb) * 9 // 10)] if ttfb else 0.0
+        return (f"{label}: {requests_made} requests over {connections} connection(s) ({max(reuse_rate, 0.0):.1f}% reused), "
+                f"time to first byte p50 {p50 * 1000:.0f} ms, p90 {p90 * 1000:.0f} ms")
+
+    def summary(self) -> str:
+        """Returns an overall line followed by one line per host."""
+        with self._lock:
+            hosts = sorted(self._requests, key=self._requests.get, reverse=True)
+            lines = [self._line("HTTP connections", sum(self._requests.values()), sum(self._connections.values()),
+                                [seconds for values in self._ttfb.values() for seconds in values])]
+            lines += [self._line(f"  {host}", self._requests[host], self._connections.get(host, 0), self._ttfb[host])
+                      for host in hosts]
+        return "\n".join(lines)
+
+
+_connection_stats = ConnectionStats()
+
+
+class _CountingConnectionMixin:
+    # urllib3 reconnects dropped connections in place, so count connect() rather than new connection objects
+    def _new_conn(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._socket_seconds = time.perf_counter() - started_at
+
+    def connect(self):
+        _connection_stats.record_connection(self.host)
+        self._socket_seconds = 0.0
+        started_at = time.perf_counter()
+        super().connect()
+        span = current_span()
+        if span is not None:
+            span.add("connect", self._socket_seconds) # DNS lookup and TCP handshake
+            if isinstance(self, HTTPSConnection):
+                span.add("tls", time.perf_counter() - started_at - self._socket_seconds)
+
+
+class _CountingHTTPConnection(_CountingConnectionMixin, HTTPConnection):
+    pass
+
+
+class _CountingHTTPSConnection(_CountingConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """An HTTPAdapter whose per-host keep-alive pools count the connections they open."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _CountingHTTPConnectionPool,
+                                                   "https": _CountingHTTPSConnectionPool}
+
+
+def build_session() -> requests.Session:
+    """Creates a session with pooled keep-alive connections for every host.
+
+    Connections are kept open between requests (HTTP_POOL_MAXSIZE per host),
+    so repeated requests to api.github.com, raw.githubusercontent.com or a
+    docs site skip the TCP and TLS handshakes. Responses are requested
+    compressed with every encoding urllib3 can decode here.
+    """
+    if HTTP2_ENABLED:
+        try:
+            import urllib3.http2
+            urllib3.http2.inject_into_urllib3()
+            _CountingHTTPSConnectionPool.ConnectionCls = type(
+                "_CountingHTTP2Connection", (_CountingConnectionMixin, HTTPSConnectionPool.ConnectionCls), {})
+        except ImportError as e:
+            print(f"Warning: HTTP/2 is not available ({e}); using HTTP/1.1 keep-alive connections.")
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Returns the process-wide session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+def session_get(url: str, headers: dict, timeout: float, **kwargs) -> requests.Response:
+    """Drop-in replacement for `requests.get` over the shared pooled session.
+
+    Records the time to first byte (`response.elapsed`, which covers any
+    connection setup) for the connection statistics, and an `http_request`
+    span with connect/tls/ttfb/download timings, status and body size (the
+    download of a streamed body happens later and is not included).
+    """
+    host = urlsplit(url).hostname or ""
+    with Span("http_request", url=url, host=host) as request_span:
+        response = get_session().get(url, headers=headers, timeout=timeout, **kwargs)
+        ttfb_seconds = sum(hop.elapsed.total_seconds() for hop in response.history + [response])
+        request_span.add("ttfb", ttfb_seconds)
+        request_span.set(status=response.status_code, redirects=len(response.history))
+        if not kwargs.get("stream"):
+            request_span.add("download", max(request_span.elapsed() - ttfb_seconds, 0.0))
+            request_span.set(bytes=len(response.content))
+    for hop in response.history + [response]: # Each redirect hop is a request of its own
+        _connection_stats.record_response(urlsplit(hop.url or url).hostname or "", hop.elapsed.total_seconds())
+    return response
+
+def print_connection_stats():
+    """Prints connection reuse and time-to-first-byte statistics, if the session was used."""
+    if _session is not None:
+        print(_connection_stats.summary())
@@ -0,0 +1,464 @@
+# link_crawler.py
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import re
+import time
+import urllib.robotparser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import requests
+
+from block_dedup import DEDUP_ENABLED, DEDUP_MIN_PAGES, deduplicate_docs_file
+from chunked_output import CHUNK_INDEX_ENABLED, build_chunk_index
+from compressed_output import OUTPUT_COMPRESSION, write_compressed_copy
+from content_store import get_store
+from crawl_journal import CrawlJournal
+from crawl_metrics import NORMAL, VERBOSE, log
+from crawl_throttle import HostThrottle, StageTimings, ThroughputCounter
+from docs_search import SEARCH_INDEX_ENABLED, update_search_index
+from docs_vectors import VECTOR_INDEX_ENABLED, update_vector_index
+from retry_policy import get_with_retries
+import sitemap_docs_crawler # Tunables are read through the module, so changes made after import apply here too
+from sitemap_docs_crawler import (conversion_pool_scope, convert_pages, fetch_page_html, get_knowledge_options,
+                                  get_sitemap_url_from_knowledge_file)
+
+# --- Configuration Constants ---
+LINK_CRAWL_MAX_PAGES = 5000 # Per source; override with "# max-pages: N" in the .knowledge file
+LINK_CRAWL_MAX_DEPTH = 20 # Link hops from the start URL; override with "# max-depth: N"
+LINK_CRAWL_BLOOM_AFTER_URLS = 100_000 # Seen URLs kept exactly up to this count, then in a Bloom filter
+LINK_CRAWL_BLOOM_CAPACITY = 10_000_000 # URLs the Bloom filter is sized for
+LINK_CRAWL_BLOOM_ERROR_RATE = 1e-4 # Share of new URLs wrongly taken as seen (and skipped) at capacity
+ROBOTS_TXT_ENABLED = True
+TRACKING_QUERY_PARAMS = re.compile(r'^(utm_\w+|gclid|fbclid|mc_cid|mc_eid)$', re.IGNORECASE)
+SKIPPED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip", ".gz", ".tgz",
+                      ".css", ".js", ".json", ".xml", ".txt", ".mp4", ".webm", ".woff", ".woff2", ".ttf"}
+
+
+def _remove_dot_segments(path: str) -> str:
+    """Resolves "." and ".." path segments, as in RFC 3986 section 5.2.4."""
+    segments = path.split('/')
+    if '.' not in segments and '..' not in segments:
+        return path
+    output = []
+    for index, segment in enumerate(segments):
+        if segment in ('.', '..'):
+            if segment == '..' and len(output) > 1:
+                output.pop()
+            if index == len(segments) - 1:
+                output.append('') # "/a/b/.." ends with a slash
+        else:
+            output.append(segment)
+    return '/'.join(output)
+
+
+def canonicalize_url(url: str, base_url: str = None) -> str | None:
+    """Normalizes a (possibly relative) link so equivalent URLs compare equal.
+
+    Resolves it against `base_url`, lower-cases the scheme and host, drops
+    default ports, dot segments, the fragment and tracking parameters
+    (utm_*, gclid, ...), sorts the query and gives an empty path a "/".
+
+    Returns:
+        The canonical URL, or None for links that aren't http(s) pages
+        (mailto:, javascript:, ...).
+    """
+    parts = urlsplit(urljoin(base_url, url.strip()) if base_url else url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != {"http": 80, "https": 443}[scheme]:
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_QUERY_PARAMS.match(key)))
+    return urlunsplit((scheme, host, _remove_dot_segments(parts.path) or "/", query, ""))
+
+
+class LinkExtractor(HTMLParser):
+    """Collects the canonical <a href> targets of a page, honouring <base>, rel=nofollow and meta robots."""
+
+    def __init__(self, page_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = page_url
+        self.links = []
+        self.follow = True
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag == "base" and attributes.get("href"):
+            self.base_url = urljoin(self.base_url, attributes["href"])
+        elif tag == "meta" and (attributes.get("name") or "").lower() == "robots":
+            if "nofollow" in (attributes.get("content") or "").lower():
+                self.follow = False
+        elif tag == "a" and attributes.get("href"):
+            if "nofollow" in (attributes.get("rel") or "").lower():
+                return
+            url = canonicalize_url(attributes["href"], self.base_url)
+            if url is not None:
+                self.links.append(url)
+
+
+def extract_links(html_content: str, page_url: str) -> list[str]:
+    """Returns the canonical URLs a page links to, in document order, or [] for a nofollow page."""
+    extractor = LinkExtractor(page_url)
+    try:
+        extractor.feed(html_content)
+        extractor.close()
+    except Exception as e: # html.parser is lenient, but don't lose a page over its links
+        print(f"    Error extracting links from {page_url}: {e}")
+    return extractor.links if extractor.follow else []
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter; membership may give false positives, never false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: bytes):
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count)) # Double hashing
+
+    def add(self, item: bytes) -> bool:
+        """Adds `item`; returns True if it was (probably) not there before."""
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        return added
+
+
+class SeenUrls:
+    """The set of URLs ever queued.
+
+    Holds 8-byte digests (not the URLs) while small, and moves them into a
+    Bloom filter of about LINK_CRAWL_BLOOM_CAPACITY URLs past
+    LINK_CRAWL_BLOOM_AFTER_URLS, so memory stays bounded on very large sites
+    at the cost of skipping a small share of new URLs.
+    """
+
+    def __init__(self, bloom_after: int = LINK_CRAWL_BLOOM_AFTER_URLS):
+        self.bloom_after = bloom_after
+        self.count = 0
+        self._digests = set()
+        self._bloom = None
+
+    def add(self, url: str) -> bool:
+        """Adds `url`; returns True if it is new."""
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+        if self._bloom is not None:
+            added = self._bloom.add(digest)
+        else:
+            added = digest not in self._digests
+            self._digests.add(digest)
+        if not added:
+            return False
+        self.count += 1
+        if self._bloom is None and self.count >= self.bloom_after:
+            log(NORMAL, f"Seen-URL set reached {self.count} entries; switching to a Bloom filter.")
+            self._bloom = BloomFilter(max(LINK_CRAWL_BLOOM_CAPACITY, self.count * 10), LINK_CRAWL_BLOOM_ERROR_RATE)
+            for seen_digest in self._digests:
+                self._bloom.add(seen_digest)
+            self._digests = None
+        return True
+
+
+class UrlScope:
+    """Decides which URLs belong to a source: prefix rules plus include/exclude regexes."""
+
+    def __init__(self, prefixes: list[str], include: str = None, exclude: str = None):
+        self.prefixes = [canonicalize_url(prefix) or prefix for prefix in prefixes]
+        self.include = re.compile(include) if include else None
+        self.exclude = re.compile(exclude) if exclude else None
+
+    def __contains__(self, url: str) -> bool:
+        if not any(url.startswith(prefix) for prefix in self.prefixes):
+            return False
+        if Path(urlsplit(url).path).suffix.lower() in SKIPPED_EXTENSIONS:
+            return False
+        if self.include is not None and not self.include.search(url):
+            return False
+        return self.exclude is None or not self.exclude.search(url)
+
+
+class UrlFrontier:
+    """The queue of in-scope URLs still to fetch, most-linked first.
+
+    Each queued URL keeps its number of in-links and its depth; `pop()`
+    returns the URL with the most in-links so far, then the shallowest, then
+    the earliest found, so navigation hubs are fetched before leaf pages and
+    the crawl otherwise proceeds breadth first. Counts change as links are
+    found, so the heap holds one entry per update and stale ones are skipped.
+    """
+
+    def __init__(self, scope: UrlScope, max_depth: int = LINK_CRAWL_MAX_DEPTH):
+        self.scope = scope
+        self.max_depth = max_depth
+        self.seen = SeenUrls()
+        self._queued = {} # url -> [in-links, depth]
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queues `url` if it is in scope and new, or counts one more in-link to it if queued."""
+        if url in self._queued:
+            entry = self._queued[url]
+            entry[0] += 1
+            heapq.heappush(self._heap, (-entry[0], entry[1], next(self._order), url))
+            return False
+        if depth > self.max_depth or url not in self.scope:
+            return False
+        if not self.seen.add(url):
+            return False
+        self._queued[url] = [1, depth]
+        heapq.heappush(self._heap, (-1, depth, next(self._order), url))
+        return True
+
+    def pop(self) -> tuple[str, int] | None:
+        """Removes and returns the next (url, depth) to fetch, or None if the frontier is empty."""
+        while self._heap:
+            negative_links, depth, _, url = heapq.heappop(self._heap)
+            entry = self._queued.get(url)
+            if entry is not None and entry[0] == -negative_links:
+                del self._queued[url]
+                return url, depth
+        return None
+
+
+class RobotsRules:
+    """robots.txt rules per host, fetched once each through the HTTP cache.
+
+    As RFC 9309 asks, a missing robots.txt (4xx) allows everything and an
+    unreachable one (5xx or network errors after retries) disallows the
+    host. A Crawl-delay slows that host down in `throttle`.
+    """
+
+    def __init__(self, user_agent: str, headers: dict, throttle: HostThrottle):
+        self.user_agent = user_agent
+        self.headers = headers
+        self.throttle = throttle
+        self._parsers = {}
+
+    def _parser(self, url: str) -> urllib.robotparser.RobotFileParser:
+        parts = urlsplit(url)
+        if parts.netloc not in self._parsers:
+            robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+            parser = urllib.robotparser.RobotFileParser(robots_url)
+            try:
+                response = get_with_retries(robots_url, self.headers, sitemap_docs_crawler.REQUEST_TIMEOUT_SECONDS)
+                parser.parse(response.text.splitlines())
+            except requests.exceptions.HTTPError as e_http:
+                if e_http.response.status_code >= 500:
+                    print(f"Warning: {robots_url} is unavailable ({e_http}); not crawling {parts.netloc}.")
+                    parser.disallow_all = True
+                else:
+                    parser.allow_all = True
+            except requests.exceptions.RequestException as e_req:
+                print(f"Warning: could not fetch {robots_url} ({e_req}); not crawling {parts.netloc}.")
+                parser.disallow_all = True
+            delay = parser.crawl_delay(self.user_agent)
+            if delay:
+                log(NORMAL, f"{robots_url} asks for a Crawl-delay of {delay}s.")
+                self.throttle.limit_host_rate(parts.netloc, 1 / float(delay))
+            self._parsers[parts.netloc] = parser
+        return self._parsers[parts.netloc]
+
+    def allowed(self, url: str) -> bool:
+        return self._parser(url).can_fetch(self.user_agent, url)
+
+
+def crawl_link_graph(start_url: str, frontier: UrlFrontier, headers: dict, throttle: HostThrottle,
+                     counter: ThroughputCounter, timings: StageTimings, max_pages: int, robots: RobotsRules = None):
+    """Fetches pages breadth first from `start_url`, following in-scope links.
+
+    Fetches run on a thread pool, at most `FETCH_WINDOW_SIZE` ahead, and
+    links are extracted by the fetching worker. Results are consumed, and
+    their links added to the frontier, in the order the URLs were taken from
+    it; the frontier is refilled only then. So for the same pages the crawl
+    order, and with it docs.md, is the same on every run whatever the
+    network timing, which also lets an interrupted run be resumed.
+
+    Yields:
+        (page_url, html_content) tuples, where html_content is None on failure.
+    """
+    @contextmanager
+    def timed_slot(page_url):
+        wait_started_at = time.perf_counter()
+        with throttle.slot(page_url):
+            timings.add("throttle_wait", time.perf_counter() - wait_started_at)
+            yield
+
+    def fetch_one(page_url):
+        with timings.measure("fetch"):
+            html_content = fetch_page_html(page_url, headers, slot=timed_slot)
+        if not html_content:
+            return None, []
+        counter.record(len(html_content.encode('utf-8')))
+        with timings.measure("extract_links"):
+            return html_content, extract_links(html_content, page_url)
+
+    frontier.add(start_url, 0)
+    taken = 0
+    with ThreadPoolExecutor(max_workers=sitemap_docs_crawler.MAX_CONCURRENT_REQUESTS) as executor:
+        pending = deque()
+
+        def refill():
+            nonlocal taken
+            while len(pending) < sitemap_docs_crawler.FETCH_WINDOW_SIZE and taken < max_pages:
+                next_entry = frontier.pop()
+                if next_entry is None:
+                    return
+                url, depth = next_entry
+                if robots is not None and not robots.allowed(url):
+                    log(VERBOSE, "  Disallowed by robots.txt: %s", url)
+                    continue
+                taken += 1
+                pending.append((url, depth, executor.submit(contextvars.copy_context().run, fetch_one, url)))
+
+        refill()
+        while pending:
+            page_url, depth, future = pending.popleft()
+            html_content, links = future.result()
+            for link in links:
+                frontier.add(link, depth + 1)
+            yield page_url, html_content
+            refill()
+    if taken >= max_pages and len(frontier):
+        print(f"Reached the limit of {max_pages} pages with {len(frontier)} in-scope URL(s) left unfetched.")
+
+
+def crawl_knowledge_file(knowledge_file_path_str: str, headers: dict,
+                         conversion_pool: ProcessPoolExecutor | None = None) -> bool:
+    """Crawls a site without a sitemap by following links from the .knowledge start URL.
+
+    The first line of the .knowledge file is the start URL. Settings, as
+    `# key: value` lines:
+        crawl-mode: links       selects this crawler
+        scope-prefix: URL ...   in-scope URL prefixes (default: the start
+                                URL's directory)
+        include-regex / exclude-regex: further filters on in-scope URLs
+        max-pages / max-depth:  crawl limits
+        content-selector:       as for sitemap crawls
+
+    Args:
+        knowledge_file_path_str: The path to the .knowledge file.
+        headers: HTTP headers for the requests.
+        conversion_pool: Optional conversion pool shared with other sources;
+            by default the crawl starts its own.
+
+    Returns:
+        True if the docs.md was written, False if the source was skipped or failed.
+    """
+    start_url = get_sitemap_url_from_knowledge_file(knowledge_file_path_str)
+    start_url = canonicalize_url(start_url) if start_url else None
+    if not start_url:
+        print(f"Skipping {knowledge_file_path_str} due to missing or invalid start URL.")
+        return False
+    options = get_knowledge_options(knowledge_file_path_str)
+    doc_name = Path(knowledge_file_path_str).parent.name or Path(knowledge_file_path_str).stem
+    output_dir = Path(doc_name)
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"Error creating output directory {output_dir}: {e}. Skipping {doc_name}.")
+        return False
+    output_md_path = output_dir / "docs.md"
+
+    try:
+        prefixes = options.get("scope-prefix", "").split() or [start_url.rsplit('/', 1)[0] + '/']
+        scope = UrlScope(prefixes, options.get("include-regex"), options.get("exclude-regex"))
+        max_pages = int(options.get("max-pages", LINK_CRAWL_MAX_PAGES))
+        max_depth = int(options.get("max-depth", LINK_CRAWL_MAX_DEPTH))
+    except (re.error, ValueError) as e:
+        print(f"Invalid link crawl settings in {knowledge_file_path_str}: {e}. Skipping {doc_name}.")
+        return False
+    content_selector = options.get("content-selector")
+
+    log(NORMAL, f"Processing documentation for: '{doc_name}' (following links)")
+    log(NORMAL, f"Start URL: {start_url}; scope: {' '.join(scope.prefixes)}; up to {max_pages} pages, depth {max_depth}")
+    log(NORMAL, f"Output will be saved to: {output_md_path.resolve()}")
+
+    throttle = HostThrottle(sitemap_docs_crawler.PER_HOST_CONCURRENCY, sitemap_docs_crawler.PER_HOST_REQUESTS_PER_SECOND,
+                            sitemap_docs_crawler.PER_HOST_BURST)
+    counter = ThroughputCounter()
+    timings = StageTimings()
+    frontier = UrlFrontier(scope, max_depth)
+    user_agent = headers.get("User-Agent", sitemap_docs_crawler.DEFAULT_USER_AGENT)
+    robots = RobotsRules(user_agent, headers, throttle) if ROBOTS_TXT_ENABLED else None
+    journal = CrawlJournal(output_md_path, fingerprint=json.dumps({
+        "knowledge_file": knowledge_file_path_str, "start_url": start_url, "mode": "links", "scope": scope.prefixes,
+        "include": options.get("include-regex"), "exclude": options.get("exclude-regex"), "max_pages": max_pages,
+        "max_depth": max_depth, "content_extraction": sitemap_docs_crawler.CONTENT_EXTRACTION_ENABLED,
+        "content_selector": content_selector, "converter_engine": sitemap_docs_crawler.CONVERTER_ENGINE}))
+    processed_count = 0
+    visited_count = 0
+    try:
+        output_file_handle = journal.start(binary=True)
+        with conversion_pool_scope(conversion_pool) as conversion_pool:
+            if not journal.is_done(CrawlJournal.HEADER_KEY):
+                header = (f"# Combined Documentation for {doc_name} (from links)\n"
+                          f"<!-- Source .knowledge file: {knowledge_file_path_str} -->\n"
+                          f"<!-- Start URL: {start_url} -->\n\n")
+                output_file_handle.write(header.encode('utf-8'))
+                journal.mark_header_written()
+            # Pages written by an interrupted run are still fetched (mostly 304s from the
+            # HTTP cache) for their links, so the frontier evolves as before, but not rewritten.
+            fetched_pages = crawl_link_graph(start_url, frontier, headers, throttle, counter, timings, max_pages, robots)
+            pages = convert_pages(((url, None if journal.is_done(url) else html) for url, html in fetched_pages),
+                                  conversion_pool, timings, content_selector, get_store("markdown"))
+            for page_url, fetched, markdown_content in pages:
+                visited_count += 1
+                if journal.is_done(page_url):
+                    processed_count += 1
+                    continue
+                if not fetched:
+                    log(VERBOSE, "    Skipping %s: fetch failed or not HTML.", page_url)
+                elif not markdown_content:
+                    print(f"    Skipping {page_url} due to HTML to Markdown conversion failure.")
+                else:
+                    with timings.measure("write"):
+                        output_file_handle.write(f"\n\n---\n\n<!-- Source URL: {page_url} -->\n\n---\n\n"
+                                                 f"{markdown_content}".encode('utf-8'))
+                    processed_count += 1
+                    if processed_count % 50 == 0:
+                        log(NORMAL, f"  Throughput so far: {counter.summary()}")
+                journal.mark_done(page_url) # Journal failures too, so a resume keeps the page order
+        journal.finish()
+        if DEDUP_ENABLED:
+            deduplicate_docs_file(output_md_path, DEDUP_MIN_PAGES)
+        if CHUNK_INDEX_ENABLED:
+            build_chunk_index(output_md_path)
+        if SEARCH_INDEX_ENABLED:
+            update_search_index([output_md_path])
+        if VECTOR_INDEX_ENABLED:
+            update_vector_index([output_md_path])
+        if OUTPUT_COMPRESSION:
+            write_compressed_copy(output_md_path)
+        print(f"\nSuccessfully processed {processed_count}/{visited_count} pages for {doc_name} "
+              f"({frontier.seen.count} in-scope URLs found).")
+        print(f"Throughput: {counter.summary()}")
+        print("Stage timings:\n" + timings.summary({"fetch": sitemap_docs_crawler.MAX_CONCURRENT_REQUESTS,
+                                                    "convert": max(sitemap_docs_crawler.CONVERSION_WORKERS, 1)}))
+        return True
+    except IOError as e:
+        print(f"Error opening or writing to output file {output_md_path}: {e}")
+        return False
+    finally:
+        journal.close()
@@ -0,0 +1,220 @@
+# retry_policy.py
+import random
+import threading
+import time
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from crawl_metrics import current_span, get_metrics
+from http_cache import cached_get
+
+# --- Configuration Constants ---
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY_SECONDS = 1.0 # Backoff cap for the first retry; doubles on every attempt
+RETRY_MAX_DELAY_SECONDS = 30.0
+RETRY_MAX_RETRY_AFTER_SECONDS = 300 # Longer Retry-After values give up instead of stalling the crawl
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive failures that open a host's circuit
+CIRCUIT_COOLDOWN_SECONDS = 30.0 # How long an open circuit fails requests to its host fast
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}: too many consecutive failures, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def is_rate_limit_response(response: requests.Response) -> bool:
+    """Tells whether a 403/429 response is a primary or secondary rate limit."""
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    return (response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+            or "rate limit" in response.text.lower())
+
+
+def retry_after_seconds(response: requests.Response) -> float | None:
+    """Returns the wait a Retry-After header asks for (seconds or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    After `failure_threshold` consecutive failed attempts to a host, requests
+    to it fail fast with CircuitOpenError for `cooldown` seconds instead of
+    piling more load on a host that is down. Once the cooldown is over,
+    requests go through again; one success closes the circuit, one more
+    failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._open_until = {}
+        self._lock = threading.Lock()
+
+    def check(self, host: str):
+        """Raises CircuitOpenError if the circuit for `host` is open."""
+        with self._lock:
+            retry_in = self._open_until.get(host, 0.0) - time.monotonic()
+        if retry_in > 0:
+            raise CircuitOpenError(host, retry_in)
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+
+    def record_failure(self, host: str):
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.failure_threshold:
+                if self._open_until.get(host, 0.0) <= time.monotonic():
+                    print(f"Circuit opened for {host} after {self._failures[host]} consecutive failures; "
+                          f"pausing its requests for {self.cooldown:.0f}s.")
+                self._open_until[host] = time.monotonic() + self.cooldown
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a request.
+
+    - Connection errors, timeouts and RETRYABLE_STATUS_CODES are retried.
+    - Rate-limit responses (429, or a 403 that is a rate limit) are retried
+      after their Retry-After, or after the backoff when there is none. With
+      `wait_for_rate_limit_reset`, a 403/429 with X-RateLimit-Reset waits for
+      the reset; leave it off when a scheduler (see github_rate_limit)
+      already holds requests until then.
+    - Other 4xx responses (404, 410, plain 403, ...) are final.
+    - Backoff is exponential with full jitter: a random delay between 0 and
+      min(max_delay, base_delay * 2 ** attempt), so retries from many
+      workers don't arrive in lockstep.
+    """
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY_SECONDS,
+                 max_delay: float = RETRY_MAX_DELAY_SECONDS, wait_for_rate_limit_reset: bool = True):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.wait_for_rate_limit_reset = wait_for_rate_limit_reset
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def retry_delay(self, attempt: int, response: requests.Response | None = None,
+                    error: Exception | None = None) -> float | None:
+        """Returns the seconds to wait before retrying, or None if the failure is final.
+
+        Args:
+            attempt: The zero-based attempt that just failed.
+            response: The failed response, if one was received.
+            error: The exception raised instead, if any.
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+        if isinstance(error, CircuitOpenError):
+            return error.retry_in
+        if error is not None:
+            return self.backoff(attempt) # Connection errors and timeouts
+        if is_rate_limit_response(response):
+            wait = retry_after_seconds(response)
+            if wait is None and self.wait_for_rate_limit_reset and "X-RateLimit-Reset" in response.headers:
+                try:
+                    wait = max(float(response.headers["X-RateLimit-Reset"]) - time.time(), 0.0) + 1
+                except ValueError:
+                    wait = None
+            if wait is None:
+                return self.backoff(attempt) if self.wait_for_rate_limit_reset else 0.0
+            return wait if wait <= RETRY_MAX_RETRY_AFTER_SECONDS else None
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            wait = retry_after_seconds(response)
+            return min(wait, RETRY_MAX_RETRY_AFTER_SECONDS) if wait is not None else self.backoff(attempt)
+        return None
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+_default_circuit_breaker = CircuitBreaker()
+
+
+def get_with_retries(url: str, headers: dict, timeout: float, get=cached_get, policy: RetryPolicy = None,
+                     slot=None, **kwargs) -> requests.Response:
+    """Performs a GET, retrying it according to `policy`.
+
+    Each attempt first checks the host's circuit breaker. The backoff sleep
+    happens in the calling thread only and outside `slot`, so other workers
+    (and their per-host slots) keep going while this URL waits.
+
+    Args:
+        url: The URL to fetch.
+        headers: HTTP headers for the request.
+        timeout: Request timeout in seconds.
+        get: The function that performs one attempt, e.g. `cached_get` or
+            `github_rate_limit.github_get`.
+        policy: The retry policy; DEFAULT_RETRY_POLICY if not given.
+        slot: Optional callable returning a context manager (e.g.
+            `HostThrottle.slot`) that is held around each attempt.
+        **kwargs: Passed through to `get`.
+
+    Returns:
+        The successful response.
+
+    Raises:
+        requests.exceptions.HTTPError: For the final non-2xx response.
+        requests.exceptions.RequestException: For the final connection error
+            (CircuitOpenError if the host's circuit stayed open).
+    """
+    policy = policy or DEFAULT_RETRY_POLICY
+    host = urlsplit(url).netloc.lower()
+    span = current_span()
+    attempt = 0
+    while True:
+        if span is not None:
+            span.set(retries=attempt)
+        response = error = None
+        try:
+            _default_circuit_breaker.check(host)
+            with (slot(url) if slot is not None else nullcontext()):
+                response = get(url, headers=headers, timeout=timeout, **kwargs)
+        except CircuitOpenError as e:
+            error = e
+        except requests.exceptions.RequestException as e:
+            error = e
+            _default_circuit_breaker.record_failure(host)
+
+        if error is None:
+            if response.status_code < 400:
+                _default_circuit_breaker.record_success(host)
+                return response
+            if response.status_code >= 500:
+                _default_circuit_breaker.record_failure(host)
+            else:
+                _default_circuit_breaker.record_success(host) # The host is up, it just said no
+
+        delay = policy.retry_delay(attempt, response, error)
+        if delay is None:
+            if error is not None:
+                raise error
+            response.raise_for_status()
+        reason = type(error).__name__ if error is not None else f"HTTP {response.status_code}"
+        print(f"    Retrying {url} in {delay:.1f}s after {reason} (attempt {attempt + 1}/{policy.max_attempts}).")
+        get_metrics().count("http_retries_total", reason=reason)
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+        attempt += 1
@@ -1,196 +1,443 @@
 # sitemap_docs_crawler.py
 import os
+import contextvars
+import json
+import hashlib
+import importlib.metadata
+import itertools
+import multiprocessing
 import requests
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import time
+import zlib
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+from block_dedup import DEDUP_ENABLED, DEDUP_MIN_PAGES, DEDUP_VERSION, deduplicate_docs_file
+from chunked_output import CHUNK_INDEX_ENABLED, build_chunk_index
+from compressed_output import OUTPUT_COMPRESSION, write_compressed_copy
+from content_store import ContentStore, content_key, get_store, print_content_store_stats
+from crawl_journal import CrawlJournal, print_write_stats
+from crawl_metrics import NORMAL, VERBOSE, Span, log, log_enabled, print_metrics_summary
+from docs_search import SEARCH_INDEX_ENABLED, update_search_index
+from docs_vectors import VECTOR_INDEX_ENABLED, update_vector_index
+from crawl_throttle import HostThrottle, StageTimings, ThroughputCounter
+from http_cache import print_cache_stats
+from http_session import print_connection_stats
+from retry_policy import get_with_retries
 
 try:
-    from markdownify import markdownify as md
+    from markdownify import MarkdownConverter, markdownify as md
+    from content_extraction import extract_main_content
+    from fast_markdown import UnsupportedSelectorError, convert_html as convert_html_streaming
     MARKDOWNIFY_AVAILABLE = True
+    MARKDOWNIFY_VERSION = importlib.metadata.version("markdownify") # Part of the content store key
 except ImportError:
     MARKDOWNIFY_AVAILABLE = False
+    MARKDOWNIFY_VERSION = None
     # We'll print a warning in main if it's needed and not available
 
 # --- Configuration Constants ---
 REQUEST_TIMEOUT_SECONDS = 20  # Increased timeout for potentially larger pages
-RETRY_DELAY_SECONDS = 10    # Initial delay for retries
-MAX_RETRIES = 3
-PER_REQUEST_DELAY_SECONDS = 1 # Delay between fetching individual pages
+MAX_CONCURRENT_REQUESTS = 8 # Worker threads fetching pages; 1 restores the old serial behaviour
+PER_HOST_CONCURRENCY = 4 # Max simultaneous requests to any single host
+PER_HOST_REQUESTS_PER_SECOND = 4 # Token-bucket refill rate per host (replaces the fixed per-page sleep)
+PER_HOST_BURST = 4 # Token-bucket capacity per host
+FETCH_WINDOW_SIZE = MAX_CONCURRENT_REQUESTS * 4 # Pages fetched ahead of the writer; bounds memory
+CONVERSION_WORKERS = os.cpu_count() or 1 # Processes running markdownify; 0 converts inline on the writer thread
+CONVERSION_WINDOW_SIZE = max(CONVERSION_WORKERS, 1) * 2 # Pages queued for conversion ahead of the writer
+CONVERSION_START_METHOD = "forkserver" # Not "fork": a worker forked from the threaded crawler can start with a lock held
+CONTENT_EXTRACTION_ENABLED = False # Prune nav/sidebars/footers before conversion; see content_extraction.py
+CONVERTER_ENGINE = "markdownify" # "markdownify", or "streaming" for fast_markdown.py's single-pass converter (same output)
+CONVERSION_STORE_VERSION = 1 # Bump when conversion or extraction code changes, so stored Markdown is not reused
+INCREMENTAL_BUILD = True # Reuse sections of the previous docs.md for pages whose <lastmod> is unchanged
+MANIFEST_FILENAME = "docs.manifest.json" # Written next to docs.md
+MANIFEST_VERSION = 1
 DEFAULT_USER_AGENT = "MyDocsSitemapCrawler/1.0 (Python Script; +http://example.com/botinfo)"
 
 # --- Sitemap Parsing Logic ---
-# XML Namespace, often found in sitemaps
-SITEMAP_NS = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-DEFAULT_SITEMAP_NS_URI = "http://www.sitemaps.org/schemas/sitemap/0.9"
+SITEMAP_FETCH_WORKERS = 4 # Child sitemaps of an index fetched in parallel
+SITEMAP_WINDOW_SIZE = SITEMAP_FETCH_WORKERS * 2 # Child sitemaps parsed ahead of the consumer; bounds memory
+SITEMAP_CHUNK_BYTES = 64 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
 
-def fetch_and_parse_sitemap(sitemap_url: str, headers: dict, visited_sitemaps: set = None) -> list[str]:
-    """Fetches and parses a sitemap.xml file, handling sitemap indexes.
+def _local_name(tag: str) -> str:
+    """Strips the namespace from an ElementTree tag, so any sitemap namespace (or none) matches."""
+    return tag.rsplit('}', 1)[-1]
+
+def stream_sitemap(sitemap_url: str, headers: dict):
+    """Streams the entries of one sitemap or sitemap index.
+
+    The response body is fed chunk by chunk to an incremental XML parser as it
+    arrives (gunzipping `.xml.gz` sitemaps on the fly), and every finished
+    <url> or <sitemap> element is dropped from the tree once read, so memory
+    stays flat however large the file is.
 
     Args:
-        sitemap_url: The URL of the sitemap.xml file.
+        sitemap_url: The URL of the sitemap.
         headers: HTTP headers for the request.
-        visited_sitemaps: A set of already visited sitemap URLs to prevent loops.
 
-    Returns:
-        A list of unique page URLs found in the sitemap(s).
+    Yields:
+        ("url", page_url, lastmod) for pages and ("sitemap", child_url, lastmod)
+        for the children of an index; lastmod is None if absent. The request
+        is retried per `retry_policy`; a connection lost mid-stream ends the
+        sitemap early.
     """
-    if visited_sitemaps is None:
-        visited_sitemaps = set()
-
-    if sitemap_url in visited_sitemaps:
-        print(f"Sitemap already visited, skipping to avoid loop: {sitemap_url}")
-        return []
-    visited_sitemaps.add(sitemap_url)
-
-    page_urls = []
-    print(f"Fetching sitemap: {sitemap_url}")
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.get(sitemap_url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
-            response.raise_for_status()
-            sitemap_content = response.content # Use .content for ET.fromstring with bytes
-
+    log(VERBOSE, "Fetching sitemap: %s", sitemap_url)
+    try:
+        # Revalidated against the HTTP cache; only a changed sitemap is downloaded again
+        with get_with_retries(sitemap_url, headers, REQUEST_TIMEOUT_SECONDS, stream=True, cache_stream=True) as response:
+            parser = ET.XMLPullParser(events=("start", "end"))
+            decompressor = None
+            root = None
+            loc = lastmod = None
             try:
-                root = ET.fromstring(sitemap_content)
-            except ET.ParseError as e_parse:
-                print(f"Error parsing XML for {sitemap_url}: {e_parse}. Content: {sitemap_content[:500]}")
-                # If direct parsing fails, we might try the stripping approach as a last resort,
-                # but for now, let's focus on correct namespace handling.
-                # If parsing fails outright, it's hard to proceed.
-                return []
-
-            # Check if it's a sitemap index
-            # Try with default namespace URI, then with 'sm' prefix, then without any namespace
-            sitemap_tag_name_variants = [
-                f'{{{DEFAULT_SITEMAP_NS_URI}}}sitemap', # For default namespace
-                'sm:sitemap',                           # For 'sm' prefixed namespace
-                'sitemap'                               # For no namespace / stripped
-            ]
-            loc_tag_name_variants = [
-                f'{{{DEFAULT_SITEMAP_NS_URI}}}loc',
-                'sm:loc',
-                'loc'
-            ]
-
-            sitemapindex_tags = []
-            for variant in sitemap_tag_name_variants:
-                sitemapindex_tags = root.findall(variant, SITEMAP_NS if ':' in variant else None)
-                if sitemapindex_tags:
-                    break
-            
-            if sitemapindex_tags: # It's a sitemap index
-                print(f"Sitemap index found at {sitemap_url}. Processing sub-sitemaps...")
-                for sitemap_tag in sitemapindex_tags:
-                    loc_tag = None
-                    for loc_variant in loc_tag_name_variants:
-                        loc_tag = sitemap_tag.find(loc_variant, SITEMAP_NS if ':' in loc_variant else None)
-                        if loc_tag is not None:
-                            break
-                    
-                    if loc_tag is not None and loc_tag.text:
-                        nested_sitemap_url = loc_tag.text.strip()
-                        page_urls.extend(fetch_and_parse_sitemap(nested_sitemap_url, headers, visited_sitemaps))
-            else: # It's a regular sitemap with URLs
-                url_tag_name_variants = [
-                    f'{{{DEFAULT_SITEMAP_NS_URI}}}url',
-                    'sm:url',
-                    'url'
-                ]
-                url_tags = []
-                for variant in url_tag_name_variants:
-                    url_tags = root.findall(variant, SITEMAP_NS if ':' in variant else None)
-                    if url_tags:
-                        break
-                
-                for url_tag in url_tags:
-                    loc_tag = None
-                    for loc_variant in loc_tag_name_variants:
-                        loc_tag = url_tag.find(loc_variant, SITEMAP_NS if ':' in loc_variant else None)
-                        if loc_tag is not None:
-                            break
-
-                    if loc_tag is not None and loc_tag.text:
-                        page_urls.append(loc_tag.text.strip())
-            
-            return list(set(page_urls)) # Return unique URLs
+                # iter_content undoes any Content-Encoding; a .xml.gz body is gunzipped here
+                for chunk in response.iter_content(chunk_size=SITEMAP_CHUNK_BYTES):
+                    if root is None and decompressor is None and chunk.startswith(GZIP_MAGIC):
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                    for event, element in parser.read_events():
+                        if event == "start":
+                            if root is None:
+                                root = element
+                            continue
+                        name = _local_name(element.tag)
+                        if name == "loc":
+                            loc = (element.text or "").strip() or None
+                        elif name == "lastmod":
+                            lastmod = (element.text or "").strip() or None
+                        elif name in ("url", "sitemap"):
+                            if loc:
+                                yield name, loc, lastmod
+                            loc = lastmod = None
+                            root.clear() # Drop finished entries to keep memory bounded
+                parser.close()
+            except (ET.ParseError, zlib.error) as e_parse:
+                print(f"Error parsing XML for {sitemap_url}: {e_parse}")
+    except requests.exceptions.HTTPError as e_http:
+        if e_http.response.status_code == 404:
+            print(f"Sitemap {sitemap_url} not found (404). Giving up.")
+        else:
+            print(f"Failed to fetch sitemap {sitemap_url}: {e_http}")
+    except requests.exceptions.RequestException as e_req:
+        print(f"Failed to fetch sitemap {sitemap_url} due to request error: {e_req}")
+
+def _iter_child_sitemaps(child_urls: list[str], headers: dict, executor: ThreadPoolExecutor, visited_sitemaps: set):
+    """Fetches the children of a sitemap index concurrently and yields their entries in index order.
+
+    At most `SITEMAP_WINDOW_SIZE` children are being fetched or buffered at a
+    time. Nested indexes are expanded depth-first, in place.
+    """
+    def read_sitemap(child_url):
+        return list(stream_sitemap(child_url, headers))
+
+    pending = deque()
+    url_iter = iter(child_urls)
+
+    def submit_next():
+        for child_url in url_iter:
+            if child_url in visited_sitemaps:
+                log(VERBOSE, "Sitemap already visited, skipping to avoid loop: %s", child_url)
+                continue
+            visited_sitemaps.add(child_url)
+            # Workers run in a copy of the caller's context so requests stay attributed to its source
+            pending.append(executor.submit(contextvars.copy_context().run, read_sitemap, child_url))
+            return
+
+    for _ in range(SITEMAP_WINDOW_SIZE):
+        submit_next()
+    while pending:
+        entries = pending.popleft().result()
+        submit_next()
+        nested_urls = []
+        for kind, loc, lastmod in entries:
+            if kind == "url":
+                yield loc, lastmod
+            else:
+                nested_urls.append(loc)
+        if nested_urls:
+            yield from _iter_child_sitemaps(nested_urls, headers, executor, visited_sitemaps)
+
+def iter_sitemap_urls(sitemap_url: str, headers: dict, lastmods: dict = None):
+    """Yields the unique page URLs of a sitemap as they are parsed, following sitemap indexes.
+
+    A plain sitemap is streamed as it downloads; the children of an index are
+    fetched `SITEMAP_FETCH_WORKERS` at a time. URLs come out in document
+    order (index order for children), so page fetching can start long before
+    a large index has been read to the end.
 
-        except requests.exceptions.HTTPError as e_http:
-            print(f"HTTP error fetching sitemap {sitemap_url}: {e_http}. Attempt {attempt + 1}/{MAX_RETRIES}")
-            if e_http.response.status_code == 404:
-                print(f"Sitemap {sitemap_url} not found (404). Giving up.")
-                return [] # No point retrying 404 for sitemap URL
-            if attempt == MAX_RETRIES - 1:
-                print(f"Failed to fetch sitemap {sitemap_url} after {MAX_RETRIES} attempts.")
-                return []
-            time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
-        except requests.exceptions.RequestException as e_req:
-            print(f"Request error fetching sitemap {sitemap_url}: {e_req}. Attempt {attempt + 1}/{MAX_RETRIES}")
-            if attempt == MAX_RETRIES - 1:
-                print(f"Failed to fetch sitemap {sitemap_url} after {MAX_RETRIES} attempts due to request error.")
-                return []
-            time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
-        except Exception as e_gen:
-            print(f"An unexpected error occurred while processing sitemap {sitemap_url}: {e_gen}. Attempt {attempt + 1}/{MAX_RETRIES}")
-            if attempt == MAX_RETRIES - 1:
-                print(f"Failed to process sitemap {sitemap_url} after {MAX_RETRIES} attempts due to unexpected error.")
-                return []
-            time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
-    return [] # Should be unreachable if MAX_RETRIES > 0, but as a fallback
+    Args:
+        sitemap_url: The URL of the sitemap.xml file.
+        headers: HTTP headers for the request.
+        lastmods: Optional dict that is filled with page URL -> <lastmod> text
+            for every page whose sitemap entry has one, before the URL is yielded.
+
+    Yields:
+        Page URLs, each at most once.
+    """
+    seen_urls = set()
+    visited_sitemaps = {sitemap_url}
+    child_urls = []
+
+    def unique(entries):
+        for page_url, lastmod in entries:
+            if page_url in seen_urls:
+                continue
+            seen_urls.add(page_url)
+            if lastmods is not None and lastmod:
+                lastmods[page_url] = lastmod
+            yield page_url
+
+    def root_pages():
+        for kind, loc, lastmod in stream_sitemap(sitemap_url, headers):
+            if kind == "url":
+                yield loc, lastmod
+            else:
+                child_urls.append(loc)
+
+    yield from unique(root_pages())
+    if child_urls:
+        log(NORMAL, f"Sitemap index found at {sitemap_url}. Processing {len(child_urls)} sub-sitemap(s)...")
+        with ThreadPoolExecutor(max_workers=SITEMAP_FETCH_WORKERS) as executor:
+            yield from unique(_iter_child_sitemaps(child_urls, headers, executor, visited_sitemaps))
 
 # --- HTML Processing Logic ---
-def fetch_page_html(page_url: str, headers: dict) -> str | None:
+def fetch_page_html(page_url: str, headers: dict, slot=None) -> str | None:
     """Fetches the HTML content of a given page URL.
 
     Args:
         page_url: The URL of the page to fetch.
         headers: HTTP headers for the request.
+        slot: Optional callable returning a context manager held around each
+            attempt (not around the backoff between attempts), e.g.
+            `HostThrottle.slot`.
 
     Returns:
-        The HTML content as a string, or None if an error occurs.
+        The HTML content as a string, or None if an error occurs. The attempt
+        is recorded as a `page_fetch` span with its retries, status and size.
     """
-    print(f"  Fetching HTML page: {page_url}")
-    for attempt in range(MAX_RETRIES):
+    log(VERBOSE, "  Fetching HTML page: %s", page_url)
+    with Span("page_fetch", url=page_url) as page_span:
         try:
-            response = requests.get(page_url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
-            response.raise_for_status()
-            
+            response = get_with_retries(page_url, headers, REQUEST_TIMEOUT_SECONDS, slot=slot)
+            page_span.set(status=response.status_code)
+
             content_type = response.headers.get("Content-Type", "").lower()
             if "html" not in content_type:
                 print(f"    Warning: Content-Type for {page_url} is not HTML ({content_type}). Skipping.")
                 return None
-            
+
+            page_span.set(bytes=len(response.content))
             return response.text
         except requests.exceptions.HTTPError as e_http:
-            print(f"    HTTP error fetching page {page_url}: {e_http}. Attempt {attempt + 1}/{MAX_RETRIES}")
+            page_span.set(status=e_http.response.status_code)
             if e_http.response.status_code == 404:
                 print(f"    Page {page_url} not found (404). Giving up.")
-                return None # No point retrying 404
-            if attempt == MAX_RETRIES - 1:
-                print(f"    Failed to fetch page {page_url} after {MAX_RETRIES} attempts.")
-                return None
-            time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
+            else:
+                print(f"    Failed to fetch page {page_url}: {e_http}")
         except requests.exceptions.RequestException as e_req:
-            print(f"    Request error fetching page {page_url}: {e_req}. Attempt {attempt + 1}/{MAX_RETRIES}")
-            if attempt == MAX_RETRIES - 1:
-                print(f"    Failed to fetch page {page_url} after {MAX_RETRIES} attempts due to request error.")
-                return None
-            time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
+            print(f"    Failed to fetch page {page_url} due to request error: {e_req}")
         except Exception as e_gen:
-            print(f"    An unexpected error occurred while fetching page {page_url}: {e_gen}. Attempt {attempt + 1}/{MAX_RETRIES}")
-            if attempt == MAX_RETRIES - 1:
-                print(f"    Failed to fetch page {page_url} after {MAX_RETRIES} attempts due to unexpected error.")
-                return None
-            time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
+            print(f"    An unexpected error occurred while fetching page {page_url}: {e_gen}")
     return None
 
-def convert_html_to_markdown(html_content: str, page_url: str) -> str | None:
-    """Converts HTML content to Markdown using markdownify.
+def fetch_pages_concurrently(page_urls, headers: dict, throttle: HostThrottle, counter: ThroughputCounter,
+                             timings: StageTimings = None):
+    """Fetches pages on a bounded thread pool and yields them in input order.
+
+    At most `FETCH_WINDOW_SIZE` pages are in flight or buffered ahead of the
+    consumer, so a slow writer applies backpressure instead of letting fetched
+    HTML pile up in memory.
+
+    Args:
+        page_urls: An iterable of page URLs to fetch, in the order they should
+            be yielded. It is consumed lazily, at most a window ahead.
+        headers: HTTP headers for the requests.
+        throttle: Per-host politeness budget shared by all workers.
+        counter: Throughput counter updated for every fetched page.
+        timings: Optional stage timings; records "throttle_wait" and "fetch".
+
+    Yields:
+        (page_url, html_content) tuples, where html_content is None on failure.
+    """
+    timings = timings or StageTimings()
+
+    @contextmanager
+    def timed_slot(page_url):
+        # Taken per attempt, so a page backing off between retries doesn't hold a slot of its host
+        wait_started_at = time.perf_counter()
+        with throttle.slot(page_url):
+            timings.add("throttle_wait", time.perf_counter() - wait_started_at)
+            yield
+
+    def fetch_one(page_url):
+        with timings.measure("fetch"):
+            html_content = fetch_page_html(page_url, headers, slot=timed_slot)
+        if html_content:
+            counter.record(len(html_content.encode('utf-8')))
+        return html_content
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        pending = deque()
+        url_iter = iter(page_urls)
+        # Workers run in a copy of the caller's context so requests stay attributed to its source
+        for page_url in url_iter:
+            pending.append((page_url, executor.submit(contextvars.copy_context().run, fetch_one, page_url)))
+            if len(pending) >= FETCH_WINDOW_SIZE:
+                break
+        while pending:
+            page_url, future = pending.popleft()
+            yield page_url, future.result()
+            next_url = next(url_iter, None)
+            if next_url is not None:
+                pending.append((next_url, executor.submit(contextvars.copy_context().run, fetch_one, next_url)))
+
+def create_conversion_pool() -> ProcessPoolExecutor | None:
+    """Starts the process pool that converts pages, or returns None if CONVERSION_WORKERS is 0.
+
+    Workers are started with CONVERSION_START_METHOD ("spawn" where that is
+    unavailable) rather than forked, so they never inherit a lock that one
+    of the crawler's threads held at the time. One pool can be shared by
+    several sources crawled at the same time (see crawl_all).
+    """
+    if CONVERSION_WORKERS <= 0:
+        return None
+    start_method = CONVERSION_START_METHOD if CONVERSION_START_METHOD in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(CONVERSION_WORKERS, mp_context=multiprocessing.get_context(start_method))
+
+def conversion_pool_scope(conversion_pool: ProcessPoolExecutor | None = None):
+    """Returns a context manager for a crawl's conversion pool.
+
+    A pool passed in is used as is and left running for its owner;
+    otherwise the crawl gets a pool of its own (see
+    `create_conversion_pool`), which is shut down on exit.
+    """
+    if conversion_pool is not None:
+        return nullcontext(conversion_pool)
+    return create_conversion_pool() or nullcontext()
+
+def _convert_and_time(html_content: str, page_url: str, content_selector: str | None,
+                      engine: str | None = None, content_extraction: bool | None = None) -> tuple[str | None, float]:
+    """Runs `convert_html_to_markdown` and returns its result and CPU time.
+
+    Module-level so it can be pickled into a ProcessPoolExecutor worker.
+    Workers import this module afresh instead of being forked, so the
+    submitting process passes its CONVERTER_ENGINE and
+    CONTENT_EXTRACTION_ENABLED along and they are applied here first.
+    """
+    global CONVERTER_ENGINE, CONTENT_EXTRACTION_ENABLED
+    if engine is not None:
+        CONVERTER_ENGINE = engine
+    if content_extraction is not None:
+        CONTENT_EXTRACTION_ENABLED = content_extraction
+    started_at = time.process_time()
+    markdown_content = convert_html_to_markdown(html_content, page_url, content_selector)
+    return markdown_content, time.process_time() - started_at
+
+def _conversion_settings(content_selector: str | None) -> dict:
+    """Returns everything besides the HTML that the converted Markdown depends on."""
+    return {"version": CONVERSION_STORE_VERSION, "markdownify": MARKDOWNIFY_VERSION, "engine": CONVERTER_ENGINE,
+            "content_extraction": CONTENT_EXTRACTION_ENABLED, "content_selector": content_selector}
+
+def convert_pages(pages, executor: ProcessPoolExecutor | None, timings: StageTimings, content_selector: str | None = None,
+                  store: ContentStore | None = None):
+    """Converts fetched pages to Markdown on a process pool, preserving order.
+
+    This is the middle stage of the sitemap pipeline: it pulls (url, html)
+    pairs from the fetch stage, keeps at most `CONVERSION_WINDOW_SIZE` pages
+    queued in the pool, and yields results to the writer in input order. A
+    full window stops it from pulling more pages, which in turn holds back
+    the fetch stage.
+
+    Args:
+        pages: An iterable of (page_url, html_content) from the fetch stage.
+        executor: The conversion process pool, or None to convert inline.
+        timings: Stage timings; records "convert" (CPU time in the workers)
+            and "writer_wait" (time the writer sat waiting on conversions).
+        content_selector: Optional CSS selector for the main content element.
+        store: Optional content store of converted Markdown, keyed by the HTML
+            and conversion settings. Pages whose HTML is byte-identical to an
+            earlier conversion are served from it instead of being converted.
+
+    Yields:
+        (page_url, fetched, markdown_content) tuples, where fetched is False if
+        the HTML could not be fetched and markdown_content is None on failure.
+    """
+    pending = deque()
+    settings = _conversion_settings(content_selector)
+
+    def collect(page_url, future, key):
+        if future is None:
+            return page_url, False, None
+        with timings.measure("writer_wait"):
+            markdown_content, cpu_seconds = future.result()
+        timings.add("convert", cpu_seconds)
+        if key is not None and markdown_content is not None:
+            store.put_text(key, markdown_content)
+        return page_url, True, markdown_content
+
+    for page_url, html_content in pages:
+        key = None
+        if not html_content:
+            future = None
+        elif store is not None and (stored := store.get_text(key := content_key(html_content, settings))) is not None:
+            log(VERBOSE, "    HTML of %s is unchanged; reusing its stored Markdown.", page_url)
+            future = Future()
+            future.set_result((stored, 0.0))
+            key = None # Already stored
+        elif executor is None:
+            future = Future()
+            future.set_result(_convert_and_time(html_content, page_url, content_selector))
+        else:
+            future = executor.submit(_convert_and_time, html_content, page_url, content_selector,
+                                     CONVERTER_ENGINE, CONTENT_EXTRACTION_ENABLED)
+        pending.append((page_url, future, key))
+        if len(pending) >= CONVERSION_WINDOW_SIZE:
+            yield collect(*pending.popleft())
+    while pending:
+        yield collect(*pending.popleft())
+
+def _convert_with_markdownify(html_content: str, page_url: str, content_selector: str | None) -> str:
+    """Parses the page into a BeautifulSoup tree, prunes it and converts it with markdownify."""
+    if not CONTENT_EXTRACTION_ENABLED:
+        return md(html_content)
+    content_root = extract_main_content(html_content, content_selector)
+    md_content = MarkdownConverter().convert_soup(content_root)
+    if log_enabled(VERBOSE): # Measuring the kept HTML re-serializes the tree
+        log(VERBOSE, "    Content extraction for %s: %d bytes HTML in, %d bytes kept, %d bytes Markdown out.",
+            page_url, len(html_content.encode('utf-8')), len(str(content_root).encode('utf-8')), len(md_content.encode('utf-8')))
+    return md_content
+
+def _convert_streaming(html_content: str, page_url: str, content_selector: str | None) -> str:
+    """Converts the page in one pass over the parser events, without building a tree (see fast_markdown.py)."""
+    try:
+        return convert_html_streaming(html_content, content_selector, CONTENT_EXTRACTION_ENABLED)
+    except UnsupportedSelectorError:
+        # Combinators, pseudo-classes etc. need a DOM; the output is the same either way
+        return _convert_with_markdownify(html_content, page_url, content_selector)
+
+# Conversion engines by CONVERTER_ENGINE name: (html_content, page_url, content_selector) -> Markdown
+CONVERTER_ENGINES = {
+    "markdownify": _convert_with_markdownify,
+    "streaming": _convert_streaming,
+}
+
+def convert_html_to_markdown(html_content: str, page_url: str, content_selector: str | None = None) -> str | None:
+    """Converts HTML content to Markdown with the engine named by CONVERTER_ENGINE.
+
+    When CONTENT_EXTRACTION_ENABLED is set, the page is first pruned to its
+    main content (see `content_extraction.extract_main_content`). The
+    "markdownify" engine converts the pruned tree directly, without a second
+    HTML parse; the "streaming" engine prunes and converts in a single pass
+    over the HTML and produces the same Markdown.
 
     Args:
         html_content: The HTML content string.
         page_url: The source URL (for logging).
+        content_selector: Optional CSS selector for the main content element.
 
     Returns:
         The Markdown content as a string, or None if conversion fails.
@@ -200,15 +447,75 @@ def convert_html_to_markdown(html_content: str, page_url: str) -> str | None:
         print("Error: markdownify library is not available for HTML to Markdown conversion.")
         return None
     try:
-        # You can customize markdownify options here if needed, e.g.:
-        # md_content = md(html_content, strip=['nav', 'footer'], heading_style='atx')
-        md_content = md(html_content)
-        print(f"    Successfully converted HTML from {page_url} to Markdown.")
+        md_content = CONVERTER_ENGINES[CONVERTER_ENGINE](html_content, page_url, content_selector)
+        log(VERBOSE, "    Successfully converted HTML from %s to Markdown.", page_url)
         return md_content
     except Exception as e:
         print(f"    Error converting HTML from {page_url} to Markdown: {e}")
         return None
 
+def load_manifest(manifest_path: Path, output_md_path: Path, settings: dict = None) -> tuple[dict, dict]:
+    """Loads the incremental-build manifest and checks it against docs.md.
+
+    Each entry's byte range is read back from docs.md and re-hashed, so entries
+    are only trusted if docs.md still holds exactly what the manifest describes
+    (e.g. not after a manual edit or an interrupted run).
+
+    Args:
+        manifest_path: Path to the manifest JSON file.
+        output_md_path: Path to the docs.md the manifest describes.
+        settings: Conversion settings of this run; a manifest written with
+            different settings is ignored, since its sections are stale.
+
+    Returns:
+        (pages, shared_blocks): pages maps page URL -> {"lastmod", "sha256",
+        "offset", "length", "stripped"} for verified entries only, and
+        shared_blocks maps block fingerprint -> text for blocks the dedup pass
+        stripped from those sections. Both are empty if there is no usable
+        manifest.
+    """
+    if not manifest_path.is_file() or not output_md_path.is_file():
+        return {}, {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            print(f"Manifest {manifest_path} has an unsupported version. Doing a full rebuild.")
+            return {}, {}
+        if manifest.get("settings", {}) != (settings or {}):
+            print(f"Conversion settings changed since {manifest_path} was written. Doing a full rebuild.")
+            return {}, {}
+        verified = {}
+        with open(output_md_path, 'rb') as docs:
+            for url, entry in manifest.get("pages", {}).items():
+                docs.seek(entry["offset"])
+                if hashlib.sha256(docs.read(entry["length"])).hexdigest() == entry["sha256"]:
+                    verified[url] = entry
+        if len(verified) < len(manifest.get("pages", {})):
+            print(f"Warning: {len(manifest['pages']) - len(verified)} manifest entries no longer match {output_md_path}; they will be refetched.")
+        return verified, manifest.get("shared_blocks", {})
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error reading manifest {manifest_path}: {e}. Doing a full rebuild.")
+        return {}, {}
+
+def save_manifest(manifest_path: Path, pages: dict, settings: dict = None, shared_blocks: dict = None):
+    """Writes the incremental-build manifest next to docs.md.
+
+    Args:
+        manifest_path: Path to the manifest JSON file.
+        pages: A dict mapping page URL -> {"lastmod", "sha256", "offset", "length", "stripped"}.
+        settings: Conversion settings the sections were produced with.
+        shared_blocks: Block fingerprint -> text for blocks stripped by the dedup pass.
+    """
+    try:
+        temp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "settings": settings or {},
+                       "shared_blocks": shared_blocks or {}, "pages": pages}, f, indent=1)
+        os.replace(temp_path, manifest_path)
+    except OSError as e:
+        print(f"Error writing manifest {manifest_path}: {e}")
+
 def get_sitemap_url_from_knowledge_file(knowledge_file_path_str: str) -> str | None:
     """Reads the sitemap URL from the first line of a .knowledge file.
 
@@ -240,6 +547,226 @@ def get_sitemap_url_from_knowledge_file(knowledge_file_path_str: str) -> str | N
         print(f"Error reading knowledge file {knowledge_file_path_str}: {e}")
         return None
 
+def get_knowledge_options(knowledge_file_path_str: str) -> dict[str, str]:
+    """Reads optional per-source settings from a .knowledge file.
+
+    Settings are comment lines of the form `# key: value` after the URL, e.g.
+    `# content-selector: main article`. Being comments, they are ignored by
+    the URL readers of both crawlers.
+
+    Args:
+        knowledge_file_path_str: The path to the .knowledge file.
+
+    Returns:
+        A dict of lower-cased setting names to values. Empty if there are none
+        or the file cannot be read.
+    """
+    options = {}
+    try:
+        with open(knowledge_file_path_str, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('#') and ':' in line:
+                    key, value = line[1:].split(':', 1)
+                    options[key.strip().lower()] = value.strip()
+    except OSError:
+        pass
+    return options
+
+def crawl_knowledge_file(knowledge_file_path_str: str, headers: dict,
+                         conversion_pool: ProcessPoolExecutor | None = None) -> bool:
+    """Crawls the sitemap of one .knowledge file into its docs.md.
+
+    Sources with `# crawl-mode: links` have no sitemap and are handed to
+    `link_crawler.crawl_knowledge_file`, which follows links instead.
+
+    Args:
+        knowledge_file_path_str: The path to the .knowledge file.
+        headers: HTTP headers for the requests.
+        conversion_pool: Optional conversion pool shared with other sources;
+            by default the crawl starts its own (see `conversion_pool_scope`).
+
+    Returns:
+        True if the docs.md was written, False if the source was skipped or failed.
+    """
+    if get_knowledge_options(knowledge_file_path_str).get("crawl-mode") == "links":
+        import link_crawler # Imports this module, so not at the top
+        return link_crawler.crawl_knowledge_file(knowledge_file_path_str, headers, conversion_pool)
+
+    sitemap_start_url = get_sitemap_url_from_knowledge_file(knowledge_file_path_str)
+
+    if not sitemap_start_url:
+        print(f"Skipping {knowledge_file_path_str} due to missing or invalid sitemap URL.")
+        return False
+
+    doc_name = Path(knowledge_file_path_str).parent.name
+    if not doc_name:
+        doc_name = Path(knowledge_file_path_str).stem
+
+    output_dir = Path(doc_name)
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        log(NORMAL, f"Output directory: {output_dir.resolve()}")
+    except Exception as e:
+        print(f"Error creating output directory {output_dir}: {e}. Skipping {doc_name}.")
+        return False
+
+    output_md_path = output_dir / "docs.md"
+
+    log(NORMAL, f"Processing documentation for: '{doc_name}'")
+    log(NORMAL, f"Sitemap URL: {sitemap_start_url}")
+    log(NORMAL, f"Output will be saved to: {output_md_path.resolve()}")
+
+    lastmods = {}
+    sitemap_urls = iter_sitemap_urls(sitemap_start_url, headers, lastmods=lastmods)
+    first_page_url = next(sitemap_urls, None)
+
+    if first_page_url is None:
+        print(f"No page URLs found or sitemap processing failed for {doc_name}. Skipping.")
+        return False
+
+    content_selector = get_knowledge_options(knowledge_file_path_str).get("content-selector")
+    if content_selector:
+        log(NORMAL, f"Main content selector: {content_selector}")
+    conversion_settings = {"content_extraction": CONTENT_EXTRACTION_ENABLED, "content_selector": content_selector,
+                           "converter_engine": CONVERTER_ENGINE,
+                           "dedup_min_pages": DEDUP_MIN_PAGES if DEDUP_ENABLED else None,
+                           "dedup_version": DEDUP_VERSION if DEDUP_ENABLED else None}
+
+    manifest_path = output_dir / MANIFEST_FILENAME
+    previous_manifest = {}
+    previous_shared_blocks = {}
+    if INCREMENTAL_BUILD:
+        previous_manifest, previous_shared_blocks = load_manifest(manifest_path, output_md_path, conversion_settings)
+
+    def is_reusable(url):
+        # lastmods is filled in before the sitemap stream yields a URL
+        return bool(url in previous_manifest and lastmods.get(url) and previous_manifest[url].get("lastmod") == lastmods[url])
+
+    def is_pending(url):
+        return not is_reusable(url) and not journal.is_done(url)
+
+    # Build into a journaled partial file and swap it in at the end, so the
+    # previous docs.md stays readable for splicing, stays intact if the run
+    # fails, and an interrupted run can resume where it stopped.
+    journal = CrawlJournal(output_md_path, fingerprint=json.dumps({
+        "knowledge_file": knowledge_file_path_str, "sitemap_url": sitemap_start_url, **conversion_settings}))
+    new_manifest = {}
+    try:
+        output_file_handle = journal.start(binary=True)
+        with (open(output_md_path, 'rb') if previous_manifest else nullcontext()) as previous_docs, \
+             conversion_pool_scope(conversion_pool) as conversion_pool:
+            if not journal.is_done(CrawlJournal.HEADER_KEY):
+                header = (f"# Combined Documentation for {doc_name} (from Sitemap)\n"
+                          f"<!-- Source .knowledge file: {knowledge_file_path_str} -->\n"
+                          f"<!-- Source Sitemap URL: {sitemap_start_url} -->\n\n")
+                output_file_handle.write(header.encode('utf-8'))
+                journal.mark_header_written()
+            offset = output_file_handle.tell()
+
+            processed_count = 0
+            reused_count = 0
+            throttle = HostThrottle(PER_HOST_CONCURRENCY, PER_HOST_REQUESTS_PER_SECOND, PER_HOST_BURST)
+            counter = ThroughputCounter()
+            timings = StageTimings()
+            # Sitemap stream -> fetch (thread pool) -> convert (process pool) -> write (this thread),
+            # each stage bounded by its window so a slow stage backs up the others. The fetch
+            # stage reads ahead of the writer on its own copy of the sitemap stream.
+            writer_urls, fetcher_urls = itertools.tee(itertools.chain([first_page_url], sitemap_urls))
+            fetched_pages = fetch_pages_concurrently((url for url in fetcher_urls if is_pending(url)),
+                                                     headers, throttle, counter, timings)
+            pages = convert_pages(fetched_pages, conversion_pool, timings, content_selector, get_store("markdown"))
+            seen_page_urls = set()
+            for i, page_url in enumerate(writer_urls):
+                seen_page_urls.add(page_url)
+                if journal.is_done(page_url): # Handled by an earlier, interrupted run
+                    if journal.entries[page_url]:
+                        new_manifest[page_url] = journal.entries[page_url]
+                        processed_count += 1
+                    continue
+                if is_reusable(page_url):
+                    entry = previous_manifest[page_url]
+                    previous_docs.seek(entry["offset"])
+                    section = previous_docs.read(entry["length"])
+                    reused_count += 1
+                else:
+                    log(VERBOSE, "\nProcessing URL %d: %s", i + 1, page_url)
+                    _, fetched, markdown_content = next(pages)
+                    section = None
+                    if fetched:
+                        if markdown_content:
+                            section = (f"\n\n---\n\n<!-- Source URL: {page_url} -->\n\n---\n\n"
+                                       f"{markdown_content}").encode('utf-8')
+                        else:
+                            print(f"    Skipping {page_url} due to HTML to Markdown conversion failure.")
+                    else:
+                        print(f"    Skipping {page_url} due to HTML fetch failure.")
+
+                    if counter.pages and counter.pages % 50 == 0:
+                        log(NORMAL, f"  Throughput so far: {counter.summary()}")
+
+                if section is None:
+                    journal.mark_done(page_url) # Journal failures too, so a resume keeps the page order
+                    continue
+                try:
+                    with timings.measure("write"):
+                        output_file_handle.write(section)
+                        new_manifest[page_url] = {
+                            "lastmod": lastmods.get(page_url),
+                            "sha256": hashlib.sha256(section).hexdigest(),
+                            "offset": offset,
+                            "length": len(section),
+                            # Blocks a previous dedup pass removed from a spliced section
+                            "stripped": previous_manifest[page_url].get("stripped", []) if is_reusable(page_url) else [],
+                        }
+                        journal.mark_done(page_url, **new_manifest[page_url]) # Flushes and fsyncs the output
+                except IOError as e_io:
+                    print(f"    Error writing Markdown for {page_url} to file: {e_io}")
+                    new_manifest.pop(page_url, None)
+                    continue
+                offset += len(section)
+                processed_count += 1
+
+        log(NORMAL, f"\nFound {len(seen_page_urls)} unique page URLs in sitemap for {doc_name}.")
+        if INCREMENTAL_BUILD:
+            log(NORMAL, f"Incremental build: reused {reused_count} unchanged page(s), "
+                  f"dropped {len(set(previous_manifest) - seen_page_urls)} removed page(s).")
+        journal.finish()
+        shared_blocks = {}
+        if DEDUP_ENABLED:
+            # Spliced sections were stripped by an earlier pass; their blocks must stay in the shared section
+            extra_shared = {fingerprint: previous_shared_blocks[fingerprint]
+                            for entry in new_manifest.values() for fingerprint in entry.get("stripped", [])
+                            if fingerprint in previous_shared_blocks}
+            shared_blocks = extra_shared
+            dedup_info = deduplicate_docs_file(output_md_path, DEDUP_MIN_PAGES, extra_shared)
+            if dedup_info:
+                shared_blocks = dedup_info["shared_blocks"]
+                for page_url, entry in new_manifest.items():
+                    section_info = dedup_info["sections"][page_url]
+                    entry.update(offset=section_info["offset"], length=section_info["length"], sha256=section_info["sha256"],
+                                 stripped=sorted(set(entry.get("stripped", [])) | set(section_info["stripped"])))
+        save_manifest(manifest_path, new_manifest, conversion_settings, shared_blocks)
+        if CHUNK_INDEX_ENABLED:
+            build_chunk_index(output_md_path)
+        if SEARCH_INDEX_ENABLED:
+            update_search_index([output_md_path])
+        if VECTOR_INDEX_ENABLED:
+            update_vector_index([output_md_path])
+        if OUTPUT_COMPRESSION:
+            write_compressed_copy(output_md_path)
+        print(f"\nSuccessfully processed {processed_count}/{len(seen_page_urls)} pages for {doc_name}.")
+        print(f"Throughput: {counter.summary()}")
+        print("Stage timings:\n" + timings.summary({"fetch": MAX_CONCURRENT_REQUESTS, "convert": max(CONVERSION_WORKERS, 1)}))
+        log(NORMAL, f"Output for {doc_name} saved to: {output_md_path.resolve()}")
+        return True
+
+    except IOError as e:
+        print(f"Error opening or writing to output file {output_md_path}: {e}")
+        return False
+    finally:
+        journal.close()
+
 def main():
     """
     Main function to orchestrate the sitemap-based documentation crawling process.
@@ -256,85 +783,22 @@ def main():
         # "some_other_docs/.knowledge"
     ]
 
-    print("Starting sitemap-based documentation crawler...")
+    log(NORMAL, "Starting sitemap-based documentation crawler...")
 
     headers = {
         "User-Agent": DEFAULT_USER_AGENT
     }
 
     for knowledge_file_path_str in KNOWLEDGE_FILES:
-        print(f"\nProcessing knowledge file: {knowledge_file_path_str}")
-        sitemap_start_url = get_sitemap_url_from_knowledge_file(knowledge_file_path_str)
-
-        if not sitemap_start_url:
-            print(f"Skipping {knowledge_file_path_str} due to missing or invalid sitemap URL.")
-            continue
-
-        doc_name = Path(knowledge_file_path_str).parent.name
-        if not doc_name:
-            doc_name = Path(knowledge_file_path_str).stem
-        
-        output_dir = Path(doc_name)
-        try:
-            output_dir.mkdir(parents=True, exist_ok=True)
-            print(f"Output directory: {output_dir.resolve()}")
-        except Exception as e:
-            print(f"Error creating output directory {output_dir}: {e}. Skipping {doc_name}.")
-            continue
-            
-        output_md_path = output_dir / "docs.md"
-
-        print(f"Processing documentation for: '{doc_name}'")
-        print(f"Sitemap URL: {sitemap_start_url}")
-        print(f"Output will be saved to: {output_md_path.resolve()}")
-
-        all_page_urls = fetch_and_parse_sitemap(sitemap_start_url, headers)
-
-        if not all_page_urls:
-            print(f"No page URLs found or sitemap processing failed for {doc_name}. Skipping.")
-            continue
-        
-        print(f"Found {len(all_page_urls)} unique page URLs in sitemap for {doc_name}.")
-
-        try:
-            with open(output_md_path, 'w', encoding='utf-8') as output_file_handle:
-                output_file_handle.write(f"# Combined Documentation for {doc_name} (from Sitemap)\n")
-                output_file_handle.write(f"<!-- Source .knowledge file: {knowledge_file_path_str} -->\n")
-                output_file_handle.write(f"<!-- Source Sitemap URL: {sitemap_start_url} -->\n\n")
-                
-                processed_count = 0
-                for i, page_url in enumerate(all_page_urls):
-                    print(f"\nProcessing URL {i+1}/{len(all_page_urls)}: {page_url}")
-                    html_content = fetch_page_html(page_url, headers)
-                    
-                    if html_content:
-                        markdown_content = convert_html_to_markdown(html_content, page_url)
-                        if markdown_content:
-                            try:
-                                output_file_handle.write(f"\n\n---\n\n<!-- Source URL: {page_url} -->\n\n---\n\n")
-                                output_file_handle.write(markdown_content)
-                                output_file_handle.flush() # Write to disk periodically
-                                processed_count += 1
-                            except IOError as e_io:
-                                print(f"    Error writing Markdown for {page_url} to file: {e_io}")
-                        else:
-                            print(f"    Skipping {page_url} due to HTML to Markdown conversion failure.")
-                    else:
-                        print(f"    Skipping {page_url} due to HTML fetch failure.")
-                    
-                    # Be polite to the server
-                    if i < len(all_page_urls) - 1: # Don't sleep after the last item
-                        print(f"  Waiting for {PER_REQUEST_DELAY_SECONDS}s before next request...")
-                        time.sleep(PER_REQUEST_DELAY_SECONDS)
-
-                print(f"\nSuccessfully processed {processed_count}/{len(all_page_urls)} pages for {doc_name}.")
-                print(f"Output for {doc_name} saved to: {output_md_path.resolve()}")
-
-        except IOError as e:
-            print(f"Error opening or writing to output file {output_md_path}: {e}")
-            continue # To the next knowledge file
-
-    print("\nSitemap documentation crawling process finished.")
+        log(NORMAL, f"\nProcessing knowledge file: {knowledge_file_path_str}")
+        crawl_knowledge_file(knowledge_file_path_str, headers)
+
+    print_cache_stats()
+    print_content_store_stats()
+    print_write_stats()
+    print_connection_stats()
+    print_metrics_summary()
+    log(NORMAL, "\nSitemap documentation crawling process finished.")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,96 @@
+# test_benchmark.py
+import gzip
+import re
+
+import pytest
+import requests
+
+import benchmark
+from benchmark import MOCK_OWNER, MOCK_REPO, MockDocsServer, compare_to_baseline
+
+
+@pytest.fixture
+def server():
+    server = MockDocsServer(pages=25, child_sitemaps=3, depth=1, fanout=2, files_per_dir=2, gzip_sitemaps=True)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_sitemaps_list_every_page_once(server):
+    index = requests.get(f"{server.base_url}/sitemap.xml", timeout=5).text
+    child_urls = re.findall(r"<loc>([^<]+)</loc>", index)
+    assert len(child_urls) == 3 and all(url.endswith(".xml.gz") for url in child_urls)
+    pages = []
+    for url in child_urls:
+        pages += re.findall(r"<loc>([^<]+)</loc>", gzip.decompress(requests.get(url, timeout=5).content).decode('utf-8'))
+    assert sorted(pages) == sorted(f"{server.base_url}/docs/page-{n}.html" for n in range(25))
+    assert "<h1>" in requests.get(pages[0], timeout=5).text
+
+
+def test_tree_listing_matches_file_count(server):
+    def walk(url):
+        files = 0
+        for entry in requests.get(url, timeout=5).json():
+            if entry["type"] == "dir":
+                files += walk(entry["url"])
+            elif entry["name"].endswith(".md"):
+                assert requests.get(entry["download_url"], timeout=5).status_code == 200
+                files += 1
+        return files
+
+    assert walk(server.contents_url()) == server.file_count()
+    missing = requests.get(f"{server.base_url}/repos/{MOCK_OWNER}/{MOCK_REPO}/contents/missing", timeout=5)
+    assert missing.status_code == 404
+
+
+def test_injected_failures_are_deterministic_and_fail_only_once():
+    def statuses(seed):
+        server = MockDocsServer(pages=40, error_rate=0.5, seed=seed)
+        server.start()
+        try:
+            urls = [f"{server.base_url}/docs/page-{n}.html" for n in range(40)]
+            first = [requests.get(url, timeout=5).status_code for url in urls]
+            second = [requests.get(url, timeout=5).status_code for url in urls]
+        finally:
+            server.stop()
+        assert second == [200] * 40
+        assert first.count(503) == server.injected_errors
+        return first
+
+    first = statuses(seed=1)
+    assert statuses(seed=1) == first
+    assert 503 in first and 200 in first
+
+
+def test_compare_to_baseline_flags_only_regressions_beyond_the_tolerance():
+    baseline = [{"scenario": "sitemap", "pages_per_second": 100.0, "latency_p99_ms": 50.0, "cpu_seconds": 10.0,
+                 "peak_rss_kib": 0}]
+    results = [{"scenario": "sitemap", "pages_per_second": 80.0, "latency_p99_ms": 54.0, "cpu_seconds": 5.0,
+                "peak_rss_kib": 90_000},
+               {"scenario": "github", "pages_per_second": 1.0}]
+    assert compare_to_baseline(results, baseline, tolerance=0.1) == [
+        "sitemap: pages_per_second 100.0 -> 80.0 (20% worse)"]
+    assert compare_to_baseline(results, baseline, tolerance=0.25) == []
+
+
+def test_sitemap_scenario_crawls_every_page(server, tmp_path, monkeypatch):
+    pytest.importorskip("markdownify")
+    import content_store
+    import github_rate_limit
+    import http_cache
+    import retry_policy
+    import sitemap_docs_crawler
+
+    monkeypatch.chdir(tmp_path)
+    # run_scenario sets these process-wide; record them so they are restored afterwards
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_ENABLED", False)
+    monkeypatch.setattr(retry_policy.DEFAULT_RETRY_POLICY, "base_delay", retry_policy.DEFAULT_RETRY_POLICY.base_delay)
+    monkeypatch.setattr(github_rate_limit.GITHUB_RETRY_POLICY, "base_delay", github_rate_limit.GITHUB_RETRY_POLICY.base_delay)
+    monkeypatch.setattr(sitemap_docs_crawler, "PER_HOST_REQUESTS_PER_SECOND", sitemap_docs_crawler.PER_HOST_REQUESTS_PER_SECOND)
+    monkeypatch.setattr(sitemap_docs_crawler, "CONVERSION_WORKERS", 0)
+    monkeypatch.setattr(content_store, "CONTENT_STORE_ENABLED", False)
+
+    result = benchmark.run_scenario("sitemap", server.base_url, requests_per_second=1000)
+    assert result["scenario"] == "sitemap" and result["pages"] == 25
+    assert result["output_bytes"] == (tmp_path / "bench-sitemap" / "docs.md").stat().st_size
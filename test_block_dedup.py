@@ -0,0 +1,86 @@
+# test_block_dedup.py
+import hashlib
+
+import pytest
+
+from block_dedup import SHARED_BLOCKS_SOURCE, deduplicate_docs, is_dedup_candidate, split_blocks
+
+BANNER = "You are reading the documentation for version 3 of the framework."
+FOOTER = "Except as otherwise noted, this page is licensed under CC BY 4.0."
+
+
+def bundle(bodies: list[str]) -> str:
+    return "# Docs\n" + "".join(f"\n\n---\n\n<!-- Source URL: https://docs.example/{n} -->\n\n---\n\n{body}"
+                                for n, body in enumerate(bodies))
+
+
+def page(n: int, middle: str = "") -> str:
+    return f"{BANNER}\n\n# Page {n}\n\n{middle}Content of page {n}, long enough to matter.\n\n{FOOTER}\n"
+
+
+def test_split_blocks_round_trips_and_keeps_fences_whole():
+    body = "\n\nPara one\nstill one\n\n```py\na = 1\n\nb = 2\n```\n\n\nTail\n"
+    blocks = split_blocks(body)
+    assert "".join(block + separator for block, separator in blocks) == body
+    assert [block for block, _ in blocks] == ["", "Para one\nstill one\n", "```py\na = 1\n\nb = 2\n```\n", "Tail\n"]
+
+
+@pytest.mark.parametrize("block, expected", [
+    ("A plain paragraph of text.", True),
+    ("Text with <kbd>Ctrl</kbd> inside.", True),
+    ("## A heading", False),
+    ("Setext heading\n---", False),
+    ("```js\nrun()\n```", False),
+    ("import Tabs from '@theme/Tabs';", False),
+    ('<div class="overflow-auto">', False), # Only tags
+    ("<Props of={Button} />", False),
+    ("<details>Opened here but closed in a later block", False),
+])
+def test_candidates_never_change_page_structure(block, expected):
+    assert is_dedup_candidate(block) is expected
+
+
+def test_edge_blocks_on_many_pages_are_shared_once():
+    text = bundle([page(n) for n in range(5)])
+    new_text, info = deduplicate_docs(text, min_pages=3)
+
+    assert sorted(info["shared_blocks"].values()) == sorted([BANNER, FOOTER])
+    assert new_text.count(BANNER) == new_text.count(FOOTER) == 1
+    assert new_text.index(SHARED_BLOCKS_SOURCE) < new_text.index("# Page 0")
+    for n in range(5):
+        assert f"Content of page {n}, long enough to matter." in new_text
+    assert info["bytes_after"] == len(new_text.encode('utf-8')) < info["bytes_before"]
+
+
+def test_blocks_inside_pages_and_below_the_threshold_are_kept():
+    bodies = [page(n, middle=f"{FOOTER}\n\n") for n in range(3)] + [page(3), page(4)]
+    new_text, info = deduplicate_docs(bundle(bodies), min_pages=4)
+    assert sorted(info["shared_blocks"].values()) == sorted([BANNER, FOOTER])
+    assert new_text.count(FOOTER) == 4 # Shared once, kept mid-page on three pages
+
+    _, info = deduplicate_docs(bundle(bodies), min_pages=5)
+    assert info["shared_blocks"] == {}
+
+
+def test_section_ranges_describe_the_new_text():
+    new_text, info = deduplicate_docs(bundle([page(n) for n in range(5)]), min_pages=3)
+    data = new_text.encode('utf-8')
+    for source, section in info["sections"].items():
+        section_bytes = data[section["offset"]:section["offset"] + section["length"]]
+        assert section_bytes.startswith(f"\n\n---\n\n<!-- Source URL: {source} -->".encode('utf-8'))
+        assert hashlib.sha256(section_bytes).hexdigest() == section["sha256"]
+        assert set(section["stripped"]) == set(info["shared_blocks"])
+
+
+def test_second_pass_is_stable_and_keeps_carried_over_blocks():
+    once, info = deduplicate_docs(bundle([page(n) for n in range(5)]), min_pages=3)
+    twice, info_again = deduplicate_docs(once, min_pages=3)
+    assert twice == once
+    assert info_again["shared_blocks"] == info["shared_blocks"]
+
+
+def test_extra_shared_blocks_stay_in_the_shared_section():
+    extra = {"0123456789abcdef": "A block stripped from a spliced section earlier."}
+    new_text, info = deduplicate_docs(bundle([page(0)]), min_pages=3, extra_shared=extra)
+    assert "A block stripped from a spliced section earlier." in new_text
+    assert info["sections"]["https://docs.example/0"]["stripped"] == []
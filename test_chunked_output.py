@@ -0,0 +1,62 @@
+# test_chunked_output.py
+import sqlite3
+
+import chunked_output
+from chunked_output import build_chunk_index, iter_chunks, read_chunk
+
+HEADER = "# Docs\n\nCrawled from the docs site.\n"
+
+
+def section(source, body):
+    return f"\n\n---\n\n<!-- Source URL: {source} -->\n\n---\n\n{body}"
+
+
+BUNDLE = (HEADER
+          + section("https://docs.example/intro", "# Intro\n\nWelcome. Ünïcode text.\n\n## Install\n\nRun pip.\n"
+                                                 "```sh\n# not a heading\npip install x\n```\n")
+          + section("https://docs.example/setext", "Guide\n=====\n\nBody.\n\nPart\n----\n\nMore body.\n")
+          + section("https://docs.example/front", "---\ntitle: x\n---\n\nNo headings here.\n"))
+
+
+def test_chunks_cover_every_section_byte():
+    data = BUNDLE.encode('utf-8')
+    chunks = list(iter_chunks(data))
+    assert chunks[0]["offset"] == len(HEADER.encode('utf-8'))
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert chunk["offset"] + chunk["length"] == following["offset"]
+    assert chunks[-1]["offset"] + chunks[-1]["length"] == len(data)
+
+
+def test_chunks_follow_headings_outside_fences_and_front_matter():
+    chunks = list(iter_chunks(BUNDLE.encode('utf-8')))
+    assert [(chunk["source"].rsplit("/", 1)[-1], chunk["heading_path"]) for chunk in chunks] == [
+        ("intro", ["Intro"]), ("intro", ["Intro", "Install"]),
+        ("setext", ["Guide"]), ("setext", ["Guide", "Part"]),
+        ("front", []),
+    ]
+    # The source marker stays with the first heading of its section
+    assert BUNDLE.encode('utf-8')[chunks[0]["offset"]:].startswith(b"\n\n---\n\n<!-- Source URL: https://docs.example/intro")
+
+
+def test_long_sections_split_at_blank_lines(monkeypatch):
+    monkeypatch.setattr(chunked_output, "MAX_CHUNK_TOKENS", 10)
+    paragraphs = [f"Paragraph {n} " + "word " * 12 for n in range(5)]
+    data = (HEADER + section("https://docs.example/long", "\n\n".join(paragraphs) + "\n")).encode('utf-8')
+    chunks = list(iter_chunks(data))
+    texts = [data[chunk["offset"]:chunk["offset"] + chunk["length"]].decode('utf-8') for chunk in chunks]
+    assert len(texts) > 1
+    for paragraph in paragraphs: # Never cut in half
+        assert sum(paragraph in text for text in texts) == 1
+
+
+def test_index_offsets_read_back_through_mmap(tmp_path):
+    docs_path = tmp_path / "docs.md"
+    docs_path.write_bytes(BUNDLE.encode('utf-8'))
+    index_path = build_chunk_index(docs_path)
+    with sqlite3.connect(index_path) as db:
+        rows = db.execute("SELECT heading_path, offset, length FROM chunks ORDER BY offset").fetchall()
+        meta = dict(db.execute("SELECT key, value FROM meta"))
+    assert meta["docs_size"] == str(docs_path.stat().st_size)
+    assert [heading for heading, _, _ in rows][:2] == ["Intro", "Intro > Install"]
+    assert "Ünïcode text" in read_chunk(docs_path, rows[0][1], rows[0][2])
+    assert read_chunk(docs_path, rows[1][1], rows[1][2]).startswith("## Install")
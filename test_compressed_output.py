@@ -0,0 +1,63 @@
+# test_compressed_output.py
+import gzip
+import json
+import random
+
+import pytest
+
+import compressed_output
+from compressed_output import FRAME_INDEX_SUFFIX, read_range, write_compressed_copy
+
+
+def section(n):
+    body = f"# Page {n}\n\n" + random.Random(n).randbytes(300).hex() + "\n"
+    return f"\n\n---\n\n<!-- Source URL: https://docs.example/{n} -->\n\n---\n\n{body}"
+
+
+@pytest.fixture
+def docs_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(compressed_output, "FRAME_TARGET_BYTES", 2048)
+    path = tmp_path / "docs.md"
+    path.write_text("# Docs\n" + "".join(section(n) for n in range(30)), encoding='utf-8')
+    return path
+
+
+def test_frames_start_at_sections_and_gunzip_whole(docs_path):
+    compressed_path = write_compressed_copy(docs_path, "gzip")
+    data = docs_path.read_bytes()
+    assert gzip.decompress(compressed_path.read_bytes()) == data
+
+    with open(compressed_path.with_name(compressed_path.name + FRAME_INDEX_SUFFIX), encoding='utf-8') as f:
+        frames = json.load(f)["frames"]
+    assert len(frames) > 1
+    assert frames[0][0] == 0 and sum(frame[1] for frame in frames) == len(data)
+    for start, _, _, _ in frames[1:]:
+        assert data[start:].startswith(b"\n\n---\n\n<!-- Source URL: ")
+
+
+def test_read_range_decompresses_only_overlapping_frames(docs_path, monkeypatch):
+    compressed_path = write_compressed_copy(docs_path, "gzip")
+    data = docs_path.read_bytes()
+    decompressed = []
+    decompress = compressed_output._decompress_frame
+    monkeypatch.setattr(compressed_output, "_decompress_frame",
+                        lambda frame, compression: decompressed.append(frame) or decompress(frame, compression))
+
+    offset = data.index(b"# Page 17")
+    assert read_range(compressed_path, offset, 40) == data[offset:offset + 40]
+    assert len(decompressed) == 1
+
+    for offset, length in [(0, 10), (0, len(data)), (len(data) - 5, 5), (1000, 5000)]:
+        assert read_range(compressed_path, offset, length) == data[offset:offset + length]
+
+
+def test_zstd_falls_back_to_gzip_without_the_package(docs_path, monkeypatch):
+    monkeypatch.setattr(compressed_output, "ZSTD_AVAILABLE", False)
+    compressed_path = write_compressed_copy(docs_path, "zstd")
+    assert compressed_path.name == "docs.md.gz"
+    assert read_range(compressed_path, 7, 20) == docs_path.read_bytes()[7:27]
+
+
+def test_compression_off_writes_nothing(docs_path):
+    assert write_compressed_copy(docs_path) is None
+    assert list(docs_path.parent.iterdir()) == [docs_path]
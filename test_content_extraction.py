@@ -0,0 +1,38 @@
+# test_content_extraction.py
+import pytest
+
+pytest.importorskip("markdownify")
+
+from content_extraction import extract_main_content
+from fast_markdown import convert_html
+
+PAGE = ("<html><body><div class=\"navbar\">Top</div><div id=\"sidebar\">Side</div>"
+        "<main><h1>API</h1><div class=\"api-header\">Signature</div><div class=\"toc-title\">Contents</div>"
+        "<ul class=\"nav-tabs\"><li>Dart</li></ul><div class=\"dropdown-menu\">Versions</div>"
+        "<div class=\"menu\">Menu</div><div class=\"toc\">Jump to</div>"
+        "<table class=\"toc\"><tr><th class=\"table-header\">Name</th></tr><tr><td>key</td></tr></table>"
+        "<aside><pre><code>example()</code></pre></aside><aside>Related</aside>"
+        "<div class=\"sidebar\"><code>inline()</code></div></main></body></html>")
+
+
+def _text(html):
+    return extract_main_content(html).get_text(" ", strip=True)
+
+
+def test_only_whole_class_tokens_are_chrome():
+    text = _text(PAGE)
+    for kept in ("Signature", "Contents", "Dart", "Versions"):
+        assert kept in text
+    for dropped in ("Top", "Side", "Menu", "Jump to", "Related"):
+        assert dropped not in text
+
+
+def test_tables_and_code_are_kept():
+    text = _text(PAGE)
+    for kept in ("Name", "key", "example()", "inline()"):
+        assert kept in text
+
+
+def test_streaming_converter_prunes_the_same_elements():
+    from markdownify import MarkdownConverter
+    assert convert_html(PAGE) == MarkdownConverter().convert_soup(extract_main_content(PAGE))
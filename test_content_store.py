@@ -0,0 +1,54 @@
+# test_content_store.py
+import zlib
+
+from content_store import ContentStore, content_key
+
+
+def test_round_trip_and_stats(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    key = content_key("<p>Hello</p>", {"engine": "markdownify"})
+    assert store.get_text(key) is None
+    store.put_text(key, "Hello ✓")
+    assert store.get_text(key) == "Hello ✓"
+    assert (store.hits, store.misses, store.bytes_saved) == (1, 1, len("Hello ✓"))
+    assert zlib.decompress((tmp_path / "store" / key).read_bytes()) == "Hello ✓".encode('utf-8')
+
+    reopened = ContentStore(str(tmp_path / "store"))
+    assert reopened.get_text(key) == "Hello ✓"
+    assert reopened._total_bytes == store._total_bytes
+
+
+def test_keys_cover_content_and_settings():
+    key = content_key("<p>x</p>", {"engine": "markdownify", "selector": None})
+    assert key == content_key("<p>x</p>", {"selector": None, "engine": "markdownify"})
+    assert key != content_key("<p>y</p>", {"engine": "markdownify", "selector": None})
+    assert key != content_key("<p>x</p>", {"engine": "streaming", "selector": None})
+    assert content_key("\udcff", {}) # Lone surrogates from undecodable pages still hash
+
+
+def test_damaged_entry_is_a_miss(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    store.put_text("k", "value")
+    (tmp_path / "store" / "k").write_bytes(b"not zlib")
+    assert store.get_text("k") is None
+    assert store.misses == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    texts = {name: name * 2000 for name in "abc"}
+    entry_size = len(zlib.compress(texts["a"].encode('utf-8'), 6))
+    store = ContentStore(str(tmp_path / "store"), max_bytes=2 * entry_size)
+    store.put_text("a", texts["a"])
+    store.put_text("b", texts["b"])
+    store.get_text("a")
+    store.put_text("c", texts["c"])
+    assert store.get_text("b") is None
+    assert store.get_text("a") == texts["a"] and store.get_text("c") == texts["c"]
+    assert store._total_bytes <= store.max_bytes
+
+
+def test_rewriting_a_key_keeps_the_size_accounting(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    store.put_text("k", "x" * 10000)
+    store.put_text("k", "short")
+    assert store._total_bytes == (tmp_path / "store" / "k").stat().st_size
@@ -0,0 +1,54 @@
+# test_conversion_pool.py
+import pytest
+
+pytest.importorskip("markdownify")
+
+import sitemap_docs_crawler
+from content_store import ContentStore
+from crawl_throttle import StageTimings
+from sitemap_docs_crawler import convert_pages, create_conversion_pool
+
+
+def fetched_pages(count: int, pulled: list = None):
+    """Yields (url, html) pairs like the fetch stage, with every fourth page failed; records what was pulled."""
+    for n in range(count):
+        if pulled is not None:
+            pulled.append(n)
+        yield f"https://docs.example/{n}", None if n % 4 == 3 else f"<h1>Page {n}</h1><p>Body of page <b>{n}</b>.</p>"
+
+
+def test_inline_conversion_keeps_order_and_failures():
+    results = list(convert_pages(fetched_pages(8), None, StageTimings()))
+    assert [url for url, _, _ in results] == [f"https://docs.example/{n}" for n in range(8)]
+    for n, (_, fetched, markdown_content) in enumerate(results):
+        if n % 4 == 3:
+            assert (fetched, markdown_content) == (False, None)
+        else:
+            assert fetched and f"Body of page **{n}**." in markdown_content
+
+
+def test_pool_matches_inline_conversion(monkeypatch):
+    monkeypatch.setattr(sitemap_docs_crawler, "CONVERSION_WORKERS", 2)
+    timings = StageTimings()
+    with create_conversion_pool() as pool:
+        pooled = list(convert_pages(fetched_pages(12), pool, timings))
+    assert pooled == list(convert_pages(fetched_pages(12), None, StageTimings()))
+    assert "convert" in timings.summary() and "writer_wait" in timings.summary()
+
+
+def test_window_bounds_the_pages_pulled_ahead(monkeypatch):
+    monkeypatch.setattr(sitemap_docs_crawler, "CONVERSION_WINDOW_SIZE", 3)
+    pulled = []
+    results = convert_pages(fetched_pages(10, pulled), None, StageTimings())
+    next(results)
+    assert pulled == [0, 1, 2]
+    next(results)
+    assert pulled == [0, 1, 2, 3]
+
+
+def test_stored_conversions_are_reused(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    first = list(convert_pages(fetched_pages(4), None, StageTimings(), store=store))
+    assert (store.hits, store.misses) == (0, 3)
+    assert list(convert_pages(fetched_pages(4), None, StageTimings(), store=store)) == first
+    assert store.hits == 3
@@ -0,0 +1,107 @@
+# test_crawl_journal.py
+import pytest
+
+from crawl_journal import CrawlJournal
+
+
+def start_journal(path, fingerprint="config-1", **kwargs):
+    journal = CrawlJournal(path, fingerprint, **kwargs)
+    handle = journal.start()
+    if not journal.is_done(CrawlJournal.HEADER_KEY):
+        handle.write("# Header\n")
+        journal.mark_header_written()
+    return journal, handle
+
+
+def crash(journal):
+    """Leaves the files as a killed process would: written bytes reach the file, nothing is checkpointed."""
+    journal._output_handle.flush()
+    journal._output_handle = None
+    journal._journal_handle.close()
+
+
+@pytest.fixture
+def output_path(tmp_path):
+    return tmp_path / "docs.md"
+
+
+def test_resume_skips_completed_entries_and_cuts_unjournaled_output(output_path):
+    journal, handle = start_journal(output_path, sync_every=1)
+    for page in ("a", "b"):
+        handle.write(f"page {page}\n")
+        journal.mark_done(page, lastmod=f"2025-01-0{ord(page) - 96}")
+    handle.write("page c, half written")
+    crash(journal)
+
+    journal, handle = start_journal(output_path, sync_every=1)
+    assert journal.resumed
+    assert journal.entries == {CrawlJournal.HEADER_KEY: {}, "a": {"lastmod": "2025-01-01"}, "b": {"lastmod": "2025-01-02"}}
+    assert not journal.is_done("c")
+    handle.write("page c\n")
+    journal.mark_done("c")
+    journal.finish()
+
+    assert output_path.read_text(encoding='utf-8') == "# Header\npage a\npage b\npage c\n"
+    assert not journal.partial_path.exists() and not journal.journal_path.exists()
+
+
+def test_uncheckpointed_entries_are_redone(output_path):
+    journal, handle = start_journal(output_path, sync_every=2, sync_interval=3600)
+    for page in ("a", "b", "c"):
+        handle.write(f"page {page}\n")
+        journal.mark_done(page)
+    crash(journal) # "c" was written but its batch never checkpointed
+
+    journal, handle = start_journal(output_path)
+    assert set(journal.entries) == {CrawlJournal.HEADER_KEY, "a", "b"}
+    assert journal.partial_path.read_text(encoding='utf-8') == "# Header\npage a\npage b\n"
+
+
+def test_close_checkpoints_for_a_later_resume(output_path):
+    journal, handle = start_journal(output_path, sync_every=100, sync_interval=3600)
+    handle.write("page a\n")
+    journal.mark_done("a")
+    journal.close()
+
+    journal, _ = start_journal(output_path)
+    assert journal.is_done("a")
+
+
+def test_torn_journal_line_is_ignored(output_path):
+    journal, handle = start_journal(output_path, sync_every=1)
+    handle.write("page a\n")
+    journal.mark_done("a")
+    crash(journal)
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "b", "en')
+
+    journal, _ = start_journal(output_path)
+    assert set(journal.entries) == {CrawlJournal.HEADER_KEY, "a"}
+
+
+def test_other_configuration_starts_over(output_path, capsys):
+    journal, handle = start_journal(output_path, sync_every=1)
+    handle.write("page a\n")
+    journal.mark_done("a")
+    crash(journal)
+
+    journal, handle = start_journal(output_path, fingerprint="config-2")
+    assert not journal.resumed and not journal.is_done("a")
+    assert "different crawl configuration" in capsys.readouterr().out
+    journal.finish()
+    assert output_path.read_text(encoding='utf-8') == "# Header\n"
+
+
+def test_binary_output_resumes_in_binary_mode(output_path):
+    journal = CrawlJournal(output_path, "config-1", sync_every=1)
+    handle = journal.start(binary=True)
+    handle.write("ä\n".encode('utf-8'))
+    journal.mark_done("a")
+    crash(journal)
+
+    journal = CrawlJournal(output_path, "config-1")
+    handle = journal.start(binary=True)
+    handle.write(b"b\n")
+    journal.mark_done("b")
+    journal.finish()
+    assert output_path.read_bytes() == "ä\nb\n".encode('utf-8')
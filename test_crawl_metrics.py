@@ -0,0 +1,71 @@
+# test_crawl_metrics.py
+import re
+
+from crawl_metrics import BYTES_BUCKETS, CrawlMetrics, Histogram
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(?:,|$)')
+
+
+def parse_prometheus(text):
+    """Parses the text format into {family: (type, [(sample name, labels, value)])}, checking its structure."""
+    families = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name not in families, f"second TYPE line for {name}"
+            families[name] = (kind, [])
+            current = name
+            continue
+        match = SAMPLE_LINE.match(line)
+        assert match, f"malformed line {line!r}"
+        name, label_text, value = match.groups()
+        labels = dict(LABEL.findall(label_text or ""))
+        assert current is not None and name in (current, f"{current}_bucket", f"{current}_sum", f"{current}_count"), \
+            f"{name} outside its family"
+        families[current][1].append((name, labels, float(value)))
+    return families
+
+
+def test_one_type_line_per_family():
+    metrics = CrawlMetrics(jsonl_path=None)
+    for status in ("200", "304", "404"):
+        metrics.count("page_total", outcome=status)
+    metrics.count("page_total", 2, outcome="200")
+    for value in (0.002, 0.2, 3.0):
+        metrics.observe("page_fetch_seconds", value, host="a.example")
+    metrics.observe("page_fetch_seconds", 0.02, host="b.example")
+    metrics.observe("page_bytes", 5000, BYTES_BUCKETS)
+
+    families = parse_prometheus(metrics.prometheus_text())
+
+    assert families.keys() == {"crawl_page_total", "crawl_page_fetch_seconds", "crawl_page_bytes"}
+    kind, samples = families["crawl_page_total"]
+    assert kind == "counter"
+    assert {labels["outcome"]: value for _, labels, value in samples} == {"200": 3, "304": 1, "404": 1}
+
+    kind, samples = families["crawl_page_fetch_seconds"]
+    assert kind == "histogram"
+    counts = {labels["host"]: value for name, labels, value in samples if name.endswith("_count")}
+    assert counts == {"a.example": 3, "b.example": 1}
+    buckets = [(labels["le"], value) for name, labels, value in samples
+               if name.endswith("_bucket") and labels["host"] == "a.example"]
+    assert buckets[-1] == ("+Inf", 3)
+    assert [value for _, value in buckets] == sorted(value for _, value in buckets)
+
+
+def test_label_values_are_escaped():
+    metrics = CrawlMetrics(jsonl_path=None)
+    metrics.count("request_total", outcome='say "hi"\\now')
+    _, samples = parse_prometheus(metrics.prometheus_text())["crawl_request_total"]
+    assert samples == [("crawl_request_total", {"outcome": 'say \\"hi\\"\\\\now'}, 1.0)]
+
+
+def test_histogram_quantiles_stay_within_observed_range():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.count == 4 and histogram.sum == 6.5
+    assert 1.0 <= histogram.quantile(0.5) <= 2.0
+    assert histogram.quantile(1.0) == 3.0
@@ -0,0 +1,131 @@
+# test_crawl_throttle.py
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import crawl_throttle
+from crawl_throttle import (HostThrottle, RequestBudget, StageTimings, ThroughputCounter, TokenBucket,
+                            install_request_budget, request_slot)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock that `time.sleep` advances instead of blocking."""
+    now = [1000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(crawl_throttle.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(crawl_throttle.time, "sleep", sleep)
+    return sleeps
+
+
+def test_token_bucket_allows_a_burst_then_spreads_requests(clock):
+    bucket = TokenBucket(rate=4, capacity=2)
+    for _ in range(2):
+        bucket.acquire()
+    assert clock == []
+    for _ in range(3):
+        bucket.acquire()
+    assert clock == pytest.approx([0.25] * 3)
+
+
+def test_non_positive_rate_is_unlimited(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock == []
+
+
+def test_crawl_delay_only_ever_slows_a_host_down(clock):
+    throttle = HostThrottle(4, requests_per_second=10)
+    throttle.limit_host_rate("Docs.Example", 0.5)
+    throttle.limit_host_rate("docs.example", 5) # Faster than the Crawl-delay: ignored
+    for _ in range(2):
+        with throttle.slot("https://docs.example/page"):
+            pass
+    with throttle.slot("https://other.example/page"):
+        pass
+    assert clock == pytest.approx([2.0])
+
+
+def test_concurrency_is_capped_per_host():
+    throttle = HostThrottle(2, requests_per_second=0)
+    in_flight = {"a.example": 0, "b.example": 0}
+    peaks = dict(in_flight)
+    lock = threading.Lock()
+
+    def request(host):
+        with throttle.slot(f"https://{host}/page"):
+            with lock:
+                in_flight[host] += 1
+                peaks[host] = max(peaks[host], in_flight[host])
+            time.sleep(0.01)
+            with lock:
+                in_flight[host] -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(request, ["a.example", "b.example"] * 8))
+    assert peaks == {"a.example": 2, "b.example": 2}
+
+
+def test_request_budget_caps_requests_and_counts_them_per_source():
+    budget = RequestBudget(max_in_flight=3, throttle=HostThrottle(8, requests_per_second=0))
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def request(url):
+        with request_slot(url):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+    install_request_budget(budget)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for source in ("docs", "api"):
+                with budget.source(source):
+                    futures = [executor.submit(contextvars.copy_context().run, request, f"https://{source}.example/{n}")
+                               for n in range(5)]
+                for future in futures:
+                    future.result()
+    finally:
+        install_request_budget(None)
+    assert peak[0] <= 3
+    assert (budget.request_count("docs"), budget.request_count("api"), budget.request_count("other")) == (5, 5, 0)
+    with request_slot("https://docs.example/"): # No budget installed: a no-op
+        pass
+    assert budget.request_count("docs") == 5
+
+
+def test_stage_timings_report_per_worker_load():
+    timings = StageTimings()
+    timings.add("fetch", 6.0)
+    timings.add("fetch", 2.0)
+    timings.add("convert", 3.0)
+    with timings.measure("write"):
+        pass
+    lines = timings.summary(workers={"fetch": 8, "convert": 1}).splitlines()
+    assert lines[0].split()[:2] == ["fetch", "8.00s"] and "4000.0 ms avg over 2" in lines[0]
+    assert "1.00s per worker (8 workers)" in lines[0]
+    assert "3.00s per worker (1 workers)" in lines[1]
+    assert lines[2].split()[0] == "write" and "per worker" not in lines[2]
+    assert lines[-1] == "  Busiest stage: convert"
+
+
+def test_throughput_counter(clock):
+    counter = ThroughputCounter()
+    counter.record(1024)
+    counter.record(3072)
+    time.sleep(2)
+    assert (counter.pages, counter.bytes) == (2, 4096)
+    assert counter.summary() == "2 pages, 4096 bytes in 2.0s (1.00 pages/sec, 2.0 KiB/sec)"
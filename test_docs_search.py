@@ -0,0 +1,64 @@
+# test_docs_search.py
+import pytest
+
+from docs_search import build_match_query, index_bundle, open_search_index, search
+
+PAGES = {
+    "https://docs.example/queues": "# Queues\n\nJobs are pushed onto queues and processed by workers.\n\n"
+                                   "## Retrying jobs\n\nFailed jobs are retried by the queue worker.\n",
+    "https://docs.example/cache": "# Cache\n\nThe cache stores values; queues are mentioned once.\n",
+    "https://docs.example/mail": "# Mail\n\nSend mail with a mailable class.\n",
+}
+
+
+def write_bundle(path, pages):
+    path.write_text("# Docs\n" + "".join(f"\n\n---\n\n<!-- Source URL: {url} -->\n\n---\n\n{body}"
+                                         for url, body in pages.items()), encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def db(tmp_path):
+    connection = open_search_index(str(tmp_path / "search.sqlite3"))
+    yield connection
+    connection.close()
+
+
+def test_bm25_ranks_the_densest_chunk_first(tmp_path, db):
+    docs_path = write_bundle(tmp_path / "docs.md", PAGES)
+    index_bundle(db, docs_path)
+    results = search(db, "queue jobs")
+    assert results[0]["heading"] in ("Queues", "Queues > Retrying jobs")
+    assert {result["source"] for result in results} == {"https://docs.example/queues"}
+    assert [result["score"] for result in results] == sorted(result["score"] for result in results)
+    # Porter stemming: "retry" finds "Retrying" and "retried"
+    assert [result["heading"] for result in search(db, "retry")] == ["Queues > Retrying jobs"]
+
+    result = search(db, "mailable")[0]
+    assert docs_path.read_bytes()[result["offset"]:result["offset"] + result["length"]].endswith(
+        b"Send mail with a mailable class.\n")
+
+
+def test_operators_in_queries_are_plain_text(tmp_path, db):
+    index_bundle(db, write_bundle(tmp_path / "docs.md", PAGES))
+    assert build_match_query('cache" OR NOT (mail*') == '"cache" "OR" "NOT" "mail"'
+    assert [result["source"] for result in search(db, 'cache: "values" (')] == ["https://docs.example/cache"]
+    assert search(db, "cache NOT values") == [] # NOT is a word to match, not an operator
+    assert search(db, "?!") == []
+
+
+def test_incremental_updates_and_bundle_filter(tmp_path, db):
+    first = write_bundle(tmp_path / "first.md", PAGES)
+    second = write_bundle(tmp_path / "second.md", {"https://other.example/mail": PAGES["https://docs.example/mail"]})
+    assert index_bundle(db, first) == (4, 0, 0)
+    assert index_bundle(db, second) == (1, 0, 0)
+    assert index_bundle(db, first) == (0, 0, 0)
+    assert {result["bundle"] for result in search(db, "mailable", bundle="second")} == {second.as_posix()}
+
+    pages = dict(PAGES)
+    del pages["https://docs.example/cache"]
+    pages["https://docs.example/mail"] = "# Mail\n\nSend mail with a notification instead.\n"
+    assert index_bundle(db, write_bundle(first, pages)) == (1, 2, 2)
+    assert search(db, "stores values") == []
+    assert [result["bundle"] for result in search(db, "mailable")] == [second.as_posix()]
+    assert search(db, "notification")[0]["bundle"] == first.as_posix()
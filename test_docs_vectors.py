@@ -0,0 +1,70 @@
+# test_docs_vectors.py
+import pytest
+
+import docs_vectors
+from docs_vectors import VectorIndex
+
+PAGES = {
+    "https://docs.example/widgets": "# Widgets\n\nA widget describes part of the user interface.\n\n"
+                                    "## Stateful widgets\n\nA stateful widget keeps mutable state across rebuilds.\n",
+    "https://docs.example/routing": "# Routing\n\nThe router maps URLs to pages.\n\n"
+                                    "## Route parameters\n\nParameters are captured from the path of each route.\n",
+    "https://docs.example/testing": "# Testing\n\nRun the test suite with the runner before every release.\n",
+}
+
+
+def write_bundle(path, pages):
+    path.write_text("# Docs\n" + "".join(f"\n\n---\n\n<!-- Source URL: {url} -->\n\n---\n\n{body}"
+                                         for url, body in pages.items()), encoding='utf-8')
+    return path
+
+
+@pytest.fixture(params=["python", "numpy"])
+def ranker(request, monkeypatch):
+    if request.param == "numpy" and not docs_vectors.NUMPY_AVAILABLE:
+        pytest.skip("NumPy is not installed")
+    monkeypatch.setattr(docs_vectors, "NUMPY_AVAILABLE", request.param == "numpy")
+
+
+@pytest.fixture
+def index(tmp_path):
+    vector_index = VectorIndex(tmp_path / "index", dimensions=256)
+    yield vector_index
+    vector_index.close()
+
+
+def test_queries_rank_the_matching_section_first(tmp_path, index, ranker):
+    index.update_bundle(write_bundle(tmp_path / "docs.md", PAGES))
+    stateful, route, nothing = index.search(["stateful widget state", "route parameters path", "zzzz"], limit=3)
+
+    assert stateful[0]["source"] == "https://docs.example/widgets"
+    assert stateful[0]["heading"] == "Widgets > Stateful widgets"
+    assert route[0]["heading"] == "Routing > Route parameters"
+    assert [result["score"] for result in stateful] == sorted((result["score"] for result in stateful), reverse=True)
+    assert nothing == []
+
+
+def test_results_point_at_the_chunk_bytes(tmp_path, index, ranker):
+    docs_path = write_bundle(tmp_path / "docs.md", PAGES)
+    index.update_bundle(docs_path)
+    result = index.search(["runner release"], limit=1)[0][0]
+    data = docs_path.read_bytes()
+    assert b"Run the test suite" in data[result["offset"]:result["offset"] + result["length"]]
+
+
+def test_bundle_filter_and_incremental_update(tmp_path, index, ranker):
+    first = write_bundle(tmp_path / "first.md", PAGES)
+    second = write_bundle(tmp_path / "second.md", {"https://other.example/widgets": PAGES["https://docs.example/widgets"]})
+    index.update_bundle(first)
+    index.update_bundle(second)
+    assert {result["bundle"] for result in index.search(["stateful widget"], limit=10)[0]} == {
+        first.as_posix(), second.as_posix()}
+    assert {result["bundle"] for result in index.search(["stateful widget"], limit=10, bundle="second")[0]} == {
+        second.as_posix()}
+
+    pages = dict(PAGES)
+    del pages["https://docs.example/routing"]
+    added, kept, removed = index.update_bundle(write_bundle(first, pages))
+    assert (added, removed) == (0, 2) and kept == 3
+    assert index.update_bundle(first) == (0, 0, 0)
+    assert index.search(["route parameters"], limit=10, bundle="first")[0] == []
@@ -0,0 +1,63 @@
+# test_fast_markdown.py
+import pytest
+
+markdownify = pytest.importorskip("markdownify")
+
+from benchmark import MockDocsServer
+from content_extraction import extract_main_content
+from fast_markdown import UnsupportedSelectorError, convert_html
+
+# Fragments converted without content extraction, as markdownify(html) does
+FRAGMENTS = {
+    "named entities": "<p>&amp; &lt;tag&gt; &copy; &nbsp;x &hellip; &notin; &amp no semicolon &copy</p>",
+    "unknown entities": "<p>a &unknown; b &notit; c &unknown d</p>",
+    "numeric references": "<p>&#65;&#x42;&#X43; &#0; &#xD800; &#x80; &#147;quoted&#148; &#x81; &#99999999; &#128512;</p>",
+    "reference at end of input": "<p>tail &amp",
+    "references in code": "<pre><code>if (a &lt; b &amp;&amp; c &gt; d) {}</code></pre><p><code>&lt;div&gt;</code></p>",
+    "references in attributes": '<p><a href="/a?x=1&amp;y=2" title="T &amp; C">link</a> <img src="i.png" alt="a &lt; b"></p>',
+    "nested lists": ("<ul><li>one<ul><li>one.a</li><li>one.b<ol start=\"3\"><li>three</li><li>four</li></ol></li></ul></li>"
+                     "<li><p>two</p><p>second paragraph</p></li><li>three <code>x</code></li></ul><p>after</p>"),
+    "ordered list in list item": "<ol><li>first<ul><li>inner</li></ul>tail</li><li>second</li></ol>",
+    "table": ("<table><thead><tr><th>Name</th><th>Type</th></tr></thead><tbody><tr><td><code>key</code></td>"
+              "<td>a | b</td></tr><tr><td colspan=\"2\">spans</td></tr></tbody></table>"),
+    "table without header": "<table><tr><td>a</td><td>b</td></tr><tr><td>c</td><td>d</td></tr></table>",
+    "pre and code": ("<pre class=\"language-dart\"><code>Widget build() {\n  return Text('*x*');\n}\n</code></pre>"
+                     "<p>Inline <code>a_b*c</code> and <kbd>Ctrl</kbd></p>"),
+    "inline formatting": ("<p><strong>bold</strong>, <b>b</b>, <em>em</em>, <i>i</i>, <del>gone</del>, "
+                          "<a href=\"http://x.org\">link</a>, <a href=\"http://x.org\">http://x.org</a>, "
+                          "snake_case and 2*3, H<sub>2</sub>O, x<sup>2</sup><br>next line</p>"),
+    "headings and blocks": ("<h1>Title</h1><h2>Sub</h2><h3>Deep <em>em</em></h3><blockquote><p>quote</p>"
+                            "<blockquote>nested</blockquote></blockquote><hr><dl><dt>term</dt><dd>definition</dd></dl>"),
+    "whitespace": "<div>\n  <p>  spaced   out\n text </p>\n\n<p>\tnext</p>  </div>",
+}
+
+# Whole pages converted with content extraction, as the crawler does
+PAGES = {
+    "mock page": MockDocsServer._html_page(7),
+    "page with chrome": ("<html><body><nav class=\"menu\"><a href=\"/\">Home</a></nav><header>Site</header>"
+                         "<main><article><h1>Guide &amp; Reference</h1><p>Body &unknown; text.</p>"
+                         "<ul><li>a<ul><li>b</li></ul></li></ul></article></main>"
+                         "<aside class=\"sidebar\">Related</aside><footer>&copy; 2025</footer></body></html>"),
+}
+
+
+@pytest.mark.parametrize("html", FRAGMENTS.values(), ids=FRAGMENTS.keys())
+def test_fragment_matches_markdownify(html):
+    assert convert_html(html, extract_content=False) == markdownify.markdownify(html)
+
+
+@pytest.mark.parametrize("html", PAGES.values(), ids=PAGES.keys())
+def test_extracted_page_matches_markdownify(html):
+    expected = markdownify.MarkdownConverter().convert_soup(extract_main_content(html))
+    assert convert_html(html) == expected
+
+
+def test_content_selector_matches_markdownify():
+    html = PAGES["page with chrome"]
+    expected = markdownify.MarkdownConverter().convert_soup(extract_main_content(html, "main article"))
+    assert convert_html(html, "main article") == expected
+
+
+def test_unsupported_selector_is_rejected():
+    with pytest.raises(UnsupportedSelectorError):
+        convert_html(PAGES["page with chrome"], "main > article")
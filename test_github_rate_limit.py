@@ -0,0 +1,111 @@
+# test_github_rate_limit.py
+import pytest
+import requests
+
+import github_rate_limit
+from github_rate_limit import GitHubRateLimiter
+
+API_URL = "https://api.github.com/repos/o/r/contents/docs"
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(github_rate_limit.time, "time", fake.time)
+    monkeypatch.setattr(github_rate_limit.time, "sleep", fake.sleep)
+    return fake
+
+
+def make_response(status=200, **headers):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update({name.replace("_", "-"): str(value) for name, value in headers.items()})
+    response._content = b""
+    return response
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Answers API requests with the quota headers queued for each token, and records the tokens used."""
+    calls = []
+    quota = {}
+
+    def fake_cached_get(url, headers, timeout, **kwargs):
+        token = headers.get("Authorization")
+        calls.append(token)
+        return quota[token](len(calls))
+
+    monkeypatch.setattr(github_rate_limit, "cached_get", fake_cached_get)
+    return calls, quota
+
+
+def test_tokens_rotate_round_robin(clock, server):
+    calls, quota = server
+    quota["token a"] = quota["token b"] = lambda n: make_response(
+        X_RateLimit_Limit=100, X_RateLimit_Remaining=90, X_RateLimit_Reset=clock.now + 3600)
+    limiter = GitHubRateLimiter(["a", "b"])
+    for _ in range(4):
+        limiter.get(API_URL, {"Authorization": "token other"}, 10)
+    assert calls == ["token a", "token b", "token a", "token b"]
+    assert clock.slept == []
+
+
+def test_low_quota_is_spread_until_the_reset(clock, server):
+    calls, quota = server
+    quota[None] = lambda n: make_response(X_RateLimit_Limit=100, X_RateLimit_Remaining=10, X_RateLimit_Reset=clock.now + 100)
+    limiter = GitHubRateLimiter([])
+    limiter.get(API_URL, {}, 10)
+    limiter.get(API_URL, {}, 10)
+    assert clock.slept == [pytest.approx(10.0)] # 100s left for 10 requests
+
+
+def test_exhausted_token_waits_for_the_reset_once_per_window(clock, server):
+    calls, quota = server
+    reset_at = clock.now + 30
+    quota[None] = lambda n: make_response(X_RateLimit_Limit=5, X_RateLimit_Remaining=0, X_RateLimit_Reset=reset_at)
+    limiter = GitHubRateLimiter([])
+    limiter.get(API_URL, {}, 10)
+    quota[None] = lambda n: make_response(X_RateLimit_Limit=5) # No quota headers: the limiter counts on its own
+    limiter.get(API_URL, {}, 10)
+    assert clock.now == pytest.approx(reset_at + github_rate_limit.RATE_LIMIT_RESET_MARGIN_SECONDS)
+
+    state = limiter._states[0]
+    assert (state.remaining, state.reset_at) == (4, 0.0)
+    for _ in range(3):
+        limiter.get(API_URL, {}, 10)
+    assert state.remaining == 1 # The window was not reset again on every request
+    assert len(clock.slept) == 1
+
+
+def test_rate_limit_response_honours_retry_after(clock, server):
+    calls, quota = server
+    quota[None] = lambda n: make_response(429, Retry_After=42) if n == 1 else make_response()
+    limiter = GitHubRateLimiter([])
+    limiter.get(API_URL, {}, 10)
+    limiter.get(API_URL, {}, 10)
+    assert clock.slept == [42]
+    assert limiter.wait_seconds == 42
+
+
+def test_other_hosts_bypass_the_limiter(clock, server):
+    calls, quota = server
+    quota[None] = lambda n: make_response(X_RateLimit_Limit=5, X_RateLimit_Remaining=0, X_RateLimit_Reset=clock.now + 60)
+    limiter = GitHubRateLimiter([])
+    limiter.get(API_URL, {}, 10)
+    for _ in range(3):
+        limiter.get("https://raw.githubusercontent.com/o/r/main/README.md", {}, 10)
+    assert clock.slept == []
+    assert limiter._states[0].requests == 1
@@ -0,0 +1,78 @@
+# test_github_snapshots.py
+import io
+import random
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import github_docs_crawler
+
+API_URL = "https://api.github.com/repos/owner/repo/contents/docs"
+
+
+def make_tarball(files: dict[str, str]) -> bytes:
+    """Builds a gzipped tarball laid out like GitHub's, with an "{owner}-{repo}-{sha}/" prefix."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for path, content in files.items():
+            data = content.encode('utf-8')
+            info = tarfile.TarInfo(f"owner-repo-abc123/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+# Incompressible content, so cutting the archive short really cuts into the file data
+FILES = {f"docs/page-{n}.md": f"# Page {n}\n\n" + random.Random(n).randbytes(4096).hex() for n in range(20)}
+FILES["README.md"] = "# Outside the docs root\n"
+
+
+@pytest.fixture
+def tarball_server(monkeypatch):
+    """Serves a tarball in place of api.github.com; `server.mode` picks how the body is cut short."""
+    tarball = make_tarball(FILES)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = tarball if server.mode == "complete" else tarball[:len(tarball) // 2]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-gzip")
+            # "dropped": the connection closes before the announced length arrives
+            self.send_header("Content-Length", str(len(tarball) if server.mode == "dropped" else len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.mode = "complete"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def local_get(url, headers, timeout, get=None, policy=None, **kwargs):
+        response = requests.get(url.replace("https://api.github.com", base_url), headers=headers, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    monkeypatch.setattr(github_docs_crawler, "get_with_retries", local_get)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_complete_snapshot_is_extracted(tarball_server):
+    files = github_docs_crawler.fetch_github_snapshots([API_URL], {})
+    assert files[API_URL] == {path: content for path, content in FILES.items() if path.startswith("docs/")}
+
+
+@pytest.mark.parametrize("mode", ["dropped", "truncated"])
+def test_cut_short_snapshot_falls_back_to_contents_api(tarball_server, mode):
+    tarball_server.mode = mode
+    files = github_docs_crawler.fetch_github_snapshots([API_URL], {})
+    assert API_URL not in files # Crawled with the contents API instead of half-extracted
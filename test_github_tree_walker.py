@@ -0,0 +1,76 @@
+# test_github_tree_walker.py
+import io
+import time
+
+import pytest
+
+import content_store
+import github_docs_crawler
+import github_rate_limit
+import http_cache
+import retry_policy
+from benchmark import MOCK_OWNER, MOCK_REPO, MockDocsServer
+
+
+class SlowFirstFilesServer(MockDocsServer):
+    """Answers the first file of every directory last, so downloads complete out of listing order."""
+
+    def _handle(self, handler):
+        if handler.path.endswith("/page-0.md"):
+            time.sleep(0.05)
+        super()._handle(handler)
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_ENABLED", False)
+    monkeypatch.setattr(content_store, "CONTENT_STORE_ENABLED", False)
+    monkeypatch.setattr(retry_policy.DEFAULT_RETRY_POLICY, "base_delay", 0.01)
+    monkeypatch.setattr(github_rate_limit.GITHUB_RETRY_POLICY, "base_delay", 0.01)
+
+
+def crawl(workers, **server_options):
+    server = SlowFirstFilesServer(latency_ms=2, **server_options)
+    base_url = server.start()
+    try:
+        output = io.BytesIO()
+        github_docs_crawler.crawl_github_tree(server.contents_url(), output, {}, workers=workers)
+    finally:
+        server.stop()
+    return output.getvalue().decode('utf-8').replace(base_url, "BASE"), server
+
+
+@pytest.mark.parametrize("error_rate", [0.0, 0.2])
+def test_concurrent_walk_matches_the_sequential_crawl(error_rate):
+    sequential, server = crawl(1, depth=2, fanout=3, files_per_dir=3, error_rate=error_rate)
+    concurrent, _ = crawl(8, depth=2, fanout=3, files_per_dir=3, error_rate=error_rate)
+    assert sequential.count("<!-- Source: ") == server.file_count()
+    assert concurrent == sequential
+
+
+def test_walker_overlaps_requests_and_reports_the_critical_path():
+    server = SlowFirstFilesServer(depth=2, fanout=3, files_per_dir=3, latency_ms=5)
+    server.start()
+    try:
+        walker = github_docs_crawler.GitHubTreeWalker({}, workers=6)
+        output = io.BytesIO()
+        walker.walk(server.contents_url(), output)
+    finally:
+        server.stop()
+    directories = 1 + 3 + 9
+    assert walker.requests == directories + server.file_count()
+    assert 1 < walker.peak_in_flight <= 6
+    assert walker.critical_path_depth == 4 # Three levels of listings, then a download
+    assert walker.in_flight == 0
+
+
+def test_missing_root_writes_nothing():
+    server = MockDocsServer()
+    server.start()
+    try:
+        output = io.BytesIO()
+        github_docs_crawler.crawl_github_tree(f"{server.base_url}/repos/{MOCK_OWNER}/{MOCK_REPO}/contents/missing",
+                                              output, {}, workers=4)
+    finally:
+        server.stop()
+    assert output.getvalue() == b""
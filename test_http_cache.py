@@ -0,0 +1,140 @@
+# test_http_cache.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_cache import HttpCache
+
+BODIES = {f"/page-{n}": (f"<p>page {n}</p>" * 200).encode('utf-8') for n in range(4)}
+
+
+@pytest.fixture
+def server():
+    """Serves BODIES with an ETag, answering 304 when If-None-Match matches; records the validators it was sent."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            server.requests.append((self.path, self.headers.get("If-None-Match")))
+            body = BODIES.get(self.path.split("?")[0])
+            etag = f'"{self.path}-v{server.version}"'
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.path.endswith("?no-validators"):
+                etag = None
+            if etag and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("X-RateLimit-Remaining", "41")
+                self.end_headers()
+                return
+            self.send_response(200)
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("X-RateLimit-Remaining", "42")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    server.version = 1
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(str(tmp_path / "cache"))
+
+
+def test_304_is_served_from_the_stored_body(server, cache):
+    url = server.base_url + "/page-0"
+    first = cache.get(url, {}, 5)
+    second = cache.get(url, {}, 5)
+
+    assert first.status_code == second.status_code == 200
+    assert second.content == BODIES["/page-0"]
+    assert second.text == first.text # The stored Content-Type still gives the encoding
+    assert second.headers["X-RateLimit-Remaining"] == "41" # Headers of the 304 win
+    assert server.requests == [("/page-0", None), ("/page-0", '"/page-0-v1"')]
+    assert (cache.hits, cache.misses, cache.bytes_saved) == (1, 1, len(BODIES["/page-0"]))
+
+
+def test_changed_resource_replaces_the_entry(server, cache):
+    url = server.base_url + "/page-1"
+    cache.get(url, {}, 5)
+    server.version = 2
+    assert cache.get(url, {}, 5).content == BODIES["/page-1"]
+    assert cache.get(url, {}, 5).content == BODIES["/page-1"]
+    assert [etag for _, etag in server.requests] == [None, '"/page-1-v1"', '"/page-1-v2"']
+    assert cache.hits == 1
+
+
+@pytest.mark.parametrize("damage", ["truncated", "deleted"])
+def test_damaged_body_is_refetched_without_validators(server, cache, damage):
+    url = server.base_url + "/page-2"
+    cache.get(url, {}, 5)
+    body_path = cache.bodies_dir / cache._key(url, {})
+    if damage == "truncated":
+        body_path.write_bytes(b"<p>pa")
+    else:
+        body_path.unlink()
+        cache._lookup = lambda key: cache._db.execute( # As if the body vanished after the lookup
+            "SELECT etag, last_modified, headers, size FROM entries WHERE key = ?", (key,)).fetchone()
+
+    response = cache.get(url, {}, 5)
+    assert response.status_code == 200 and response.content == BODIES["/page-2"]
+    assert server.requests[-1] == ("/page-2", None)
+    assert body_path.read_bytes() == BODIES["/page-2"]
+
+
+def test_responses_without_validators_are_not_stored(server, cache):
+    url = server.base_url + "/page-0?no-validators"
+    cache.get(url, {}, 5)
+    cache.get(url, {}, 5)
+    assert [etag for _, etag in server.requests] == [None, None]
+    assert list(cache.bodies_dir.iterdir()) == []
+
+
+def test_streamed_body_is_cached_once_read_to_the_end(server, cache):
+    url = server.base_url + "/page-3"
+    response = cache.get(url, {}, 5, stream=True)
+    assert b"".join(response.iter_content(1024)) == BODIES["/page-3"]
+
+    revalidated = cache.get(url, {}, 5, stream=True)
+    assert server.requests[-1] == ("/page-3", '"/page-3-v1"')
+    assert b"".join(revalidated.iter_content(1024)) == BODIES["/page-3"]
+    assert cache.hits == 1
+
+
+def test_abandoned_stream_is_not_cached(server, cache):
+    url = server.base_url + "/page-3"
+    response = cache.get(url, {}, 5, stream=True)
+    next(response.iter_content(1024))
+    response.close()
+    cache.get(url, {}, 5)
+    assert server.requests[-1] == ("/page-3", None)
+    assert not list(cache.bodies_dir.glob("*.tmp"))
+
+
+def test_least_recently_used_bodies_are_evicted(server, tmp_path):
+    cache = HttpCache(str(tmp_path / "cache"), max_bytes=2 * len(BODIES["/page-0"]))
+    for n in (0, 1):
+        cache.get(f"{server.base_url}/page-{n}", {}, 5)
+    cache.get(f"{server.base_url}/page-0", {}, 5) # Revalidating counts as a use
+    cache.get(f"{server.base_url}/page-2", {}, 5)
+    keys = {path.name for path in cache.bodies_dir.iterdir()}
+    assert keys == {cache._key(f"{server.base_url}/page-{n}", {}) for n in (0, 2)}
@@ -0,0 +1,72 @@
+# test_http_session.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_session
+from http_session import ConnectionStats, session_get
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """A keep-alive HTTP/1.1 server; /redirect redirects to /page."""
+    monkeypatch.setattr(http_session, "_session", None)
+    monkeypatch.setattr(http_session, "_connection_stats", ConnectionStats())
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", "/page")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = b"<p>Hello</p>"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_keep_alive_connections_are_reused(server):
+    for _ in range(5):
+        assert session_get(f"{server.base_url}/page", {}, 5).content == b"<p>Hello</p>"
+    response = session_get(f"{server.base_url}/redirect", {}, 5)
+    assert response.status_code == 200 and len(response.history) == 1
+
+    overall, per_host = http_session._connection_stats.summary().splitlines()
+    assert overall.startswith("HTTP connections: 7 requests over 1 connection(s) (85.7% reused)")
+    assert per_host.startswith("  127.0.0.1: 7 requests over 1 connection(s)")
+
+
+def test_session_asks_for_compressed_responses(server):
+    assert "gzip" in http_session.get_session().headers["Accept-Encoding"]
+    assert http_session.get_session() is http_session.get_session()
+
+
+def test_stats_summary_percentiles():
+    stats = ConnectionStats()
+    stats.record_connection("a.example")
+    stats.record_connection("a.example")
+    for seconds in (0.01, 0.02, 0.03, 0.04):
+        stats.record_response("a.example", seconds)
+    stats.record_response("b.example", 0.5)
+    lines = stats.summary().splitlines()
+    assert lines[0] == ("HTTP connections: 5 requests over 2 connection(s) (60.0% reused), "
+                        "time to first byte p50 30 ms, p90 500 ms")
+    assert lines[1] == ("  a.example: 4 requests over 2 connection(s) (50.0% reused), "
+                        "time to first byte p50 30 ms, p90 40 ms")
+    assert lines[2].startswith("  b.example: 1 requests over 0 connection(s) (100.0% reused)")
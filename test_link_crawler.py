@@ -0,0 +1,145 @@
+# test_link_crawler.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_cache
+import link_crawler
+import retry_policy
+from crawl_throttle import HostThrottle
+from link_crawler import (BloomFilter, RobotsRules, SeenUrls, UrlFrontier, UrlScope, canonicalize_url,
+                          extract_links)
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    items = [f"https://docs.example/page-{n}".encode('utf-8') for n in range(10_000)]
+    assert all(bloom.add(item) for item in items[:100]) # Distinct items are (almost surely) new at low load
+    for item in items[100:]:
+        bloom.add(item)
+    assert not any(bloom.add(item) for item in items) # Everything added is reported as present
+
+    false_positives = sum(not bloom.add(f"https://other.example/{n}".encode('utf-8')) for n in range(2_000))
+    assert false_positives < 2_000 * 0.03
+
+
+def test_seen_urls_switch_to_the_bloom_filter_without_forgetting(monkeypatch):
+    monkeypatch.setattr(link_crawler, "LINK_CRAWL_BLOOM_CAPACITY", 1_000)
+    seen = SeenUrls(bloom_after=50)
+    urls = [f"https://docs.example/{n}" for n in range(200)]
+    assert seen.add(urls[0]) and not seen.add(urls[0])
+    for url in urls[1:]:
+        seen.add(url)
+    assert seen._bloom is not None and seen._digests is None
+    assert not any(seen.add(url) for url in urls)
+    assert 195 <= seen.count <= 200 # The filter may take a few new URLs as seen, never a seen one as new
+
+
+@pytest.mark.parametrize("link, expected", [
+    ("HTTPS://Docs.Example:443/a/./b/../c?utm_source=x&b=2&a=1#top", "https://docs.example/a/c?a=1&b=2"),
+    ("../guide/", "https://docs.example/guide/"),
+    ("http://docs.example:8080", "http://docs.example:8080/"),
+    ("mailto:team@docs.example", None),
+    ("javascript:void(0)", None),
+])
+def test_canonicalize_url(link, expected):
+    assert canonicalize_url(link, "https://docs.example/api/index.html") == expected
+
+
+def test_extract_links_honours_base_and_nofollow():
+    html = ('<base href="/v2/"><a href="intro">Intro</a><a rel="nofollow" href="/login">Log in</a>'
+            '<a href="#section">Here</a>')
+    assert extract_links(html, "https://docs.example/v1/page") == ["https://docs.example/v2/intro",
+                                                                   "https://docs.example/v2/"]
+    assert extract_links('<meta name="robots" content="noindex, nofollow"><a href="/x">x</a>',
+                         "https://docs.example/") == []
+
+
+def test_scope_applies_prefixes_extensions_and_regexes():
+    scope = UrlScope(["https://docs.example/guide/"], include=r"/guide/(api|howto)/", exclude=r"/howto/old")
+    assert "https://docs.example/guide/api/intro" in scope
+    assert "https://docs.example/guide/howto/deploy" in scope
+    assert "https://docs.example/guide/howto/old-deploy" not in scope
+    assert "https://docs.example/guide/blog/post" not in scope
+    assert "https://docs.example/guide/api/diagram.png" not in scope
+    assert "https://docs.example/other/api/intro" not in scope
+
+
+def test_frontier_prefers_most_linked_then_shallowest():
+    frontier = UrlFrontier(UrlScope(["https://docs.example/"]), max_depth=2)
+    assert frontier.add("https://docs.example/a", 1)
+    assert frontier.add("https://docs.example/b", 1)
+    assert not frontier.add("https://docs.example/b", 2) # Another in-link, not a new entry
+    assert frontier.add("https://docs.example/c", 0)
+    assert not frontier.add("https://docs.example/d", 3) # Too deep
+    assert not frontier.add("https://elsewhere.example/", 0)
+    order = [frontier.pop()[0] for _ in range(len(frontier))]
+    assert order == ["https://docs.example/b", "https://docs.example/c", "https://docs.example/a"]
+    assert frontier.pop() is None
+    assert not frontier.add("https://docs.example/a", 1) # Already fetched
+
+
+class RecordingThrottle(HostThrottle):
+    def __init__(self):
+        super().__init__(1, 0)
+        self.limits = {}
+
+    def limit_host_rate(self, host, requests_per_second):
+        self.limits[host] = requests_per_second
+        super().limit_host_rate(host, requests_per_second)
+
+
+@pytest.fixture
+def robots_server(monkeypatch):
+    """Serves `robots_server.robots` as (status, body) for /robots.txt and counts the requests."""
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_ENABLED", False)
+    monkeypatch.setattr(retry_policy.DEFAULT_RETRY_POLICY, "base_delay", 0.01)
+    monkeypatch.setattr(retry_policy, "_default_circuit_breaker", retry_policy.CircuitBreaker())
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.requests += 1
+            status, body = server.robots
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_robots_rules_are_fetched_once_per_host_and_applied(robots_server):
+    robots_server.robots = (200, "User-agent: *\nAllow: /private/open\nDisallow: /private/\nCrawl-delay: 2\n")
+    throttle = RecordingThrottle()
+    robots = RobotsRules("docs-crawler", {}, throttle)
+    assert robots.allowed(f"{robots_server.base_url}/guide/")
+    assert robots.allowed(f"{robots_server.base_url}/private/open")
+    assert not robots.allowed(f"{robots_server.base_url}/private/secret")
+    assert robots_server.requests == 1
+    assert throttle.limits == {robots_server.base_url.split("//")[1]: 0.5}
+
+
+def test_missing_robots_txt_allows_everything(robots_server):
+    robots_server.robots = (404, "Not found")
+    robots = RobotsRules("docs-crawler", {}, RecordingThrottle())
+    assert robots.allowed(f"{robots_server.base_url}/private/secret")
+
+
+def test_unavailable_robots_txt_disallows_the_host(robots_server):
+    robots_server.robots = (503, "Down for maintenance")
+    robots = RobotsRules("docs-crawler", {}, RecordingThrottle())
+    assert not robots.allowed(f"{robots_server.base_url}/guide/")
+    assert not robots.allowed(f"{robots_server.base_url}/other")
+    assert robots_server.requests == retry_policy.DEFAULT_RETRY_POLICY.max_attempts
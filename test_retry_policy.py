@@ -0,0 +1,127 @@
+# test_retry_policy.py
+import pytest
+import requests
+
+import retry_policy
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, get_with_retries
+
+URL = "https://docs.example/page"
+
+
+def make_response(status=200, text="", **headers):
+    response = requests.Response()
+    response.status_code = status
+    response.url = URL
+    response.headers.update({name.replace("_", "-"): str(value) for name, value in headers.items()})
+    response._content = text.encode('utf-8')
+    response._content_consumed = True
+    return response
+
+
+def scripted_get(*outcomes):
+    """A `get` for get_with_retries that returns (or raises) the given outcomes in turn."""
+    calls = []
+
+    def get(url, headers, timeout, **kwargs):
+        outcome = outcomes[len(calls)]
+        calls.append(url)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    get.calls = calls
+    return get
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry_policy.time, "sleep", sleeps.append)
+    monkeypatch.setattr(retry_policy, "_default_circuit_breaker", CircuitBreaker(failure_threshold=3, cooldown=30))
+    return sleeps
+
+
+def test_retryable_failures_are_retried_with_capped_backoff(no_sleep):
+    get = scripted_get(requests.exceptions.ConnectionError("reset"), make_response(503), make_response(200, "ok"))
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=1.5)
+    assert get_with_retries(URL, {}, 5, get=get, policy=policy).text == "ok"
+    assert len(get.calls) == 3
+    assert 0 <= no_sleep[0] <= 1.0 and 0 <= no_sleep[1] <= 1.5
+
+
+@pytest.mark.parametrize("status", [404, 410, 403])
+def test_client_errors_are_final(no_sleep, status):
+    get = scripted_get(make_response(status))
+    with pytest.raises(requests.exceptions.HTTPError):
+        get_with_retries(URL, {}, 5, get=get)
+    assert len(get.calls) == 1 and no_sleep == []
+
+
+def test_last_failure_is_raised_after_max_attempts(no_sleep):
+    get = scripted_get(*[requests.exceptions.Timeout("slow")] * 2)
+    with pytest.raises(requests.exceptions.Timeout):
+        get_with_retries(URL, {}, 5, get=get, policy=RetryPolicy(max_attempts=2))
+    assert len(get.calls) == 2
+
+
+def test_retry_after_is_honoured_and_bounded():
+    policy = RetryPolicy(max_attempts=5)
+    assert policy.retry_delay(0, make_response(429, Retry_After=7)) == 7
+    assert policy.retry_delay(0, make_response(503, Retry_After=7)) == 7
+    assert policy.retry_delay(0, make_response(429, Retry_After=3600)) is None # Gives up rather than stall
+    assert policy.retry_delay(0, make_response(503, Retry_After=3600)) == retry_policy.RETRY_MAX_RETRY_AFTER_SECONDS
+    assert policy.retry_delay(0, make_response(403, "API rate limit exceeded", Retry_After=2)) == 2
+
+
+def test_rate_limit_reset_is_waited_for_only_when_asked(monkeypatch):
+    monkeypatch.setattr(retry_policy.time, "time", lambda: 1000.0)
+    response = make_response(403, X_RateLimit_Remaining=0, X_RateLimit_Reset=1010)
+    assert RetryPolicy().retry_delay(0, response) == 11
+    assert RetryPolicy(wait_for_rate_limit_reset=False).retry_delay(0, response) == 0.0
+
+
+def test_backoff_has_full_jitter(monkeypatch):
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda low, high: (low, high))
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    assert [policy.backoff(attempt) for attempt in range(4)] == [(0, 1.0), (0, 2.0), (0, 4.0), (0, 5.0)]
+
+
+def test_circuit_opens_after_consecutive_failures_and_fails_fast(no_sleep):
+    get = scripted_get(*[make_response(500)] * 3)
+    with pytest.raises(requests.exceptions.HTTPError):
+        get_with_retries(URL, {}, 5, get=get, policy=RetryPolicy(max_attempts=3))
+
+    other = scripted_get(make_response(200))
+    with pytest.raises(CircuitOpenError):
+        get_with_retries(URL, {}, 5, get=other, policy=RetryPolicy(max_attempts=1))
+    assert other.calls == [] # Nothing was sent to the failing host
+    assert get_with_retries("https://other.example/", {}, 5, get=other).status_code == 200
+
+
+def test_circuit_closes_after_the_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(retry_policy.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+    breaker.record_failure("host")
+    breaker.check("host")
+    breaker.record_failure("host")
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.check("host")
+    assert raised.value.retry_in == 30
+
+    now[0] += 31
+    breaker.check("host") # Half open: requests go through again
+    breaker.record_failure("host")
+    with pytest.raises(CircuitOpenError):
+        breaker.check("host") # One more failure reopens it
+    now[0] += 31
+    breaker.record_success("host")
+    breaker.record_failure("host")
+    breaker.check("host") # The success reset the count
+
+
+def test_client_errors_do_not_count_against_the_host(no_sleep):
+    for _ in range(5):
+        with pytest.raises(requests.exceptions.HTTPError):
+            get_with_retries(URL, {}, 5, get=scripted_get(make_response(404)))
+    assert get_with_retries(URL, {}, 5, get=scripted_get(make_response(200))).status_code == 200
@@ -0,0 +1,116 @@
+# test_sitemap_incremental.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("markdownify")
+
+import content_store
+import http_cache
+import sitemap_docs_crawler
+from sitemap_docs_crawler import MANIFEST_FILENAME, crawl_knowledge_file
+
+
+@pytest.fixture
+def site():
+    """A small sitemap site whose pages and lastmods the test edits between crawls."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/sitemap.xml":
+                entries = "".join(f"<url><loc>{site.base_url}{path}</loc><lastmod>{lastmod}</lastmod></url>"
+                                  for path, (lastmod, _) in site.pages.items())
+                body = f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+                content_type = "application/xml"
+            elif self.path in site.pages:
+                site.fetched.append(self.path)
+                body = f"<html><body><h1>{self.path}</h1><p>{site.pages[self.path][1]}</p></body></html>"
+                content_type = "text/html; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    site = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    site.base_url = f"http://127.0.0.1:{site.server_address[1]}"
+    site.pages = {f"/page-{n}": ("2025-01-01", f"Body of page {n}.") for n in range(6)}
+    site.fetched = []
+    threading.Thread(target=site.serve_forever, daemon=True).start()
+    yield site
+    site.shutdown()
+    site.server_close()
+
+
+@pytest.fixture
+def crawl(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_ENABLED", False)
+    monkeypatch.setattr(content_store, "CONTENT_STORE_ENABLED", False)
+    monkeypatch.setattr(sitemap_docs_crawler, "CONVERSION_WORKERS", 0)
+    monkeypatch.setattr(sitemap_docs_crawler, "PER_HOST_REQUESTS_PER_SECOND", 1000)
+    knowledge_path = tmp_path / "site" / ".knowledge"
+    knowledge_path.parent.mkdir()
+    knowledge_path.write_text(f"{site.base_url}/sitemap.xml\n", encoding='utf-8')
+
+    def run():
+        site.fetched.clear()
+        assert crawl_knowledge_file("site/.knowledge", {})
+        return (tmp_path / "site" / "docs.md").read_bytes()
+
+    return run
+
+
+def manifest_pages(tmp_path):
+    with open(tmp_path / "site" / MANIFEST_FILENAME, encoding='utf-8') as f:
+        return json.load(f)["pages"]
+
+
+def test_unchanged_pages_are_spliced_from_the_previous_build(crawl, site, tmp_path):
+    first = crawl()
+    assert sorted(site.fetched) == sorted(site.pages)
+    assert crawl() == first
+    assert site.fetched == []
+
+    pages = manifest_pages(tmp_path)
+    for entry in pages.values():
+        assert first[entry["offset"]:entry["offset"] + entry["length"]].startswith(b"\n\n---\n\n<!-- Source URL: ")
+
+
+def test_only_changed_pages_are_refetched(crawl, site, tmp_path):
+    crawl()
+    site.pages["/page-2"] = ("2025-02-01", "Rewritten body.")
+    del site.pages["/page-4"]
+    site.pages["/page-9"] = ("2025-02-01", "A new page.")
+    docs = crawl().decode('utf-8')
+
+    assert sorted(site.fetched) == ["/page-2", "/page-9"]
+    assert "Rewritten body." in docs and "Body of page 2." not in docs
+    assert "page-4" not in docs and "A new page." in docs
+    assert set(manifest_pages(tmp_path)) == {site.base_url + path for path in site.pages}
+    assert docs.index("Body of page 3.") < docs.index("Body of page 5.") < docs.index("A new page.")
+
+
+def test_edited_sections_are_not_trusted(crawl, site, tmp_path):
+    docs_path = tmp_path / "site" / "docs.md"
+    crawl()
+    docs_path.write_bytes(docs_path.read_bytes().replace(b"Body of page 1.", b"Body of page X."))
+    docs = crawl()
+    assert site.fetched == ["/page-1"]
+    assert b"Body of page 1." in docs and b"page X" not in docs
+
+
+def test_changed_conversion_settings_rebuild_everything(crawl, site, monkeypatch):
+    crawl()
+    monkeypatch.setattr(sitemap_docs_crawler, "CONTENT_EXTRACTION_ENABLED", True)
+    crawl()
+    assert sorted(site.fetched) == sorted(site.pages)